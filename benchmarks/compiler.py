@@ -0,0 +1,320 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# measures compiler throughput on generated programs, and compares it with a stored baseline.
+# every case runs in its own process, so that peak memory usage is measured separately.
+# usage: python benchmarks/compiler.py [cases...] [--scale N] [--runs N] [--cython]
+#                                      [--tolerance PERCENT] [--save-baseline] [--phases]
+
+import os, sys, json, tempfile, subprocess
+from timeit  import default_timer
+from pathlib import Path
+
+OPAL_DIR      = str(Path(__file__).parent.parent.absolute())
+BASELINE_FILE = os.path.join(OPAL_DIR, "benchmarks", "baseline.json")
+sys.path.insert(0, OPAL_DIR)
+
+from components.Compiler import Compiler
+from components.Profiler import CompilerProfile
+
+try:    import resource
+except ImportError:
+    resource = None
+
+def generateNesting(scale, _):
+    out = "package opal: import *;\n"
+
+    for n in range(scale * 10):
+        out += f"new function nested{n}(x: int) int {{\n"
+
+        # python doesn't allow more than 20 nested blocks
+        depth = 18
+        for d in range(depth):
+            match d % 4:
+                case 0: out += f"if x > {d} {{\n"
+                case 1: out += f"for i{d} in range(x) {{\n"
+                case 2: out += f"while x < {d} {{\n"
+                case 3: out += f"repeat {d} {{\n"
+
+            out += f"new int v{d} = x + {d};\n"
+
+        out += "}\n" * depth
+        out += "return x;\n}\n"
+
+    return out
+
+def generateMatch(scale, _):
+    out = "package opal: import *;\n"
+
+    for n in range(scale):
+        out += f"new function matcher{n}(x: int, s: str) str {{\n"
+
+        out += "match x {\n"
+        for c in range(100):
+            out += f"case {c} {{\nreturn \"{c}\";\n}}\n"
+        out += "default {\nreturn \"?\";\n}\n}\n"
+
+        out += "match:(==) s {\n"
+        for c in range(100):
+            out += f"case \"{c}\" {{\nx += {c};\n}}\n"
+        out += "}\n"
+
+        out += "return str(x);\n}\n"
+
+    return out
+
+def generateIncludes(scale, folder):
+    out = "package opal: import *;\n"
+
+    for n in range(scale * 5):
+        with open(os.path.join(folder, f"include{n}.opal"), "w", encoding = "utf-8") as file:
+            file.write(f"$once\n$define INCLUDED_{n} {n}\n")
+            if n != 0:
+                file.write(f'$include os.path.join(HOME_DIR, "include{n - 1}.opal")\n')
+
+            for f in range(10):
+                file.write(f"new function included{n}_{f}(x: int) int {{\nreturn x + INCLUDED_{n};\n}}\n")
+
+        out += f'$include os.path.join(HOME_DIR, "include{n}.opal")\n'
+
+    return out
+
+def generateMacros(scale, _):
+    out = "package opal: import *;\n"
+
+    for n in range(scale * 5):
+        out += f"$macro add{n}(a, b)\nnew int result{n} = a + b;\nIO.out(result{n});\n$end\n"
+        out += f"$macro greet{n}\nIO.out(\"{n}\\n\");\n$end\n"
+
+    out += "new function macros() {\n"
+    for n in range(scale * 5):
+        for c in range(10):
+            out += f"$call add{n}({c}, {n})\n$call greet{n}\n"
+    out += "}\n"
+
+    return out
+
+def generateEnums(scale, _):
+    out = "package opal: import *;\n"
+
+    for n in range(scale):
+        out += f"enum Large{n} {{\n"
+        out += ",\n".join(f"CONST{c}" for c in range(250))
+        out += "\n}\n"
+
+        out += f"enum Valued{n} {{\n"
+        out += ",\n".join(f"VALUE{c} = {c * 2}" for c in range(250))
+        out += "\n}\n"
+
+    return out
+
+def generateTyped(scale, _):
+    out = "package opal: import *;\n"
+
+    for n in range(scale * 5):
+        out += f"new function typed{n}(a: int, b: float, c: str) float {{\n"
+
+        for v in range(20):
+            out += f"new int i{v} = a + {v};\nnew float f{v} = b * {v};\nnew str s{v} = c + \"{v}\";\nnew list l{v} = [i{v}, f{v}];\n"
+
+        for v in range(20):
+            out += f"i{v} = i{v} * 2;\nf{v} += i{v};\ns{v} = s{v} + str(f{v});\n"
+
+        out += "return f0;\n}\n"
+
+    return out
+
+CASES = {
+    "nesting":  generateNesting,
+    "match":    generateMatch,
+    "includes": generateIncludes,
+    "macros":   generateMacros,
+    "enums":    generateEnums,
+    "typed":    generateTyped
+}
+
+def getArg(name, default):
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        sys.argv.pop(idx)
+        return type(default)(sys.argv.pop(idx))
+    return default
+
+def getFlag(name):
+    if name in sys.argv:
+        sys.argv.remove(name)
+        return True
+    return False
+
+def getCompiler(folder, profile = None):
+    compiler = Compiler()
+    compiler.preConsts["RELEASE_MODE"] = "False"
+    compiler.preConsts["OPAL_DIR"]     = f"r'{OPAL_DIR}'"
+    compiler.initMain()
+    compiler.preConsts["HOME_DIR"]     = f'r"{folder}"'
+    compiler.profile = profile
+    return compiler
+
+def getPeakMemory():
+    if resource is None: return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB everywhere else
+    if sys.platform == "darwin":
+          return peak
+    else: return peak * 1024
+
+def compileCase(folder, fileIn, fileOut, cython, profile = None):
+    compiler = getCompiler(folder, profile)
+
+    time = default_timer()
+    if cython:
+          compiler.compileToPYX(fileIn, fileOut)
+    else: compiler.compileToPY(fileIn, fileOut)
+    time = default_timer() - time
+
+    if compiler.hadError:
+        print("compilation failed")
+        sys.exit(1)
+
+    return time
+
+# runs in a separate process, and prints its results as JSON
+def runCase(name, scale, runs, cython):
+    with tempfile.TemporaryDirectory() as folder:
+        fileIn  = os.path.join(folder, "main.opal")
+        fileOut = os.path.join(folder, "main.pyx" if cython else "main.py")
+
+        with open(fileIn, "w", encoding = "utf-8") as file:
+            file.write(CASES[name](scale, folder))
+
+        best = min(compileCase(folder, fileIn, fileOut, cython) for _ in range(runs))
+
+        # profiling slows compilation down, so phases are measured in a separate run
+        profile = CompilerProfile()
+        compileCase(folder, fileIn, fileOut, cython, profile)
+
+    print(json.dumps({
+        "time":     best,
+        "lines":    profile.counters.get("source lines", 0),
+        "tokens":   profile.counters.get("tokens", 0),
+        "memory":   getPeakMemory(),
+        "phases":   {name: phase.self for name, phase in profile.phases.items()},
+        "counters": profile.counters
+    }))
+
+def measure(name, scale, runs, cython):
+    args = [sys.executable, __file__, "--run-case", name, "--scale", str(scale), "--runs", str(runs)]
+    if cython: args.append("--cython")
+
+    result = subprocess.run(args, capture_output = True, text = True)
+    if result.returncode != 0:
+        print(f"{name}: benchmark failed")
+        print(result.stdout + result.stderr)
+        return None
+
+    return json.loads(result.stdout.strip().split("\n")[-1])
+
+def getPhase(result, name):
+    return result["phases"].get(name, 0.0) * 1000
+
+def loadBaseline():
+    if not os.path.exists(BASELINE_FILE): return {}
+
+    with open(BASELINE_FILE, "r", encoding = "utf-8") as file:
+        return json.load(file)
+
+if __name__ == "__main__":
+    scale     = getArg("--scale", 10)
+    runs      = getArg("--runs", 5)
+    tolerance = getArg("--tolerance", 25.0)
+    cython    = getFlag("--cython")
+    save      = getFlag("--save-baseline")
+    phases    = getFlag("--phases")
+    runName   = getArg("--run-case", "")
+
+    if runName != "":
+        runCase(runName, scale, runs, cython)
+        sys.exit(0)
+
+    cases = sys.argv[1:] if len(sys.argv) > 1 else list(CASES)
+    for name in cases:
+        if name not in CASES:
+            print(f'unknown case "{name}". available cases: {", ".join(CASES)}')
+            sys.exit(1)
+
+    mode     = f"{'cython' if cython else 'python'}, scale {scale}"
+    baseline = loadBaseline()
+    previous = baseline.get(mode, {})
+
+    print(f"{mode}, best of {runs} run(s)")
+    print(f"{'case'.ljust(10)}  {'lines'.rjust(7)}  {'tokens'.rjust(8)}  {'time (s)'.rjust(9)}  {'tokens/s'.rjust(9)}  {'peak (MiB)'.rjust(10)}  {'preproc (ms)'.rjust(12)}  {'tokenize (ms)'.rjust(13)}  {'codegen (ms)'.rjust(12)}  {'baseline'.rjust(9)}")
+
+    results    = {}
+    regressed  = []
+    for name in cases:
+        result = measure(name, scale, runs, cython)
+        if result is None:
+            regressed.append(name)
+            continue
+
+        results[name] = result
+
+        memory = "-" if result["memory"] is None else format(result["memory"] / 1024 / 1024, ".1f")
+
+        if name in previous:
+            change = (result["time"] / previous[name]["time"] - 1) * 100
+            delta  = format(change, "+.1f") + "%"
+            if change > tolerance: regressed.append(name)
+        else: delta = "-"
+
+        codegen = getPhase(result, "code generation") + sum(
+            time * 1000 for phase, time in result["phases"].items()
+            if phase.startswith("statement ") or phase.startswith("include ") or phase.startswith("macro ")
+        )
+        preproc = sum(
+            time * 1000 for phase, time in result["phases"].items()
+            if phase.startswith("preprocess") or phase.startswith("comptime ")
+        )
+
+        print(
+            f"{name.ljust(10)}  {str(result['lines']).rjust(7)}  {str(result['tokens']).rjust(8)}  " +
+            f"{format(result['time'], '.4f').rjust(9)}  {str(round(result['tokens'] / result['time'])).rjust(9)}  " +
+            f"{memory.rjust(10)}  {format(preproc, '.1f').rjust(12)}  {format(getPhase(result, 'tokenize'), '.1f').rjust(13)}  " +
+            f"{format(codegen, '.1f').rjust(12)}  {delta.rjust(9)}"
+        )
+
+        if phases:
+            for phase, time in sorted(result["phases"].items(), key = lambda item: item[1], reverse = True)[:10]:
+                print(f"    {phase.ljust(40)}  {format(time * 1000, '.2f').rjust(10)} ms")
+
+    if save:
+        baseline[mode] = {name: {"time": result["time"], "tokens": result["tokens"]} for name, result in results.items()}
+        with open(BASELINE_FILE, "w", encoding = "utf-8") as file:
+            json.dump(baseline, file, indent = 4)
+
+        print(f"baseline saved to {BASELINE_FILE}")
+    elif len(regressed) != 0:
+        print(f"regressions (slower than the baseline by more than {tolerance}%, or failed):", ", ".join(regressed))
+        sys.exit(1)
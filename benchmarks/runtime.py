@@ -0,0 +1,412 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# compares the standard library compiled to Python, the standard library built with Cython, and Python builtins.
+# usage: python benchmarks/runtime.py [functions...] [--sizes N,N,...] [--distributions NAME,NAME,...]
+#                                     [--runs N] [--no-cython] [--no-cache]
+
+import os, sys, heapq, random, bisect, importlib.util
+from collections import deque
+from timeit      import default_timer
+from pathlib     import Path
+
+OPAL_DIR = str(Path(__file__).parent.parent.absolute())
+LIBS_DIR = os.path.join(OPAL_DIR, "libs")
+sys.path.insert(0, OPAL_DIR)
+
+from components.Compiler   import Compiler
+from components.BuildCache import BuildCache
+from components.utils      import getDefaultCacheDir
+
+# fastSort can only be compiled with Cython
+LIBRARIES = {
+    "std":      False,
+    "sort":     False,
+    "merge":    False,
+    "fastSort": True
+}
+
+def sawtooth(size, rng):
+    teeth = max(size // 8, 1)
+    return [i % teeth for i in range(size)]
+
+DISTRIBUTIONS = {
+    "random":     lambda size, rng: [rng.randrange(size) for _ in range(size)],
+    "sorted":     lambda size, rng: list(range(size)),
+    "reversed":   lambda size, rng: list(range(size, 0, -1)),
+    "few-unique": lambda size, rng: [rng.randrange(8) for _ in range(size)],
+    "sawtooth":   sawtooth
+}
+
+def getArg(name, default):
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        sys.argv.pop(idx)
+        return sys.argv.pop(idx)
+    return default
+
+def getFlag(name):
+    if name in sys.argv:
+        sys.argv.remove(name)
+        return True
+    return False
+
+def getCompiler():
+    compiler = Compiler()
+    compiler.preConsts["RELEASE_MODE"] = "False"
+    compiler.preConsts["OPAL_DIR"]     = f"r'{OPAL_DIR}'"
+    compiler.initMain()
+    compiler.preConsts["HOME_DIR"]     = f'r"{LIBS_DIR}"'
+    return compiler
+
+def loadModule(name, path):
+    spec   = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def buildPython(folder):
+    modules = {}
+    for name, compileOnly in LIBRARIES.items():
+        if compileOnly: continue
+
+        fileOut  = os.path.join(folder, name + ".py")
+        compiler = getCompiler()
+        compiler.compileToPY(os.path.join(LIBS_DIR, name + ".opal"), fileOut, 'new dynamic HOME_DIR=r"' + LIBS_DIR + '";')
+        if compiler.hadError: return None
+
+        modules[name] = loadModule(name, fileOut)
+
+    return modules
+
+def buildCython(folder, cache):
+    try:
+        from components.CythonBuilder import CythonBuilder
+    except ImportError as e:
+        print(f"Cython build unavailable: {e}")
+        return None
+
+    files = []
+    for name in LIBRARIES:
+        fileOut  = os.path.join(folder, name + ".pyx")
+        compiler = getCompiler()
+        compiler.compileToPYX(os.path.join(LIBS_DIR, name + ".opal"), fileOut, 'new dynamic HOME_DIR=r"' + LIBS_DIR + '";')
+        if compiler.hadError: return None
+
+        files.append(fileOut)
+
+    if not CythonBuilder(cache).build(files): return None
+
+    suffix = importlib.machinery.EXTENSION_SUFFIXES[0]
+    return {name: loadModule(name, os.path.join(folder, name + suffix)) for name in LIBRARIES}
+
+def getQueries(array, count):
+    return array[::max(len(array) // count, 1)]
+
+def sortInPlace(array):
+    array.sort()
+    return array
+
+def rotateSlices(array):
+    m = len(array) // 3
+    array[:] = array[m:] + array[:m]
+    return array
+
+def swapHalves(array):
+    h = len(array) // 2
+    array[:h], array[h:h * 2] = array[h:h * 2], array[:h]
+    return array
+
+def swapItems(swap, array):
+    for i in range(len(array) // 2):
+        swap(array, i, len(array) - 1 - i)
+    return array
+
+def swapPairs(array):
+    for i in range(len(array) // 2):
+        array[i], array[len(array) - 1 - i] = array[len(array) - 1 - i], array[i]
+    return array
+
+def halves(array):
+    h = len(array) // 2
+    return sorted(array[:h]), sorted(array[h:])
+
+# every benchmark is (prepare input, opal implementation, builtin implementation)
+# implementations get a fresh copy of the prepared input and return something that can be compared between them
+SEQUENCES = {
+    "sort": (
+        None,
+        lambda m, a: (m["sort"].sort(a), a)[1],
+        sortInPlace
+    ),
+    "fastSort": (
+        None,
+        lambda m, a: (m["fastSort"].fastSort(a), a)[1],
+        sortInPlace
+    ),
+    "merge": (
+        lambda a: sum(halves(a), []),
+        lambda m, a: (m["merge"].merge(a, 0, len(a) // 2, len(a)), a)[1],
+        sortInPlace
+    ),
+    "mergeTwo": (
+        halves,
+        lambda m, a: m["merge"].mergeTwo(*a),
+        lambda a: list(heapq.merge(*a))
+    ),
+    "binarySearch": (
+        sorted,
+        lambda m, a: [a[m["std"].binarySearch(a, q)] for q in getQueries(a, 1000)],
+        lambda a: [a[bisect.bisect_left(a, q)] for q in getQueries(a, 1000)]
+    ),
+    "linearSearch": (
+        None,
+        lambda m, a: [m["std"].linearSearch(a, q) for q in getQueries(a, 20)],
+        lambda a: [a.index(q) for q in getQueries(a, 20)]
+    ),
+    "reverse": (
+        None,
+        lambda m, a: (m["std"].reverse(a), a)[1],
+        lambda a: (a.reverse(), a)[1]
+    ),
+    "rotate": (
+        None,
+        lambda m, a: (m["std"].rotate(a, 0, len(a) // 3, len(a)), a)[1],
+        rotateSlices
+    ),
+    "multiSwapRight": (
+        None,
+        lambda m, a: (m["std"].multiSwapRight(a, 0, len(a) // 2, len(a) // 2), a)[1],
+        swapHalves
+    ),
+    "multiSwapLeft": (
+        None,
+        lambda m, a: (m["std"].multiSwapLeft(a, 0, len(a) // 2, len(a) // 2), a)[1],
+        swapHalves
+    ),
+    "insertToLeft": (
+        None,
+        lambda m, a: (m["std"].insertToLeft(a, len(a) - 1, 0), a)[1],
+        lambda a: (a.insert(0, a.pop()), a)[1]
+    ),
+    "insertToRight": (
+        None,
+        lambda m, a: (m["std"].insertToRight(a, 0, len(a) - 1), a)[1],
+        lambda a: (a.append(a.pop(0)), a)[1]
+    )
+}
+
+# scalar functions, called once for every item of the input
+SCALARS = {
+    "swap": (
+        lambda m, a: [m["std"].swap(x, 1) for x in a],
+        lambda a: [(1, x) for x in a]
+    ),
+    "arraySwap": (
+        lambda m, a: swapItems(m["std"].arraySwap, a),
+        swapPairs
+    ),
+    "tolerance": (
+        lambda m, a: [m["std"].tolerance(x, 2) for x in a],
+        lambda a: [range(round(x - 2), round(x + 2)) for x in a]
+    ),
+    "limitToRange": (
+        lambda m, a: [m["std"].limitToRange(x, 10, len(a) // 2) for x in a],
+        lambda a: [min(max(x, 10), len(a) // 2) for x in a]
+    ),
+    "translate": (
+        lambda m, a: [m["std"].translate(x, 0, len(a), 0, 1) for x in a],
+        lambda a: [float(x) / float(len(a)) for x in a]
+    ),
+    "justify": (
+        lambda m, a: [m["std"].justifyString(str(x), 12) for x in a],
+        lambda a: [str(x).rjust(12) for x in a]
+    ),
+    "getNearestPowerOfTwo": (
+        lambda m, a: [m["std"].getNearestPowerOfTwo(x + 2, False) for x in a],
+        lambda a: [1 << (x + 1).bit_length() for x in a]
+    )
+}
+
+def stackOps(stack, array):
+    for x in array: stack.push(x)
+    return [stack.pop() for _ in array]
+
+def listStackOps(array):
+    stack = []
+    for x in array: stack.append(x)
+    return [stack.pop() for _ in array]
+
+def queueOps(queue, array):
+    for x in array: queue.push(x)
+    return [queue.pop() for _ in array]
+
+def dequeOps(array):
+    queue = deque()
+    for x in array: queue.append(x)
+    return [queue.popleft() for _ in array]
+
+def arrayOps(Array, array):
+    result = Array(len(array), int)
+    for i, x in enumerate(array): result[i] = x
+    return [result[i] for i in range(len(array))]
+
+def listOps(array):
+    result = [0] * len(array)
+    for i, x in enumerate(array): result[i] = x
+    return [result[i] for i in range(len(array))]
+
+def vectorOps(Vector, array):
+    total = Vector()
+    for x in array: total = total + Vector(x, x, x)
+    return list(total)
+
+def tupleOps(array):
+    total = (0, 0, 0)
+    for x in array: total = (total[0] + x, total[1] + x, total[2] + x)
+    return list(total)
+
+# python classes, which are the same in both builds
+CLASSES = {
+    "Stack":  ("libs.Stack",  lambda c, a: stackOps(c(), a),   listStackOps),
+    "Queue":  ("libs.Queue",  lambda c, a: queueOps(c(), a),   dequeOps),
+    "Array":  ("libs.Array",  arrayOps,                        listOps),
+    "Vector": ("libs.Vector", vectorOps,                       tupleOps),
+    "char":   ("libs.char",   lambda c, a: [str(c(x % 128) + 1) for x in a], lambda a: [chr(x % 128 + 1) for x in a])
+}
+
+def measure(fn, data, runs):
+    best   = float("inf")
+    result = None
+    for _ in range(runs):
+        if type(data) is tuple:
+              copy = tuple(item.copy() for item in data)
+        else: copy = data.copy()
+
+        time   = default_timer()
+        result = fn(copy)
+        best   = min(best, default_timer() - time)
+
+    return best, result
+
+def formatTime(time):
+    return "-" if time is None else format(time * 1000, ".3f")
+
+def formatRatio(a, b):
+    return "-" if a is None or b is None else format(a / b, ".2f") + "x"
+
+def printRow(name, distribution, size, python, cython, builtin, error = ""):
+    print(
+        f"{name.ljust(20)}  {distribution.ljust(10)}  {str(size).rjust(7)}  {formatTime(python).rjust(11)}  " +
+        f"{formatTime(cython).rjust(11)}  {formatTime(builtin).rjust(12)}  {formatRatio(python, cython).rjust(9)}  " +
+        f"{formatRatio(cython if cython is not None else python, builtin).rjust(10)}  {error}"
+    )
+
+def run(name, implementations, builtin, data, runs):
+    times   = {}
+    results = {}
+    for mode, fn in implementations.items():
+        times[mode], results[mode] = measure(fn, data, runs)
+
+    builtinTime, expected = measure(builtin, data, runs)
+
+    wrong = [mode for mode, result in results.items() if result is not None and result != expected]
+    return times, builtinTime, ("WRONG RESULT: " + ", ".join(wrong)) if len(wrong) != 0 else ""
+
+if __name__ == "__main__":
+    sizes         = [int(size) for size in getArg("--sizes", "1000,10000").split(",")]
+    distributions = getArg("--distributions", ",".join(DISTRIBUTIONS)).split(",")
+    runs          = int(getArg("--runs", "3"))
+    noCython      = getFlag("--no-cython")
+    cache         = None if getFlag("--no-cache") else BuildCache()
+    names         = sys.argv[1:]
+
+    for distribution in distributions:
+        if distribution not in DISTRIBUTIONS:
+            print(f'unknown distribution "{distribution}". available distributions: {", ".join(DISTRIBUTIONS)}')
+            sys.exit(1)
+
+    for name in names:
+        if name not in SEQUENCES and name not in SCALARS and name not in CLASSES:
+            print(f'unknown function "{name}". available functions: {", ".join(list(SEQUENCES) + list(SCALARS) + list(CLASSES))}')
+            sys.exit(1)
+
+    # built in the same place every time, so that the generated C sources stay the same and the build cache can be used
+    folder = os.path.join(getDefaultCacheDir(), "benchmarks")
+    os.makedirs(os.path.join(folder, "python"), exist_ok = True)
+    os.makedirs(os.path.join(folder, "cython"), exist_ok = True)
+
+    time   = default_timer()
+    builds = {"python": buildPython(os.path.join(folder, "python"))}
+    if builds["python"] is None:
+        print("failed to compile the standard library to Python")
+        sys.exit(1)
+
+    if not noCython:
+        builds["cython"] = buildCython(os.path.join(folder, "cython"), cache)
+        if builds["cython"] is None:
+            print("failed to build the standard library with Cython, only running the Python build")
+            del builds["cython"]
+
+    print(f"standard library built in {round(default_timer() - time, 4)} seconds")
+    print(f"times are the best of {runs} run(s), in milliseconds. speedup is how much faster Cython is than Python, vs builtin is how much slower the fastest opal build is than builtins")
+    print(f"{'function'.ljust(20)}  {'input'.ljust(10)}  {'size'.rjust(7)}  {'python (ms)'.rjust(11)}  {'cython (ms)'.rjust(11)}  {'builtin (ms)'.rjust(12)}  {'speedup'.rjust(9)}  {'vs builtin'.rjust(10)}")
+
+    rng = random.Random(0)
+    for size in sizes:
+        inputs = {distribution: DISTRIBUTIONS[distribution](size, rng) for distribution in distributions}
+
+        for name, (prepare, opal, builtin) in SEQUENCES.items():
+            if len(names) != 0 and name not in names: continue
+
+            for distribution, data in inputs.items():
+                if prepare is not None: data = prepare(data)
+
+                implementations = {mode: (lambda modules: lambda a: opal(modules, a))(modules) for mode, modules in builds.items()}
+                if name == "fastSort":
+                    implementations.pop("python")
+                    if len(implementations) == 0: continue
+
+                times, builtinTime, error = run(name, implementations, builtin, data, runs)
+                printRow(name, distribution, size, times.get("python"), times.get("cython"), builtinTime, error)
+
+        data = inputs["random"] if "random" in inputs else next(iter(inputs.values()))
+        for name, (opal, builtin) in SCALARS.items():
+            if len(names) != 0 and name not in names: continue
+
+            implementations = {mode: (lambda modules: lambda a: opal(modules, a))(modules) for mode, modules in builds.items()}
+            times, builtinTime, error = run(name, implementations, builtin, data, runs)
+            printRow(name, "-", size, times.get("python"), times.get("cython"), builtinTime, error)
+
+        for name, (module, opal, builtin) in CLASSES.items():
+            if len(names) != 0 and name not in names: continue
+
+            try:
+                cls = getattr(importlib.import_module(module), name)
+            except ImportError as e:
+                print(f"{name}: cannot be imported ({e}). build the standard library first")
+                continue
+
+            times, builtinTime, error = run(name, {"python": lambda a: opal(cls, a)}, builtin, data, runs)
+            printRow(name, "-", size, times.get("python"), None, builtinTime, error)
@@ -0,0 +1,89 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# compares the legacy tokenizer with the table-driven one.
+# usage: python benchmarks/tokenizer.py [files...] [--repeat N] [--runs N]
+
+import os, sys
+from timeit  import default_timer
+from pathlib import Path
+
+OPAL_DIR = str(Path(__file__).parent.parent.absolute())
+sys.path.insert(0, OPAL_DIR)
+
+from components.Tokens import Tokens
+
+def getDefaultFiles():
+    files = []
+    for folder in ("examples", "libs"):
+        path = os.path.join(OPAL_DIR, folder)
+        files += [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(".opal")]
+    return files
+
+def getArg(name, default):
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        sys.argv.pop(idx)
+        return int(sys.argv.pop(idx))
+    return default
+
+def tokenize(source, fast):
+    return Tokens(source, fast = fast).tokens
+
+def dump(tokens):
+    return [(token.tok, token.line, token.pos, token.maxline) for token in tokens]
+
+def measure(source, fast, runs):
+    best = float("inf")
+    for _ in range(runs):
+        time = default_timer()
+        tokens = tokenize(source, fast)
+        best = min(best, default_timer() - time)
+    return len(tokens), best
+
+if __name__ == "__main__":
+    repeat = getArg("--repeat", 20)
+    runs   = getArg("--runs", 3)
+    files  = sys.argv[1:] if len(sys.argv) > 1 else getDefaultFiles()
+
+    sources = []
+    for file in files:
+        with open(file, "r", encoding = "utf-8") as txt:
+            sources.append(txt.read().replace("\t", ""))
+
+    for file, source in zip(files, sources):
+        if dump(tokenize(source, False)) != dump(tokenize(source, True)):
+            print(f"tokenizers disagree on {file}")
+            sys.exit(1)
+
+    source = "\n".join(sources * repeat)
+    lines  = source.count("\n") + 1
+
+    count, legacy = measure(source, False, runs)
+    _,     fast   = measure(source, True,  runs)
+
+    print(f"{len(files)} file(s) x{repeat}: {lines} lines, {count} tokens")
+    print(f"legacy: {round(legacy, 4)} seconds ({round(count / legacy)} tokens/s)")
+    print(f"fast:   {round(fast, 4)} seconds ({round(count / fast)} tokens/s)")
+    print(f"speedup: {round(legacy / fast, 2)}x")
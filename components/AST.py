@@ -0,0 +1,732 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# syntax trees of the expressions and simple statements in the generated code.
+# nodes keep the strings of their tokens along with their children, in source order, so that
+# rendering a tree that no pass changed gives back the same code it was parsed from.
+# code that can't be parsed becomes a Raw node, which passes leave alone
+
+import keyword
+from ast               import literal_eval
+from components.Tokens import spacedStrings
+
+KEYWORDS = set(keyword.kwlist) - {"True", "False", "None"}
+
+# lowest precedence first
+BINARY_OPS = (("|", ), ("^", ), ("&", ), ("<<", ">>"), ("+", "-"), ("*", "/", "//", "%", "@"))
+COMPARISON_OPS = ("<", ">", "<=", ">=", "==", "!=", "in")
+
+ASSIGNMENT_OPS = ("=", "+=", "-=", "*=", "/=", "%=", "&=", "|=", "^=")
+# augmented assignments the tokenizer leaves as an operator and a "="
+SPLIT_ASSIGNMENT_OPS = ("**", "//", ">>", "<<", "@")
+
+STRING_PREFIXES = ("", "r", "u", "b", "f", "br", "rb", "fr", "rf")
+NUMBER_PREFIXES = ("0x", "0b", "0o")
+
+# tokens that end an item of a list
+LIST_ENDS = (None, ")", "]", "}", "=", ":") + ASSIGNMENT_OPS
+
+class ParseError(Exception): pass
+
+class Syntax:
+    def __init__(self, parts):
+        # strings of tokens and child nodes
+        self.parts = parts
+
+    def children(self):
+        return [part for part in self.parts if type(part) is not str]
+
+    def leaves(self, result = None):
+        if result is None: result = []
+
+        for part in self.parts:
+            if type(part) is str:
+                  result.append(part)
+            else: part.leaves(result)
+
+        return result
+
+    # yields the node and every node inside it, parents first
+    def walk(self):
+        yield self
+        for child in self.children():
+            yield from child.walk()
+
+    def render(self):
+        return "".join(spacedStrings(self.leaves()))
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.render()!r})"
+
+class Raw(Syntax): pass
+
+class Name(Syntax):
+    @property
+    def id(self):
+        return self.parts[0]
+
+# numbers, strings, booleans, None and "...". the tokenizer splits some numbers, like "1.5e-3"
+class Constant(Syntax):
+    @property
+    def value(self):
+        return literal_eval("".join(self.parts))
+
+class Attribute(Syntax):
+    @property
+    def value(self):
+        return self.parts[0]
+
+    @property
+    def attr(self):
+        return self.parts[2]
+
+class Call(Syntax):
+    @property
+    def func(self):
+        return self.parts[0]
+
+    @property
+    def args(self):
+        return [part for part in self.parts[1:] if type(part) is not str]
+
+class Subscript(Syntax):
+    @property
+    def value(self):
+        return self.parts[0]
+
+class Slice(Syntax): pass
+
+# "*value" and "**value"
+class Starred(Syntax):
+    @property
+    def value(self):
+        return self.parts[1]
+
+class Keyword(Syntax):
+    @property
+    def arg(self):
+        return self.parts[0]
+
+    @property
+    def value(self):
+        return self.parts[2]
+
+class BinOp(Syntax):
+    @property
+    def left(self):
+        return self.parts[0]
+
+    @property
+    def op(self):
+        return self.parts[1]
+
+    @property
+    def right(self):
+        return self.parts[2]
+
+# "-", "+", "~", "not", and "&" (address of, in Cython)
+class UnaryOp(Syntax):
+    @property
+    def op(self):
+        return self.parts[0]
+
+    @property
+    def operand(self):
+        return self.parts[1]
+
+# "and" and "or" chains
+class BoolOp(Syntax):
+    @property
+    def op(self):
+        return self.parts[1]
+
+    @property
+    def values(self):
+        return self.children()
+
+# comparison chains. "not in" and "is not" are two strings
+class Compare(Syntax): pass
+
+class IfExp(Syntax):
+    @property
+    def body(self):
+        return self.parts[0]
+
+    @property
+    def test(self):
+        return self.parts[2]
+
+    @property
+    def orelse(self):
+        return self.parts[4]
+
+# parameters are kept as strings
+class Lambda(Syntax):
+    @property
+    def body(self):
+        return self.parts[-1]
+
+class NamedExpr(Syntax):
+    @property
+    def target(self):
+        return self.parts[0]
+
+    @property
+    def value(self):
+        return self.parts[2]
+
+class Await(Syntax): pass
+class Yield(Syntax): pass
+
+# Cython casts, like "<int>value". the type is kept as strings
+class Cast(Syntax):
+    @property
+    def operand(self):
+        return self.parts[-1]
+
+# a parenthesized expression
+class Group(Syntax):
+    @property
+    def value(self):
+        return self.parts[1]
+
+# tuples can be written without parentheses
+class Tuple(Syntax):
+    @property
+    def elements(self):
+        return self.children()
+
+class List(Syntax):
+    @property
+    def elements(self):
+        return self.children()
+
+class Set(Syntax):
+    @property
+    def elements(self):
+        return self.children()
+
+class Dict(Syntax):
+    @property
+    def items(self):
+        return self.children()
+
+# "key: value"
+class DictItem(Syntax):
+    @property
+    def key(self):
+        return self.parts[0]
+
+    @property
+    def value(self):
+        return self.parts[2]
+
+# list, set and dict comprehensions, and generator expressions
+class Comprehension(Syntax): pass
+
+# "value as name" in "with" and "except" headers, and "from" in "raise" and "yield" statements
+class Clause(Syntax): pass
+
+# "a = b = value" chains
+class Assign(Syntax):
+    @property
+    def targets(self):
+        return self.children()[:-1]
+
+    @property
+    def value(self):
+        return self.parts[-1]
+
+class AugAssign(Syntax):
+    @property
+    def target(self):
+        return self.parts[0]
+
+    @property
+    def op(self):
+        return "".join(self.parts[1:-1])
+
+    @property
+    def value(self):
+        return self.parts[-1]
+
+def isNumber(tok):
+    return tok is not None and tok[0].isdigit()
+
+# what can follow the "." of a float when there are no decimals, like "e5" in "1.e5"
+def isExponent(tok):
+    if tok is None or tok[0] not in "eEjJ": return False
+
+    digits = tok[1:].rstrip("jJ")
+    return digits == "" or digits.isdigit()
+
+def isString(tok):
+    if tok is None: return False
+
+    for idx, char in enumerate(tok):
+        if char in ("'", '"'): return tok[:idx].lower() in STRING_PREFIXES
+        if idx == 2: break
+
+    return False
+
+def isName(tok):
+    return tok is not None and tok.isidentifier() and tok not in KEYWORDS
+
+class Parser:
+    def __init__(self, strings):
+        self.strings = strings
+        self.pos     = 0
+
+    def peek(self, offset = 0):
+        if self.pos + offset < len(self.strings):
+            return self.strings[self.pos + offset]
+        return None
+
+    def next(self):
+        if self.pos >= len(self.strings): raise ParseError()
+
+        self.pos += 1
+        return self.strings[self.pos - 1]
+
+    def expect(self, tok):
+        if self.peek() != tok: raise ParseError()
+        return self.next()
+
+    def statement(self):
+        if self.peek() == "from":
+            return Clause([self.next(), self.expressionList(True)])
+
+        parts = [self.expressionList(True)]
+        while True:
+            tok = self.peek()
+
+            if tok == "=":
+                parts.append(self.next())
+                parts.append(self.value())
+            elif len(parts) == 1 and tok in ASSIGNMENT_OPS:
+                return AugAssign([parts[0], self.next(), self.value()])
+            elif len(parts) == 1 and tok in SPLIT_ASSIGNMENT_OPS and self.peek(1) == "=":
+                return AugAssign([parts[0], self.next(), self.next(), self.value()])
+            else: break
+
+        if len(parts) == 1: return parts[0]
+        return Assign(parts)
+
+    def value(self):
+        if self.peek() == "yield": return self.yieldExpression()
+        return self.expressionList()
+
+    # items separated by commas. more than one item, or a trailing comma, make a tuple
+    def expressionList(self, clauses = False):
+        parts = [self.item(clauses)]
+        while self.peek() == ",":
+            parts.append(self.next())
+            if self.peek() in LIST_ENDS: break
+            parts.append(self.item(clauses))
+
+        if len(parts) == 1: return parts[0]
+        return Tuple(parts)
+
+    def item(self, clauses = False):
+        if self.peek() in ("*", "**"):
+            return Starred([self.next(), self.bitwiseOr()])
+
+        result = self.namedExpression()
+        if clauses and self.peek() in ("as", "from"):
+            return Clause([result, self.next(), self.test()])
+
+        return result
+
+    def namedExpression(self):
+        if isName(self.peek()) and self.peek(1) == ":=":
+            return NamedExpr([self.next(), self.next(), self.test()])
+
+        return self.test()
+
+    def test(self):
+        match self.peek():
+            case "lambda": return self.lambda_()
+            case "yield":  return self.yieldExpression()
+
+        result = self.orTest()
+        if self.peek() != "if": return result
+
+        parts = [result, self.next(), self.orTest(), self.expect("else"), self.test()]
+        return IfExp(parts)
+
+    def lambda_(self):
+        parts = [self.next()]
+        depth = 0
+        while depth != 0 or self.peek() != ":":
+            tok = self.next()
+            if   tok in ("(", "[", "{"): depth += 1
+            elif tok in (")", "]", "}"): depth -= 1
+
+            parts.append(tok)
+
+        parts.append(self.next())
+        parts.append(self.test())
+        return Lambda(parts)
+
+    def yieldExpression(self):
+        parts = [self.next()]
+        if self.peek() == "from":
+            parts.append(self.next())
+            parts.append(self.test())
+        elif self.peek() not in LIST_ENDS:
+            parts.append(self.expressionList())
+
+        return Yield(parts)
+
+    def orTest(self):
+        return self.boolean("or", self.andTest)
+
+    def andTest(self):
+        return self.boolean("and", self.notTest)
+
+    def boolean(self, op, operand):
+        parts = [operand()]
+        while self.peek() == op:
+            parts.append(self.next())
+            parts.append(operand())
+
+        if len(parts) == 1: return parts[0]
+        return BoolOp(parts)
+
+    def notTest(self):
+        if self.peek() == "not":
+            return UnaryOp([self.next(), self.notTest()])
+
+        return self.comparison()
+
+    def comparison(self):
+        parts = [self.binary(0)]
+        while True:
+            tok = self.peek()
+
+            if tok in COMPARISON_OPS:
+                parts.append(self.next())
+            elif tok == "not" and self.peek(1) == "in":
+                parts.append(self.next())
+                parts.append(self.next())
+            elif tok == "is":
+                parts.append(self.next())
+                if self.peek() == "not": parts.append(self.next())
+            else: break
+
+            parts.append(self.binary(0))
+
+        if len(parts) == 1: return parts[0]
+        return Compare(parts)
+
+    def bitwiseOr(self):
+        return self.binary(0)
+
+    def binary(self, level):
+        if level == len(BINARY_OPS): return self.factor()
+
+        result = self.binary(level + 1)
+        # an operator followed by "=" is an augmented assignment
+        while self.peek() in BINARY_OPS[level] and self.peek(1) != "=":
+            result = BinOp([result, self.next(), self.binary(level + 1)])
+
+        return result
+
+    def factor(self):
+        match self.peek():
+            case "-" | "+" | "~" | "&":
+                return UnaryOp([self.next(), self.factor()])
+            case "<":
+                parts = [self.next()]
+                while self.peek() != ">":
+                    parts.append(self.next())
+
+                parts.append(self.next())
+                parts.append(self.factor())
+                return Cast(parts)
+
+        return self.power()
+
+    def power(self):
+        if self.peek() == "await":
+              result = Await([self.next(), self.primary()])
+        else: result = self.primary()
+
+        if self.peek() == "**" and self.peek(1) != "=":
+            return BinOp([result, self.next(), self.factor()])
+
+        return result
+
+    def primary(self):
+        result = self.atom()
+        while True:
+            match self.peek():
+                case ".":
+                    if not isName(self.peek(1)): break
+                    result = Attribute([result, self.next(), self.next()])
+                case "(":
+                    result = Call([result] + self.arguments())
+                # the tokenizer inserts "()" after "super"
+                case "()":
+                    result = Call([result, self.next()])
+                case "[":
+                    result = Subscript([result] + self.bracketed("]", self.slice))
+                case _: break
+
+        return result
+
+    # the parts of a bracketed list of items, brackets included
+    def bracketed(self, close, item):
+        parts = [self.next()]
+        while self.peek() != close:
+            parts.append(item())
+            if self.peek() != ",": break
+            parts.append(self.next())
+
+        parts.append(self.expect(close))
+        return parts
+
+    def arguments(self):
+        parts = [self.next()]
+        if self.peek() == ")":
+            parts.append(self.next())
+            return parts
+
+        parts.append(self.argument())
+        # generator expressions can be passed without their own parentheses
+        if self.peek() in ("for", "async"):
+            parts[1] = Comprehension([parts[1]] + self.comprehension())
+            parts.append(self.expect(")"))
+            return parts
+
+        while self.peek() == ",":
+            parts.append(self.next())
+            if self.peek() == ")": break
+            parts.append(self.argument())
+
+        parts.append(self.expect(")"))
+        return parts
+
+    def argument(self):
+        if isName(self.peek()) and self.peek(1) == "=":
+            return Keyword([self.next(), self.next(), self.test()])
+
+        return self.item()
+
+    def slice(self):
+        parts = []
+        if self.peek() != ":":
+            value = self.item()
+            if self.peek() != ":": return value
+            parts.append(value)
+
+        parts.append(self.next())
+        if self.peek() not in (":", ",", "]"): parts.append(self.test())
+
+        if self.peek() == ":":
+            parts.append(self.next())
+            if self.peek() not in (",", "]"): parts.append(self.test())
+
+        return Slice(parts)
+
+    def comprehension(self):
+        parts = []
+        while self.peek() in ("for", "async"):
+            if self.peek() == "async": parts.append(self.next())
+
+            parts.append(self.expect("for"))
+            parts.append(self.targets())
+            parts.append(self.expect("in"))
+            parts.append(self.orTest())
+
+            while self.peek() == "if":
+                parts.append(self.next())
+                parts.append(self.orTest())
+
+        return parts
+
+    # the names a "for" clause assigns to, which end before "in"
+    def targets(self):
+        parts = [self.target()]
+        while self.peek() == ",":
+            parts.append(self.next())
+            if self.peek() == "in": break
+            parts.append(self.target())
+
+        if len(parts) == 1: return parts[0]
+        return Tuple(parts)
+
+    def target(self):
+        if self.peek() == "*":
+            return Starred([self.next(), self.bitwiseOr()])
+
+        return self.bitwiseOr()
+
+    def atom(self):
+        tok = self.peek()
+
+        if tok == "(": return self.parenthesized()
+        if tok == "[": return self.display("]", List)
+        if tok == "{": return self.braced()
+
+        if isNumber(tok): return self.number()
+        if tok == ".":
+            if self.peek(1) == "." and self.peek(2) == ".":
+                return Constant([self.next(), self.next(), self.next()])
+            if isNumber(self.peek(1)):
+                return Constant([self.next(), self.next()])
+
+            raise ParseError()
+
+        if isString(tok):
+            parts = [self.next()]
+            while isString(self.peek()):
+                parts.append(self.next())
+
+            return Constant(parts)
+
+        if tok in ("True", "False", "None"): return Constant([self.next()])
+        if isName(tok):                      return Name([self.next()])
+
+        raise ParseError()
+
+    def number(self):
+        parts = [self.next()]
+        if parts[0][:2].lower() in NUMBER_PREFIXES: return Constant(parts)
+
+        if self.peek() == ".":
+            after = self.peek(1)
+            if isNumber(after) or isExponent(after):
+                parts.append(self.next())
+                parts.append(self.next())
+            elif not isName(after):
+                parts.append(self.next())
+
+        # the sign of an exponent, like in "1e-3", is a token of its own
+        last = parts[-1]
+        if (last[-1] in "eE" and last[:-1].replace("_", "").isdigit()) or last in ("e", "E"):
+            if self.peek() in ("+", "-") and isNumber(self.peek(1)):
+                parts.append(self.next())
+                parts.append(self.next())
+
+        return Constant(parts)
+
+    def parenthesized(self):
+        parts = [self.next()]
+        if self.peek() == ")":
+            parts.append(self.next())
+            return Tuple(parts)
+
+        if self.peek() == "yield":
+              parts.append(self.yieldExpression())
+        else: parts.append(self.item())
+
+        if self.peek() in ("for", "async"):
+            parts += self.comprehension()
+            parts.append(self.expect(")"))
+            return Comprehension(parts)
+
+        if self.peek() == ")":
+            parts.append(self.next())
+            return Group(parts)
+
+        while self.peek() == ",":
+            parts.append(self.next())
+            if self.peek() == ")": break
+            parts.append(self.item())
+
+        parts.append(self.expect(")"))
+        return Tuple(parts)
+
+    # lists and sets
+    def display(self, close, type_):
+        parts = [self.next()]
+        if self.peek() == close:
+            parts.append(self.next())
+            return type_(parts)
+
+        parts.append(self.item())
+        if self.peek() in ("for", "async"):
+            parts += self.comprehension()
+            parts.append(self.expect(close))
+            return Comprehension(parts)
+
+        while self.peek() == ",":
+            parts.append(self.next())
+            if self.peek() == close: break
+            parts.append(self.item())
+
+        parts.append(self.expect(close))
+        return type_(parts)
+
+    def braced(self):
+        if self.peek(1) == "}":
+            return Dict([self.next(), self.next()])
+
+        # sets start like any other expression, dicts with "key:" or "**"
+        start = self.pos
+        self.next()
+        if self.peek() != "**":
+            self.item()
+            if self.peek() != ":":
+                self.pos = start
+                return self.display("}", Set)
+
+        self.pos = start
+        parts    = [self.next(), self.dictItem()]
+        if self.peek() in ("for", "async"):
+            parts += self.comprehension()
+            parts.append(self.expect("}"))
+            return Comprehension(parts)
+
+        while self.peek() == ",":
+            parts.append(self.next())
+            if self.peek() == "}": break
+            parts.append(self.dictItem())
+
+        parts.append(self.expect("}"))
+        return Dict(parts)
+
+    def dictItem(self):
+        if self.peek() == "**":
+            return Starred([self.next(), self.bitwiseOr()])
+
+        key = self.test()
+        return DictItem([key, self.expect(":"), self.test()])
+
+# parses the strings of the tokens of an expression or a simple statement.
+# returns a Raw node when they can't be parsed
+def parse(strings):
+    parser = Parser(strings)
+
+    try:
+        result = parser.statement()
+        if parser.pos == len(strings): return result
+    except (ParseError, RecursionError):
+        pass
+
+    return Raw(list(strings))
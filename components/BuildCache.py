@@ -0,0 +1,305 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os, sys, json, marshal, shutil, hashlib, tempfile, sysconfig
+from contextlib          import redirect_stdout
+from components.utils     import MutableStringBuffer, getDefaultCacheDir
+from components.Compiler  import VERSION
+from components.SourceMap import SourceMap
+
+MAX_MANIFEST_ENTRIES = 16
+
+# compiler state that can be changed by the program itself (through $args and $pdefine)
+COMPILER_STATE = ("static", "noCompile", "compileOnly", "notes", "module", "typeMode", "containerChecks", "sourceMap", "elideChecks", "reportChecks", "countChecks")
+
+def hashBytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hashObject(obj):
+    return hashBytes(json.dumps(obj, sort_keys = True).encode())
+
+# directories are dependencies through $includeDirectory, so only their listing matters
+def hashPath(path):
+    try:
+        if os.path.isdir(path):
+            return hashBytes("\n".join(sorted(os.listdir(path))).encode())
+
+        with open(path, "rb") as file:
+            return hashBytes(file.read())
+    except OSError:
+        return None
+
+def getCompilerFingerprint():
+    components = os.path.dirname(os.path.abspath(__file__))
+
+    stats = []
+    for file in sorted(os.listdir(components)):
+        if file.endswith(".py"):
+            stat = os.stat(os.path.join(components, file))
+            stats.append((file, stat.st_size, stat.st_mtime_ns))
+
+    return [VERSION, stats]
+
+# prints to a stream while keeping a copy of the output
+class TeeWriter:
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = MutableStringBuffer()
+
+    def write(self, text):
+        self.buffer += text
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+# content-addressed cache of compiled programs and built extension modules.
+# programs are looked up in two steps: a manifest, keyed by the main file and the compiler
+# configuration, lists the include sets seen for it, and each include set, along with the
+# hashes of its files, addresses an entry
+class BuildCache:
+    def __init__(self, directory = None):
+        self.directory   = getDefaultCacheDir() if directory is None else directory
+        self.fingerprint = None
+
+    def __getPath(self, kind, key):
+        return os.path.join(self.directory, kind, key[:2], key)
+
+    def __read(self, path):
+        try:
+            with open(path, "r", encoding = "utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def __write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        fd, tmp = tempfile.mkstemp(dir = os.path.dirname(path))
+        with os.fdopen(fd, "w", encoding = "utf-8") as file:
+            json.dump(data, file)
+        os.replace(tmp, path)
+
+    # entries are written to a temporary directory first, so concurrent builds never see partial entries
+    def __writeEntry(self, key, files, meta):
+        path = self.__getPath("objects", key)
+        if os.path.exists(path): return
+
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        tmp = tempfile.mkdtemp(dir = os.path.dirname(path))
+
+        for name, content in files.items():
+            with open(os.path.join(tmp, name), "wb") as file:
+                file.write(content)
+
+        with open(os.path.join(tmp, "meta.json"), "w", encoding = "utf-8") as file:
+            json.dump(meta, file)
+
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors = True)
+
+    def getKey(self, compiler, fileIn, top, pyTop, kind):
+        if self.fingerprint is None:
+            self.fingerprint = getCompilerFingerprint()
+
+        return hashObject([
+            self.fingerprint, kind, top, pyTop,
+            hashPath(fileIn), compiler.preConsts,
+            {name: getattr(compiler, name) for name in COMPILER_STATE}
+        ])
+
+    def lookup(self, key):
+        manifest = self.__read(self.__getPath("manifests", key))
+        if manifest is None: return None
+
+        for deps in manifest:
+            if all(hashPath(path) == digest for path, digest in deps.items()):
+                path = self.__getPath("objects", hashObject([key, deps]))
+                meta = self.__read(os.path.join(path, "meta.json"))
+
+                if meta is not None:
+                    return path, meta
+
+        return None
+
+    def store(self, key, compiler, files, log):
+        deps = {path: hashPath(path) for path in sorted(compiler.dependencies)}
+        if None in deps.values(): return
+
+        meta = {
+            "log":       log,
+            "imports":   compiler.imports,
+            "preConsts": compiler.preConsts,
+            "state":     {name: getattr(compiler, name) for name in COMPILER_STATE}
+        }
+
+        try:
+            self.__writeEntry(hashObject([key, deps]), files, meta)
+
+            manifestPath = self.__getPath("manifests", key)
+            manifest = self.__read(manifestPath)
+            if manifest is None: manifest = []
+
+            if deps not in manifest:
+                manifest.insert(0, deps)
+                self.__write(manifestPath, manifest[:MAX_MANIFEST_ENTRIES])
+        except OSError as e:
+            print("warning: could not write to the build cache:", e)
+
+    # looks a program up, and restores the compiler to the state compiling it would leave it in
+    def __restore(self, compiler, key, file):
+        found = self.lookup(key)
+        if found is None: return None
+
+        path, meta = found
+        try:
+            with open(os.path.join(path, file), "rb") as txt:
+                content = txt.read()
+
+            if compiler.sourceMap:
+                with open(os.path.join(path, "map"), "rb") as txt:
+                    compiler.lastSourceMap = SourceMap.loads(txt.read())
+        except OSError:
+            return None
+
+        print(meta["log"], end = "")
+
+        compiler.hadError  = False
+        compiler.imports   = meta["imports"]
+        compiler.preConsts = meta["preConsts"]
+        for name, value in meta["state"].items():
+            setattr(compiler, name, value)
+
+        return content
+
+    def __getFiles(self, compiler, files):
+        if compiler.sourceMap:
+            files["map"] = compiler.lastSourceMap.dumps().encode("utf-8")
+
+        return files
+
+    def __compile(self, compiler, fileIn, top, pyTop):
+        tee = TeeWriter(sys.stdout)
+        with redirect_stdout(tee):
+            result = compiler.compileFile(fileIn, top, pyTop)
+
+        return result, str(tee.buffer)
+
+    def compile(self, compiler, fileIn, fileOut, top, pyTop):
+        key     = self.getKey(compiler, fileIn, top, pyTop, "program")
+        content = self.__restore(compiler, key, "program")
+
+        if content is None:
+            result, log = self.__compile(compiler, fileIn, top, pyTop)
+            if result == "": return False
+
+            content = result.encode("utf-8")
+            if compiler.reproducible:
+                self.store(key, compiler, self.__getFiles(compiler, {"program": content}), log)
+
+        with open(fileOut, "wb") as txt:
+            txt.write(content)
+
+        if compiler.sourceMap:
+            compiler.lastSourceMap.write(fileOut + ".map")
+
+        return True
+
+    # code objects for directly running programs. marshal's format depends on the Python version
+    def compileCode(self, compiler, fileIn, top, filename = "<string>"):
+        key     = self.getKey(compiler, fileIn, top, None, ["code", sys.version, filename])
+        content = self.__restore(compiler, key, "code")
+        if content is not None:
+            return marshal.loads(content)
+
+        result, log = self.__compile(compiler, fileIn, top, None)
+        if result == "": return None
+
+        code = compile(result, filename, "exec")
+        if compiler.reproducible:
+            self.store(key, compiler, self.__getFiles(compiler, {"code": marshal.dumps(code)}), log)
+
+        return code
+
+    # extension modules only depend on the Cython source and on the build environment
+    def getExtensionKey(self, pyx, debug):
+        from Cython import __version__ as cythonVersion
+
+        with open(pyx, "rb") as file:
+            source = hashBytes(file.read())
+
+        return hashObject([
+            source, os.path.basename(pyx), debug, cythonVersion,
+            sys.version, sysconfig.get_config_var("EXT_SUFFIX")
+        ])
+
+    def getExtensionFiles(self, pyx, debug):
+        name  = os.path.splitext(pyx)[0]
+        files = [name + sysconfig.get_config_var("EXT_SUFFIX")]
+        if debug: files.append(name + ".html")
+        return files
+
+    def restoreExtension(self, pyx, debug):
+        path = self.__getPath("objects", self.getExtensionKey(pyx, debug))
+        if not os.path.exists(os.path.join(path, "meta.json")): return False
+
+        directory = os.path.dirname(pyx)
+        for file in os.listdir(path):
+            if file != "meta.json":
+                shutil.copyfile(os.path.join(path, file), os.path.join(directory, file))
+
+        return True
+
+    def storeExtension(self, pyx, debug):
+        files = {}
+        for file in self.getExtensionFiles(pyx, debug):
+            if os.path.exists(file):
+                with open(file, "rb") as ext:
+                    files[os.path.basename(file)] = ext.read()
+
+        try:
+            self.__writeEntry(self.getExtensionKey(pyx, debug), files, {})
+        except OSError as e:
+            print("warning: could not write to the build cache:", e)
+
+    # compiled C objects, keyed by their source and the C compiler configuration
+    def restoreObject(self, key, obj):
+        path = os.path.join(self.__getPath("objects", key), "object")
+        if not os.path.exists(path): return False
+
+        shutil.copyfile(path, obj)
+        return True
+
+    def storeObject(self, key, obj):
+        with open(obj, "rb") as file:
+            content = file.read()
+
+        try:
+            self.__writeEntry(key, {"object": content}, {})
+        except OSError as e:
+            print("warning: could not write to the build cache:", e)
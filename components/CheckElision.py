@@ -0,0 +1,710 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# removes the type checks of values whose type can be proven at compile time (disabled by --keep-checks).
+# types are inferred for literals, operators on typed variables, builtins with known results and calls to
+# functions with a declared return type. a variable is only trusted to hold its declared type when every
+# assignment to it in its scope is checked or keeps the type, and it's not a parameter or a loop variable.
+# a call is only trusted to return the declared type of a plain function that can only end through a checked return
+
+import ast, re
+from components.IR import *
+
+NUMERIC_TYPES  = ("bool", "int", "float", "complex")
+# forced types copy values of these types, so in force mode their checks are only removed for new objects
+MUTABLE_TYPES  = ("list", "dict", "set", "bytearray")
+ELIDABLE_TYPES = NUMERIC_TYPES + MUTABLE_TYPES + ("str", "bytes", "tuple", "range")
+
+ASSIGNMENT_OPS = ("=", "+=", "-=", "*=", "/=", "//=", "%=", "**=", "&=", "|=", "^=", ">>=", "<<=", "@=")
+COMPARISON_OPS = ("<", ">", "<=", ">=", "==", "!=")
+
+BUILTIN_RESULTS = {
+    "len": "int", "range": "range", "int": "int", "float": "float", "str": "str", "bool": "bool",
+    "bytes": "bytes", "complex": "complex", "tuple": "tuple", "ord": "int", "chr": "str", "repr": "str",
+    "ascii": "str", "hex": "str", "oct": "str", "bin": "str", "hash": "int", "id": "int", "format": "str",
+    "isinstance": "bool", "issubclass": "bool", "callable": "bool", "hasattr": "bool"
+}
+FRESH_BUILTINS = {"list": "list", "dict": "dict", "set": "set", "bytearray": "bytearray", "sorted": "list"}
+STR_METHODS    = {
+    "join": "str", "format": "str", "upper": "str", "lower": "str", "strip": "str", "lstrip": "str",
+    "rstrip": "str", "replace": "str", "title": "str", "capitalize": "str", "zfill": "str", "center": "str",
+    "ljust": "str", "rjust": "str", "count": "int", "find": "int", "index": "int", "startswith": "bool",
+    "endswith": "bool", "isdigit": "bool", "isalpha": "bool", "isalnum": "bool", "isspace": "bool"
+}
+
+# names bound by generated code that isn't made of nodes ("as" clauses, imports and assignment expressions)
+BINDING_REGEX = re.compile(r"\bas\s+(\w+)|(\w+)\s*:=|\bimport\s+([\w ,.]+)")
+# assignments in lines of raw code that can't be parsed, like Cython declarations
+ASSIGNED_REGEX = re.compile(r"(\w+)\s*(?:[-+*/%&|^@]|//|\*\*|<<|>>)?=(?!=)")
+# raw code that can bind names
+RAW_BINDINGS = ("=", "for", "as", "import", "global", "nonlocal", "def", "class")
+YIELD_REGEX  = re.compile(r"\byield\b")
+
+class InferenceError(Exception): pass
+
+class Scope:
+    def __init__(self, parent = None):
+        self.parent     = parent
+        self.declared   = {}
+        self.functions  = {}
+        self.unreliable = set()
+
+    def find(self, name):
+        scope = self
+        while scope is not None:
+            if name in scope.unreliable or name in scope.declared or name in scope.functions:
+                return scope
+            scope = scope.parent
+
+        return None
+
+    # the type a variable is known to hold, if any
+    def getType(self, name):
+        scope = self.find(name)
+        if scope is None or name in scope.unreliable or name not in scope.declared: return None
+
+        types = scope.declared[name]
+        if len(types) != 1: return None
+        return next(iter(types))
+
+    def getFunction(self, name):
+        scope = self.find(name)
+        if scope is None or name in scope.unreliable or name in scope.declared: return None
+        return scope.functions[name]
+
+# infers the type of an expression as a (type, new object) pair, or None when it's unknown
+class Expression:
+    def __init__(self, tokens, scope, types):
+        self.tokens = tokens
+        self.scope  = scope
+        self.types  = types
+        self.pos    = 0
+
+    def infer(self):
+        try:
+            # most checked values are a single name or literal
+            if len(self.tokens) == 1: return self.atom()[0]
+
+            result = self.ternary()
+            if self.pos != len(self.tokens): return None
+            return result
+        except (InferenceError, IndexError):
+            return None
+
+    def peek(self, offset = 0):
+        if self.pos + offset < len(self.tokens):
+            return self.tokens[self.pos + offset]
+        return None
+
+    def next(self):
+        self.pos += 1
+        return self.tokens[self.pos - 1]
+
+    def expect(self, tok):
+        if self.next() != tok: raise InferenceError()
+
+    # moves past a bracketed section, returning its tokens
+    def skip(self):
+        start = self.pos
+        depth = 1
+        while depth != 0:
+            tok = self.next()
+            if   tok in ("(", "[", "{"): depth += 1
+            elif tok in (")", "]", "}"): depth -= 1
+
+        return self.tokens[start:self.pos - 1]
+
+    def getVariable(self, name):
+        type_ = self.scope.getType(name)
+        if type_ is None or self.types.get(name) != type_: return None
+        return type_, False
+
+    def call(self, name):
+        if name in self.types:
+            if self.types[name] != "dynamic": return None
+
+            type_ = self.scope.getFunction(name)
+            if type_ is None or type_ not in ELIDABLE_TYPES: return None
+            return type_, False
+
+        # names the compiler doesn't know about can only be builtins
+        if self.scope.find(name) is not None: return None
+        if name in BUILTIN_RESULTS: return BUILTIN_RESULTS[name], False
+        if name in FRESH_BUILTINS:  return FRESH_BUILTINS[name], True
+        return None
+
+    def ternary(self):
+        result = self.logical("or")
+        if self.peek() == "if":
+            self.next()
+            self.logical("or")
+            self.expect("else")
+            result = same(result, self.ternary())
+
+        return result
+
+    def logical(self, op):
+        result = self.logical("and") if op == "or" else self.negation()
+        while self.peek() == op:
+            self.next()
+            result = same(result, self.logical("and") if op == "or" else self.negation())
+
+        return result
+
+    def negation(self):
+        if self.peek() == "not":
+            self.next()
+            self.negation()
+            return "bool", False
+
+        return self.comparison()
+
+    def comparison(self):
+        result = self.bitwise()
+        first  = True
+        known  = result is not None
+        while True:
+            tok = self.peek()
+            if tok in COMPARISON_OPS:
+                self.next()
+                # comparisons can be overloaded to return anything, so only those between builtins are known
+                known = known and self.bitwise() is not None
+            elif tok == "in" or tok == "is" or (tok == "not" and self.peek(1) == "in"):
+                self.next()
+                if self.peek() in ("in", "not"): self.next()
+                self.bitwise()
+            else: break
+
+            first = False
+
+        if first: return result
+        if known: return "bool", False
+        return None
+
+    def bitwise(self, ops = ("|", "^", "&")):
+        if len(ops) == 0: return self.shift()
+
+        result = self.bitwise(ops[1:])
+        while self.peek() == ops[0]:
+            self.next()
+            result = binary(ops[0], result, self.bitwise(ops[1:]))
+
+        return result
+
+    def shift(self):
+        result = self.arithmetic()
+        while self.peek() in ("<<", ">>"):
+            self.next()
+            result = binary("<<", result, self.arithmetic())
+
+        return result
+
+    def arithmetic(self):
+        result = self.term()
+        while self.peek() in ("+", "-"):
+            op = self.next()
+            result = binary(op, result, self.term())
+
+        return result
+
+    def term(self):
+        result = self.unary()
+        while self.peek() in ("*", "/", "//", "%", "@"):
+            op = self.next()
+            result = binary(op, result, self.unary())
+
+        return result
+
+    def unary(self):
+        tok = self.peek()
+        if tok in ("-", "+", "~"):
+            self.next()
+            value = self.unary()
+            if value is None: return None
+
+            if value[0] in ("bool", "int"):           return "int", False
+            if value[0] in NUMERIC_TYPES and tok != "~": return value[0], False
+            return None
+
+        return self.power()
+
+    def power(self):
+        result = self.primary()
+        if self.peek() == "**":
+            self.next()
+            literal = isInteger(self.peek()) and self.peek(1) not in (".", "(", "[", "**")
+            exponent = self.unary()
+
+            if result is None or exponent is None: return None
+            # negative exponents turn integers into floats
+            if result[0] in ("bool", "int") and literal:            return "int", False
+            if result[0] == "float" and exponent[0] in ("bool", "int"): return "float", False
+            return None
+
+        return result
+
+    def primary(self):
+        result, name = self.atom()
+
+        while True:
+            tok = self.peek()
+            if tok == "(":
+                self.next()
+                self.skip()
+                result = None if name is None else self.call(name)
+            elif tok == "[":
+                self.next()
+                self.skip()
+                result = ("str", False) if result is not None and result[0] == "str" else None
+            elif tok == ".":
+                self.next()
+                attribute = self.next()
+                if not attribute.isidentifier(): raise InferenceError()
+
+                if self.peek() == "(" and result is not None and result[0] == "str" and attribute in STR_METHODS:
+                    self.next()
+                    self.skip()
+                    result = STR_METHODS[attribute], False
+                else: result = None
+            else: break
+
+            name = None
+
+        return result
+
+    def number(self, tok):
+        lower = tok.lower()
+        if lower.startswith(("0x", "0o", "0b")): return "int", False
+
+        # exponents with a sign are split in several tokens
+        if lower[-1] == "e" and self.peek() in ("+", "-"):
+            self.next()
+            lower += self.next().lower()
+
+        if lower.endswith("j"): return "complex", False
+        if "e" in lower:        return "float", False
+        return "int", False
+
+    def atom(self):
+        tok = self.next()
+
+        if tok == "(":
+            inner = self.skip()
+            if len(inner) == 0: return ("tuple", True), None
+
+            depth = 0
+            for item in inner:
+                if   item in ("(", "[", "{"): depth += 1
+                elif item in (")", "]", "}"): depth -= 1
+                elif depth == 0 and item == ",": return ("tuple", True), None
+                elif depth == 0 and item == "for": return None, None
+
+            return Expression(inner, self.scope, self.types).infer(), None
+        if tok == "[":
+            self.skip()
+            return ("list", True), None
+        if tok == "{":
+            inner = self.skip()
+            if len(inner) == 0: return ("dict", True), None
+
+            depth = 0
+            for item in inner:
+                if   item in ("(", "[", "{"): depth += 1
+                elif item in (")", "]", "}"): depth -= 1
+                elif depth == 0 and item in (":", "**"): return ("dict", True), None
+
+            return ("set", True), None
+
+        quote = min((idx for idx in (tok.find('"'), tok.find("'")) if idx != -1), default = -1)
+        if quote != -1:
+            # adjacent strings are joined together
+            while self.peek() is not None and ('"' in self.peek() or "'" in self.peek()):
+                self.next()
+
+            if "b" in tok[:quote].lower(): return ("bytes", False), None
+            return ("str", False), None
+
+        if tok[0].isdigit() or (tok == "." and self.peek() is not None and self.peek()[0].isdigit()):
+            if tok == ".":
+                self.number(self.next())
+                return ("float", False), None
+
+            if self.peek() == ".":
+                self.next()
+                # "1." followed by something that isn't a number is an attribute of an integer
+                if self.peek() is None or not self.peek()[0].isdigit(): raise InferenceError()
+
+                result = self.number(self.next())
+                if result[0] == "int": result = "float", False
+                return result, None
+
+            return self.number(tok), None
+
+        match tok:
+            case "True" | "False": return ("bool", False), None
+            case "None":           return ("NoneType", False), None
+
+        if not tok.isidentifier() or tok in ("not", "lambda", "await", "yield", "if", "else", "for", "in", "is", "and", "or"):
+            raise InferenceError()
+
+        return self.getVariable(tok), tok
+
+def isInteger(tok):
+    return tok is not None and tok.isdigit()
+
+def same(first, second):
+    if first is None or second is None or first[0] != second[0]: return None
+    return first[0], first[1] and second[1]
+
+def binary(op, left, right):
+    # formatting works with any value
+    if op == "%" and left is not None and left[0] in ("str", "bytes"): return left[0], False
+    if left is None or right is None: return None
+
+    left, right = left[0], right[0]
+    if left in NUMERIC_TYPES and right in NUMERIC_TYPES:
+        rank = max(NUMERIC_TYPES.index(left), NUMERIC_TYPES.index(right), 1)
+
+        match op:
+            case "+" | "-" | "*":
+                return NUMERIC_TYPES[rank], False
+            case "/":
+                return ("complex" if rank == 3 else "float"), False
+            case "//" | "%":
+                if rank == 3: return None
+                return NUMERIC_TYPES[rank], False
+            case "|" | "^" | "&" | "<<":
+                if rank != 1: return None
+                if left == right == "bool" and op != "<<": return "bool", False
+                return "int", False
+
+        return None
+
+    match op:
+        case "+":
+            if left == right and left in ("str", "bytes", "tuple"): return left, False
+            if left == right == "list":                               return "list", True
+        case "*":
+            if right in ("bool", "int"): sequence = left
+            elif left in ("bool", "int"): sequence = right
+            else: return None
+
+            if sequence in ("str", "bytes", "tuple"): return sequence, False
+            if sequence == "list":                    return "list", True
+        case "-" | "|" | "^" | "&":
+            if left == right == "set":                return "set", True
+            if left == right == "dict" and op == "|": return "dict", True
+
+    return None
+
+class CheckElision(Pass):
+    name = "check elision"
+
+    def __init__(self):
+        self.removed = 0
+        self.total   = 0
+
+    def run(self, program, compiler):
+        self.removed = 0
+        self.total   = 0
+        if not compiler.elideChecks: return
+
+        self.copies = compiler.typeMode == "force"
+        self.scopes = {}
+        # assignments that aren't checked for some of their names, with the scope they're in
+        self.unchecked = []
+        self.globals   = set()
+        self.__collect(program, Scope())
+        self.__resolveUnchecked()
+        self.__elide(program, self.scopes[program])
+
+        if compiler.profile is not None:
+            compiler.profile.count("type checks elided", self.removed)
+
+        if compiler.reportChecks:
+            print(f"type checks: {self.removed} of {self.total} removed")
+
+    def __bind(self, scope, text):
+        if "as" not in text and ":=" not in text and "import" not in text: return
+
+        for match in BINDING_REGEX.finditer(text):
+            if match.group(3) is None:
+                scope.unreliable.add(match.group(1) or match.group(2))
+            else:
+                for name in match.group(3).split(","):
+                    name = name.strip().split(".")[0].split(" ")[0]
+                    if name.isidentifier(): scope.unreliable.add(name)
+
+    # names declared "global" can be changed by any function, and "nonlocal" ones by nested functions
+    def __declare(self, scope, keyword, names):
+        if keyword == "global":
+            self.globals.update(names)
+            return
+
+        for name in names:
+            scope.unreliable.add(name)
+
+            owner = None if scope.parent is None else scope.parent.find(name)
+            if owner is not None: owner.unreliable.add(name)
+
+    # names bound by code that isn't made of nodes, like embedded Python, $nocompile blocks and other
+    # generated code. functions and classes defined in block headers are the compiler's own, and are left alone
+    def __bindRaw(self, scope, text, header):
+        if not any(word in text for word in RAW_BINDINGS): return
+
+        for line in text.split("\n"):
+            code = line.strip()
+            if code == "" or not any(word in code for word in RAW_BINDINGS): continue
+            if code.endswith(":"): code += "pass"
+
+            try:
+                tree = ast.parse(code)
+            except SyntaxError:
+                self.__bind(scope, line)
+                scope.unreliable.update(match.group(1) for match in ASSIGNED_REGEX.finditer(line))
+                continue
+
+            for node in ast.walk(tree):
+                match node:
+                    case ast.Name(ctx = ast.Store()):
+                        scope.unreliable.add(node.id)
+                    case ast.Global() | ast.Nonlocal():
+                        self.__declare(scope, "global" if type(node) is ast.Global else "nonlocal", node.names)
+                    case ast.Import() | ast.ImportFrom():
+                        for alias in node.names:
+                            # star imports can replace builtins
+                            if alias.name == "*":
+                                  scope.unreliable.update(BUILTIN_RESULTS, FRESH_BUILTINS)
+                            else: scope.unreliable.add(alias.asname or alias.name.split(".")[0])
+                    case ast.FunctionDef() | ast.AsyncFunctionDef() | ast.ClassDef():
+                        if not header: scope.unreliable.add(node.name)
+                    case ast.ExceptHandler() | ast.MatchAs() | ast.MatchStar():
+                        if node.name is not None: scope.unreliable.add(node.name)
+                    case ast.MatchMapping():
+                        if node.rest is not None: scope.unreliable.add(node.rest)
+
+    # the header of a function, from the line it's defined on up to the block, and the node before it
+    def __getHeader(self, body, idx):
+        parts = []
+        idx  -= 1
+        while idx >= 0:
+            node = body[idx]
+            if type(node) is str:
+                if node.endswith("\n") and len(parts) != 0: break
+                parts.append(node)
+            elif type(node) is not Mark: break
+
+            idx -= 1
+
+        before = body[idx] if idx >= 0 else None
+        return "".join(reversed(parts)), before
+
+    # nodes of a function that aren't in nested functions or classes
+    def __getOwnNodes(self, block):
+        for node in block.body:
+            yield node
+            if type(node) is Block and node.kind not in ("function", "class"):
+                yield from self.__getOwnNodes(node)
+
+    # whether every path through the body ends in a return or raises. an "if" chain only does when it has an "else"
+    def __alwaysReturns(self, body):
+        # whether every branch of the current "if" chain returns so far, or None outside of one
+        chain = None
+        last  = False
+        for node in body:
+            nodeType = type(node)
+            if nodeType is Mark: continue
+
+            if nodeType is Return: return True
+            if nodeType is Statement:
+                if node.keyword == "raise": return True
+
+                if node.keyword == "if" or (node.keyword in ("elif", "else") and chain is not None):
+                    # headers of empty blocks end with "pass"
+                    chain = node.end == ":\n" and (node.keyword == "if" or chain)
+                    last  = node.keyword == "else"
+                    continue
+            elif nodeType is Block and chain is not None:
+                chain = chain and self.__alwaysReturns(node.body)
+                if last and chain: return True
+                continue
+
+            chain = None
+            last  = False
+
+        return False
+
+    # calls are trusted to return the declared type of functions without decorators, that aren't async
+    # or generators, and that only end through returns that check their value (or are converted by Cython)
+    def __isTrusted(self, block, idx, function):
+        header, before = self.__getHeader(block.body, idx)
+        if type(before) is Statement and before.keyword == "@": return False
+        if type(before) is str and before.lstrip().startswith("@"): return False
+        if "async" in header or any(line.lstrip().startswith("@") for line in header.split("\n")): return False
+
+        converted = header.lstrip().startswith(("cpdef", "cdef"))
+        for node in self.__getOwnNodes(function):
+            nodeType = type(node)
+
+            if nodeType is Return:
+                if node.value is None or (node.check is None and not converted): return False
+            elif nodeType is Statement:
+                if node.keyword == "yield" or (node.value is not None and YIELD_REGEX.search(str(node.value))):
+                    return False
+            elif nodeType in (Assignment, Declaration):
+                text = node.text if nodeType is Assignment else str(node.value)
+                if YIELD_REGEX.search(text): return False
+            elif nodeType is str:
+                if YIELD_REGEX.search(node): return False
+
+        return self.__alwaysReturns(function.body)
+
+    # finds what's declared in every scope
+    def __collect(self, block, scope):
+        self.scopes[block] = scope
+
+        body = block.body
+        for idx, node in enumerate(body):
+            nodeType = type(node)
+
+            if nodeType is str:
+                header = idx + 2 < len(body) and body[idx + 1] == "\n" and type(body[idx + 2]) is Block
+                self.__bindRaw(scope, node, header)
+            elif nodeType is Declaration:
+                if node.name in scope.declared:
+                      scope.declared[node.name].add(node.type_)
+                else: scope.declared[node.name] = {node.type_}
+
+                if node.glob:
+                    scope.unreliable.add(node.name)
+                    self.globals.add(node.name)
+
+                if node.value is not None:
+                    if type(node.value) is Check:
+                        self.__bind(scope, str(node.value.value))
+                    else:
+                        self.__bind(scope, str(node.value))
+
+                        # unchecked declarations can hold anything
+                        if not node.cdef: scope.unreliable.add(node.name)
+            elif nodeType is Assignment:
+                self.__bind(scope, node.text)
+
+                checked = {check.value for check in node.checks}
+                if any(name not in checked for name in node.names):
+                    self.unchecked.append((node, scope, checked))
+            elif nodeType in (Return, Statement):
+                if node.value is not None: self.__bind(scope, str(node.value))
+
+                if nodeType is Statement and node.keyword in ("global", "nonlocal") and node.value is not None:
+                    self.__declare(scope, node.keyword, [name for name in node.value.strings if name.isidentifier()])
+            elif nodeType is For:
+                self.__bind(scope, str(node.iterable))
+            elif nodeType is Block:
+                match node.kind:
+                    case "function":
+                        if node.name is not None and block.kind != "class":
+                            type_ = node.type_ if self.__isTrusted(block, idx, node) else None
+                            if node.name in scope.functions and scope.functions[node.name] != type_: type_ = None
+                            scope.functions[node.name] = type_
+
+                        # functions don't see the names defined in a class body
+                        parent = scope
+                        if block.kind == "class": parent = scope.parent
+
+                        inner = Scope(parent)
+                        if node.params is not None:
+                            inner.unreliable.update(param[0] for param in node.params)
+
+                        self.__collect(node, inner)
+                    case "class":
+                        self.__collect(node, Scope(scope))
+                    case _:
+                        if node.params is not None:
+                            scope.unreliable.update(node.params)
+
+                        self.__collect(node, scope)
+
+        # other functions could change names declared as globals
+        if block.kind == "module":
+            for scope in self.scopes.values():
+                scope.unreliable.update(self.globals)
+
+    # unchecked assignments that keep the type of the variable don't make it unreliable.
+    # marking a variable as unreliable can change what other assignments are known to do, so this repeats
+    def __resolveUnchecked(self):
+        changed = True
+        while changed:
+            changed = False
+
+            for node, scope, checked in self.unchecked:
+                for name in node.names:
+                    if name in checked or name in scope.unreliable: continue
+                    
+                    type_ = scope.getType(name)
+                    if type_ is None: continue
+
+                    value = self.__inferAssignment(node, name, scope)
+                    if value is None or value[0] != type_:
+                        scope.unreliable.add(name)
+                        changed = True
+
+    def __inferAssignment(self, node, name, scope):
+        tokens = node.tokens
+        if len(node.names) != 1 or len(tokens) < 3 or tokens[0] != name or tokens[1] not in ASSIGNMENT_OPS:
+            return None
+
+        value = Expression(tokens[2:], scope, node.types).infer()
+        if tokens[1] == "=": return value
+
+        # augmented assignments change lists and other mutable values in place, so they never create new objects
+        result = binary(tokens[1][:-1], Expression([name], scope, node.types).infer(), value)
+        if result is None: return None
+        return result[0], False
+
+    def __canElide(self, check, value):
+        if value is None or check.type_ not in ELIDABLE_TYPES or value[0] != check.type_: return False
+        return not self.copies or check.type_ not in MUTABLE_TYPES or value[1]
+
+    def __elide(self, block, scope):
+        for node in block.body:
+            nodeType = type(node)
+
+            if nodeType is Declaration:
+                if type(node.value) is Check:
+                    self.__count(node.value, Expression(node.value.tokens, scope, node.value.types).infer())
+            elif nodeType is Assignment:
+                for check in node.checks:
+                    self.__count(check, self.__inferAssignment(node, check.value, scope))
+            elif nodeType is Return:
+                if node.check is not None:
+                    self.__count(node.check, Expression(node.check.tokens, scope, node.check.types).infer())
+            elif nodeType is Block:
+                self.__elide(node, self.scopes[node])
+
+    def __count(self, check, value):
+        self.total += 1
+        if self.__canElide(check, value):
+            check.elided = True
+            self.removed += 1
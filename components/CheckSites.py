@@ -0,0 +1,58 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# tags every type check with the opal file and line it comes from (--count-checks),
+# so that the runtime can count calls and time for each of them and report them when the program exits
+
+from components.IR import *
+
+def getSite(origin):
+    if origin is None: return None
+
+    source, idx = origin
+    line = source.getLineNumber(idx)
+    if line < 1: return None
+
+    name = source.name if source.path is None else source.path
+    return f"{name}:{line}"
+
+class CheckSites(Pass):
+    name = "check sites"
+
+    def run(self, program, compiler):
+        if not compiler.countChecks: return
+
+        site = None
+        for node, _ in program.walk():
+            nodeType = type(node)
+
+            if nodeType is Mark:
+                site = getSite(node.origin)
+            elif nodeType is Declaration:
+                if type(node.value) is Check: node.value.site = site
+            elif nodeType is Assignment:
+                for check in node.checks:
+                    check.site = site
+            elif nodeType is Return:
+                if node.check is not None: node.check.site = site
@@ -22,11 +22,16 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from components.utils  import *
-from components.Tokens import *
-from importlib         import import_module
-from traceback         import format_exception
-import os
+from components.utils           import *
+from components.Tokens          import *
+from components.SourceMap       import SourceMap
+from components.IR              import *
+from components.ConstantFolding import ConstantFolding
+from components.CheckElision    import CheckElision
+from components.CheckSites      import CheckSites
+from importlib                  import import_module
+from traceback                  import format_exception
+import os, re, sys
 
 VERSION = (2024, 8, 4)
 SET_OPS = ("+=", "-=", "**=", "//=", "*=", "/=", "%=", "&=", "|=", "^=", ">>=", "<<=", "@=", "=")
@@ -50,9 +55,34 @@ CYTHON_TO_PY_TYPES = {
 
 COMPTIME_EXPORT_VARS = {}
 
+WORD_REGEX = re.compile(r"\w+")
+REPLACED_SPELLINGS = {v: k for k, v in REPLACE_TOKENS.items()}
+
 def encode(text):
     return "".join(map(lambda c: rf"\u{ord(c):04x}", text))
 
+# builds a regex matching every place in the source where a token could be one of the constants.
+# returns None if a constant can't be found this way
+def getConstsPattern(consts):
+    words = []
+    other = []
+    for name in consts:
+        if WORD_REGEX.fullmatch(name):
+            words.append(re.escape(name))
+
+            if name in REPLACED_SPELLINGS:
+                other.append(re.escape(REPLACED_SPELLINGS[name]))
+        elif name == "()":
+            # inserted after "super"
+            other.append(r"(?<!\w)super(?!\w)")
+        else:
+            return None
+        
+    if len(words) != 0:
+        other.append(r"(?<!\w)(?:" + "|".join(words) + r")(?!\w)")
+
+    return re.compile("|".join(other))
+
 def getArgsString(internalVars):
     argsList = []
     for name, type_, mode, default in internalVars:
@@ -372,9 +402,10 @@ class Compiler:
 
             isClass = translates == "class"
 
+            # like "inline", "$cdef" has no meaning when compiling to Python
             if self.nextCdef:
                 self.nextCdef = False
-                self.__error('$cdef can only be used on classes and optimizable functions', objType)
+                if self.__cy: self.__error('$cdef can only be used on classes and optimizable functions', objType)
             
             if isClass and argsString == "":
                 self.out += (" " * tabs) + translates + " " + name.tok + "(OpalObject):"
@@ -403,6 +434,7 @@ class Compiler:
             glob = self.nextGlobal
             self.nextGlobal = False
 
+            self.out.open(Block("class", name.tok))
             if self.nextStatic:
                 self.nextStatic = False
 
@@ -413,6 +445,7 @@ class Compiler:
             else:
                 self.__compiler(block, tabs + 1, loop, objNames)
 
+            self.out.close()
             self.__nameStack.pop()
 
             if glob:
@@ -432,6 +465,7 @@ class Compiler:
         glob = self.nextGlobal
         self.nextGlobal = False
 
+        self.out.open(Block("function", name.tok, retType, internalVars))
         if self.nextStatic:
             self.nextStatic = False
 
@@ -442,6 +476,7 @@ class Compiler:
         else:
             self.__compiler(block, tabs + 1, loop, intObjs)
 
+        self.out.close()
         self.__nameStack.pop()
 
         if glob:
@@ -509,10 +544,7 @@ class Compiler:
 
             if not variablesDef.isntFinished(): 
                 if type_ not in ("dynamic", "auto"):
-                    if cyType:
-                        self.out += (" " * tabs) + "cdef " + type_ + " " + name.tok + "\n"
-                    else:
-                        self.out += (" " * tabs) + name.tok + ":" + type_ + "\n"
+                    self.out += Declaration(tabs, name.tok, type_, cdef = cyType)
 
                 if type_ == "auto":
                     self.__error(f'auto-typed variables cannot be defined without being assigned', name) 
@@ -521,28 +553,18 @@ class Compiler:
                 
             next = variablesDef.next()
             if   next.tok == "=":
-                next, value = self.getUntilNotInExpr(",", variablesDef, True, False)
-                value = Tokens(value).join()
+                next, valueTokens = self.getUntilNotInExpr(",", variablesDef, True, False)
+                value = self.__getExpr(valueTokens)
 
                 if cyType:
-                    self.out += (" " * tabs) + "cdef " + type_ + " " + name.tok + "=" + value + "\n"
+                    self.out += Declaration(tabs, name.tok, type_, value, cdef = True)
+                elif unchecked or type_ in ("auto", "dynamic") or self.typeMode == "none":
+                    self.out += Declaration(tabs, name.tok, type_, value, glob)
                 else:
-                    if unchecked or type_ in ("auto", "dynamic") or self.typeMode == "none":
-                        if glob:
-                            self.out += (" " * tabs) + f"globals()['{name.tok}']=" + value + "\n"
-                        else:
-                            self.out += (" " * tabs) + name.tok + "=" + value + "\n"
-                    else:
-                        if glob:
-                            self.out += (" " * tabs) + f"globals()['{name.tok}']=_OPAL_CHECK_TYPE_({value},{type_})\n"
-                        else:
-                            self.out += (" " * tabs) + name.tok + f":{type_}=_OPAL_CHECK_TYPE_({value},{type_})\n"
+                    self.out += Declaration(tabs, name.tok, type_, self.__getCheck(value, type_, objNames), glob)
             elif next.tok == ",": 
                 if (not unchecked) and type_ not in ("dynamic", "auto"):
-                    if cyType:
-                        self.out += (" " * tabs) + "cdef " + type_ + " " + name.tok + "\n"
-                    else:
-                        self.out += (" " * tabs) + name.tok + ":" + type_ + "\n"
+                    self.out += Declaration(tabs, name.tok, type_, cdef = cyType)
 
                 next = variablesDef.next()
 
@@ -584,7 +606,9 @@ class Compiler:
             self.nextGlobal = False
             self.__error('"global" flag is not effective on inline boolean inversions', last)
     
-        self.out += (" " * tabs) + Tokens(var + [Token("="), Token("not")] + var).join() + "\n"
+        strings = self.__getStrings(var)
+        strings = strings + ["=", "not"] + strings
+        self.out += Assignment(tabs, Expr(strings), [Tokens(var).join()], self.__getTypes(strings, objNames))
 
         return loop, objNames
     
@@ -655,7 +679,7 @@ class Compiler:
         next = tokens.peek()
         if next.tok == ";":
             tokens.next()
-            self.out += (" " * tabs) + "return\n"
+            self.out += Return(tabs)
             return loop, objNames
         
         _, val = self.getUntilNotInExpr(";", tokens, True, advance = False)
@@ -665,16 +689,10 @@ class Compiler:
             unchecked = True
         else: unchecked = False
            
+        value = self.__getExpr(val)
         if cyFunction or unchecked or fnProperties[2] == "dynamic" or self.typeMode == "none":
-            self.out += (" " * tabs) + Tokens([Token("return")] + val).join() + "\n"
-        else:
-            self.out += (" " * tabs) + Tokens(
-                [
-                    Token("return"), Token("_OPAL_CHECK_TYPE_"), Token("("), Token("(")
-                ] + val + [
-                    Token(")"), Token(","), Token(fnProperties[2]), Token(")")
-                ]
-            ).join() + "\n"
+              self.out += Return(tabs, value)
+        else: self.out += Return(tabs, value, self.__getCheck(value, fnProperties[2], objNames, grouped = True))
 
         return loop, objNames
     
@@ -691,7 +709,7 @@ class Compiler:
             self.__error('cannot use "break" outside of a loop', keyw)
             return loop, objNames
 
-        self.out += (" " * tabs) + "break\n"
+        self.out += Statement(tabs, "break")
 
         return loop, objNames
     
@@ -713,7 +731,7 @@ class Compiler:
         elif isinstance(loop, CompLoop) and not loop.comp == "":
             self.out += (" " * tabs) + loop.comp
 
-        self.out += (" " * tabs) + "continue\n"
+        self.out += Statement(tabs, "continue")
 
         return loop, objNames
     
@@ -721,7 +739,7 @@ class Compiler:
         def fn(tokens : Tokens, tabs, loop, objNames):
             _, val = self.getUntilNotInExpr(";", tokens, True, advance = False)
 
-            self.out += (" " * tabs) + Tokens([Token(keyw)] + val).join() + "\n"
+            self.out += Statement(tabs, keyw, self.__getExpr(val))
 
             return loop, objNames
     
@@ -731,7 +749,7 @@ class Compiler:
         self.__flagsError("ignore", tokens.last())
 
         _, val = self.getUntilNotInExpr(";", tokens, True, advance = False)
-        self.out += (" " * tabs) + Tokens([Token("except")] + val + [Token(":pass")]).join() + "\n"
+        self.out += Statement(tabs, "except", self.__getExpr(val), ":pass\n")
         return loop, objNames
     
     def __unchecked(self, tokens : Tokens, tabs, loop, objNames):
@@ -815,13 +833,22 @@ class Compiler:
 
         return loop, objNames
     
+    # "super" is followed by the "()" the tokenizer inserts, so this is an expression statement
+    def __super(self, tokens : Tokens, tabs, loop, objNames):
+        _, val  = self.getUntilNotInExpr(";", tokens, True, advance = False)
+        strings = ["super"] + self.__getStrings(val)
+
+        self.out += Assignment(tabs, Expr(strings), [], self.__getTypes(strings, objNames))
+
+        return loop, objNames
+    
     def __printReturn(self, tokens : Tokens, tabs, loop, objNames):
         self.__flagsError("?", tokens.last())
 
-        _, val = self.getUntilNotInExpr(";", tokens, True, advance = False)
-        strVal = Tokens(val).join()
+        _, val  = self.getUntilNotInExpr(";", tokens, True, advance = False)
+        strings = ["_OPAL_PRINT_RETURN_", "("] + self.__getStrings(val) + [")"]
 
-        self.out += (" " * tabs) + "_OPAL_PRINT_RETURN_(" + strVal + ")\n"
+        self.out += Assignment(tabs, Expr(strings), [], self.__getTypes(strings, objNames))
 
         return loop, objNames
     
@@ -837,6 +864,29 @@ class Compiler:
 
         return loop, objNames
     
+    # opal modules are loaded through libs._importer, which is only installed by programs that need it
+    def __checkOpalModule(self, module):
+        if "HOME_DIR" not in self.preConsts: return False
+
+        parts = module.split(".")
+        if parts[0] in sys.stdlib_module_names: return False
+
+        home = eval(self.preConsts["HOME_DIR"])
+        # the output changes if an opal module gets created later
+        self.dependencies.add(os.path.abspath(home))
+
+        for i in range(1, len(parts) + 1):
+            path = os.path.join(home, *parts[:i])
+
+            if os.path.isfile(path + ".opal") or os.path.isfile(os.path.join(path, "__init__.opal")):
+                if not self.flags["importer"]:
+                    self.flags["importer"] = True
+                    self.headers += f'from libs._importer import install as _OPAL_INSTALL_IMPORTER_\n_OPAL_INSTALL_IMPORTER_({self.preConsts["HOME_DIR"]})\n'
+
+                return True
+
+        return False
+
     def __import(self, tokens : Tokens, tabs, loop, objNames):
         keyw = tokens.last()
         self.__flagsError("import", keyw)
@@ -850,6 +900,10 @@ class Compiler:
             if "." in self.lastPackage:
                   self.imports.append(self.lastPackage.split(".")[0])
             else: self.imports.append(self.lastPackage)
+
+            if self.__checkOpalModule(self.lastPackage):
+                from libs._importer import install
+                install(eval(self.preConsts["HOME_DIR"]), cache = self.buildCache is not None)
             
             modl = import_module(self.lastPackage)
             for name in dir(modl):
@@ -872,6 +926,12 @@ class Compiler:
 
             next, nameBuf = self.getUntilNotInExpr(("as", ","), imports, True, False, False)
             if next != "" and next.tok in ("as", ","): imports.pos -= 1
+
+            module = name.tok + Tokens(nameBuf).join()
+            if self.lastPackage == "":
+                  self.__checkOpalModule(module)
+            else: self.__checkOpalModule(self.lastPackage + "." + module)
+
             if len(nameBuf) != 0: 
                 name = name.copy()
                 name.tok = Tokens(nameBuf).join()
@@ -910,9 +970,10 @@ class Compiler:
         def fn(tokens : Tokens, tabs, loop, objNames):
             self.__flagsError(op * 2, tokens.last())
             _, var = self.getUntilNotInExpr(";", tokens, True, advance = False)
-            strVar = Tokens(var).join()
+            strVar  = Tokens(var).join()
+            strings = self.__getStrings(var) + [op + "=", "1"]
 
-            self.out += (" " * tabs) + strVar + op + "=1\n"
+            self.out += Assignment(tabs, Expr(strings, strVar + op + "=1"), [strVar], self.__getTypes(strings, objNames))
 
             return loop, objNames
             
@@ -946,20 +1007,22 @@ class Compiler:
             self.checkDirectNext("{", f'"{kwname}"', tokens)
             block = self.getSameLevelParenthesis("{", "}", tokens)
 
-            self.out += (" " * tabs) + keyw
-
             if len(block) == 0:
-                self.out += ":pass\n"
+                self.out += Statement(tabs, keyw, end = ":pass\n")
             else: 
-                self.out += ":\n"
+                self.out += Statement(tabs, keyw, end = ":\n")
 
                 if push is None:
+                    self.out.open(Block("block", keyw))
                     loop, objNames = self.__compiler(Tokens(block), tabs + 1, loop, objNames)
                 else:
                     self.__nameStack.push(push)
+                    self.out.open(Block("function" if push[1] in ("fn", "cfn") else "block", keyw))
                     loop, objNames = self.__compiler(Tokens(block), tabs + 1, loop, objNames)
                     self.__nameStack.pop()
 
+                self.out.close()
+
             return loop, objNames
         
         return fn
@@ -978,16 +1041,20 @@ class Compiler:
 
             block = self.getSameLevelParenthesis("{", "}", tokens)
 
-            self.out += (" " * tabs) + Tokens([Token(keyw)] + localContent).join()
+            header = self.__getExpr(localContent)
 
             if after is not None:
-                self.out += ":\n" + (" " * (tabs + 1)) + after + "\n"
+                self.out += Statement(tabs, keyw, header, ":\n" + (" " * (tabs + 1)) + after + "\n")
             else:
                 if len(block) == 0:
-                    self.out += ":pass\n"
+                    self.out += Statement(tabs, keyw, header, ":pass\n")
                     return loop, objNames
                  
-                self.out += ":\n"
+                self.out += Statement(tabs, keyw, header, ":\n")
+
+            if   keyw == "class":    self.out.open(Block("class", keyw))
+            elif inLoop is not None: self.out.open(Block("loop", keyw))
+            else:                    self.out.open(Block("block", keyw))
 
             if push is None:
                 tmp, objNames = self.__compiler(Tokens(block), tabs + 1, internalLoop, objNames)
@@ -996,6 +1063,8 @@ class Compiler:
                 tmp, objNames = self.__compiler(Tokens(block), tabs + 1, internalLoop, objNames)
                 self.__nameStack.pop()
 
+            self.out.close()
+
             if loopNotDef: loop = tmp
 
             return loop, objNames
@@ -1065,10 +1134,10 @@ class Compiler:
 
             backStatic = self.static
             self.static = True
-            self.__block("class", content = [next, Token("(OpalNamespace)")], push = (next.tok, "class"))(tokens, tabs, loop, objNames)
+            self.__block("class", content = [next, Token("("), Token("OpalNamespace"), Token(")")], push = (next.tok, "class"))(tokens, tabs, loop, objNames)
             self.static = backStatic
         else:
-            self.__block("class", content = [next, Token("(OpalNamespace)")], push = (next.tok, "class"))(tokens, tabs, loop, objNames)
+            self.__block("class", content = [next, Token("("), Token("OpalNamespace"), Token(")")], push = (next.tok, "class"))(tokens, tabs, loop, objNames)
 
         if self.nextGlobal:
             self.nextGlobal = False
@@ -1098,8 +1167,10 @@ class Compiler:
         check = f"if not({Tokens(condition).join()}):break\n"
 
         self.out += (" " * tabs) + "while True:\n"
+        self.out.open(Block("loop", "do"))
         _, objNames = self.__compiler(Tokens(block), tabs + 1, CompLoop(check), objNames)
         self.out += (" " * (tabs + 1)) + check
+        self.out.close()
 
         return loop, objNames
     
@@ -1149,8 +1220,6 @@ class Compiler:
                     " " * (valList[-1].pos - valList[0].pos + 1), 
                     valList[0].line, valList[0].pos, valList[0].tokens
                 )
-
-                warnTok.maxline = valList[0].maxline
                 
                 self.__warning('a 0-times "repeat" statement is being used', warnTok)
 
@@ -1169,7 +1238,9 @@ class Compiler:
         
         self.out += "\n"
 
+        self.out.open(Block("loop", "repeat"))
         _, objNames = self.__compiler(Tokens(block), tabs + 1, GenericLoop(), objNames)
+        self.out.close()
         return loop, objNames
     
     def __matchLoop(self, tokens : Tokens, tabs, loop, objNames, value, op, nocheck):
@@ -1180,6 +1251,7 @@ class Compiler:
 
         while tokens.isntFinished():
             next = tokens.next()
+            if self.sourceMap or self.countChecks: self.__markSource(next)
             
             if next.tok.startswith('"""') or next.tok.startswith("'''"):
                 self.out += next.tok + "\n"
@@ -1196,11 +1268,11 @@ class Compiler:
                         
                         if nocheck:
                             loop, objNames = self.__block(
-                                Tokens([Token(kw)] + value + op).join()
+                                Tokens.joinParts(Token(kw), value, op)
                             )(tokens, tabs, loop, objNames)
                         else:
                             loop, objNames = self.__block(
-                                Tokens([Token(kw)] + value + op).join(),
+                                Tokens.joinParts(Token(kw), value, op),
                                 after = f"_OPAL_MATCHED_{tabs}=True"
                             )(tokens, tabs, loop, objNames)
 
@@ -1284,7 +1356,7 @@ class Compiler:
             self.out += (" " * tabs) + f"_OPAL_MATCHED_{tabs}=False\n"
     
         if op is None:
-            self.out += (" " * tabs) + Tokens([Token("match")] + value).join() +":\n"
+            self.out += Statement(tabs, "match", self.__getExpr(value), ":\n")
 
         self.__nameStack.push((None, "conditional"))
         loop, objNames = self.__matchLoop(Tokens(block), tabs, loop, objNames, value, op, not check)
@@ -1364,7 +1436,9 @@ class Compiler:
             else:
                 self.__nameStack.push((self.__getType(type_), "fn", "dynamic"))
 
+            self.out.open(Block("function", localName if type(localName) is str else localName.tok, "dynamic"))
             self.__compiler(Tokens(block), tabs + 1, loop, intObjs)
+            self.out.close()
             self.__nameStack.pop()
             return loop, objNames
         
@@ -1443,6 +1517,8 @@ class Compiler:
         return loop, objNames
     
     def __getInlineIncDec(self, variablesDef):
+        variablesDef = list(variablesDef)
+
         i = 0
         while i < len(variablesDef):
             if   variablesDef[i].tok == "++":
@@ -1520,7 +1596,12 @@ class Compiler:
     def __for(self, tokens : Tokens, tabs, loop, objNames):
         keyw = tokens.last()
         self.__flagsError("for", keyw)
-        cnt = [x.tok for x in self.getUntilNotInExpr("{", tokens.copy(), True)[1]].count(";")
+        _, head = self.getUntilNotInExpr("{", tokens.copy(), True)
+        if type(head) is TokenSpan: cnt = head.count(";")
+        else:                       cnt = [x.tok for x in head].count(";")
+
+        # names the loop assigns to
+        bound = []
 
         match cnt:
             case 2: # C-like for
@@ -1530,6 +1611,8 @@ class Compiler:
                 if tokens.peek().tok == ";": tokens.next()
                 else:
                     _, variablesDef = self.getUntilNotInExpr(";", tokens, True, advance = False)
+                    bound += [token.tok for token in variablesDef if token.tok.isidentifier()]
+
                     objNames, buf = self.__handleAssignmentChain(tabs, objNames, variablesDef)
                     self.out += buf
 
@@ -1540,6 +1623,8 @@ class Compiler:
                     _, condition = self.getUntilNotInExpr(";", tokens, True, advance = False)
                     if len(condition) == 0: condition = [Token("True")]
 
+                header = Statement(tabs, "while", self.__getExpr(condition), ":")
+
                 if tokens.peek().tok == "{":
                     tokens.next()
                     increments = ""
@@ -1550,9 +1635,9 @@ class Compiler:
                     else:
                         _, increments = self.getUntilNotInExpr("{", tokens, True, advance = False)
 
+                    bound += [token.tok for token in increments if token.tok.isidentifier()]
                     objNames, increments = self.__handleAssignmentChain(tabs + 1, objNames, increments)
 
-                statement = [Token("while")] + condition
             case 0: # Python for
                 _, variablesDef = self.getUntilNotInExpr("in", tokens, True, advance = False)
                 variablesDef = Tokens(variablesDef)
@@ -1561,6 +1646,7 @@ class Compiler:
                     while variablesDef.isntFinished():
                         name = variablesDef.next()
                         self.newObj(objNames, name, "dynamic")
+                        bound.append(name.tok)
 
                         next = variablesDef.peek()
                         if next is None: break
@@ -1570,7 +1656,7 @@ class Compiler:
                         else: variablesDef.next()
 
                 _, iterable = self.getUntilNotInExpr("{", tokens, True, advance = False)
-                statement  = [Token("for")] + variablesDef.tokens + [Token("in")] + iterable
+                header     = For(tabs, self.__getExpr(variablesDef.tokens), self.__getExpr(iterable), ":")
                 increments = ""
             case _:
                 self.__error('invalid syntax: using an unrecognized amount of semicolons in a for loop', keyw)
@@ -1578,19 +1664,23 @@ class Compiler:
             
         block = self.getSameLevelParenthesis("{", "}", tokens)
 
-        self.out += (" " * tabs) + Tokens(statement).join() + ":"
+        self.out += header
 
         if len(block) == 0:
             if increments == "": self.out += "pass\n"
             else:                self.out += "\n" + increments
 
+            # the names are still bound, even if there's nothing else in the loop
+            self.out += Block("loop", "for", params = bound)
             return loop, objNames
         
         self.out += "\n"
         
+        self.out.open(Block("loop", "for", params = bound))
         _, objNames = self.__compiler(Tokens(block), tabs + 1, CompLoop(increments.lstrip()), objNames)
 
         if increments != "": self.out += increments
+        self.out.close()
             
         return loop, objNames
     
@@ -1679,7 +1769,9 @@ class Compiler:
 
         if self.nextUnchecked:
             self.nextUnchecked = False
-            self.out += (" " * tabs) + expr.join() + "\n"
+
+            strings = self.__getStrings(expr.tokens)
+            self.out += Assignment(tabs, Expr(strings, expr.join()), names, self.__getTypes(strings, objNames))
             
             for name in names:
                 if name in objNames and objNames[name] == "auto" and name in self.autoTypes:
@@ -1695,6 +1787,15 @@ class Compiler:
         self.preConsts   = {}
         self.__nameStack = NameStack()
 
+        self.includeCache   = {}
+        self.__includeStack = []
+        self.buildCache     = None
+        self.profile        = None
+        self.sourceMap      = False
+        self.fastTokenizer  = False
+        # passes run over the generated code before it's rendered
+        self.passes         = [ConstantFolding(), CheckElision(), CheckSites()]
+
         self.static      = False
         self.__cy        = False
         self.noCompile   = False
@@ -1703,6 +1804,12 @@ class Compiler:
         self.module      = False
         self.typeMode    = "hybrid"
 
+        self.elideChecks     = True
+        self.reportChecks    = False
+        self.countChecks     = False
+        # how much of a container is checked against a parameterized type (list[int], dict[str, float]...)
+        self.containerChecks = "first"
+
         self.statementHandlers = {
             "new":                 self.__new,
             "property":            self.__property,
@@ -1721,7 +1828,7 @@ class Compiler:
             "continue":            self.__continue,
             "@":                   self.__untilEnd("@"),
             "throw":               self.__untilEnd("raise"),
-            "super":               self.__untilEnd("super"),
+            "super":               self.__super,
             "del":                 self.__untilEnd("del"),
             "assert":              self.__untilEnd("assert"),
             "yield":               self.__untilEnd("yield"),
@@ -1756,12 +1863,14 @@ class Compiler:
         self.comptimeCompiler.preConsts["RELEASE_MODE"] = "False"
         self.comptimeCompiler.preConsts["OPAL_DIR"] = self.preConsts["OPAL_DIR"]
 
-    def __lineWarn(self, msg, line):
-        print(f"warning (line {str(line + 1)}):", msg)
+    def __lineWarn(self, msg, line, source : SourceFile):
+        self.__noIncludeCache()
+        print(f"warning (in {source.name}, line {str(source.getLineNumber(line))}):", msg)
 
-    def __lineErr(self, msg, line):
+    def __lineErr(self, msg, line, source : SourceFile):
+        self.__noIncludeCache()
         self.hadError = True
-        print(f"error (line {str(line + 1)}):", msg)
+        print(f"error (in {source.name}, line {str(source.getLineNumber(line))}):", msg)
 
     def __error(self, msg, token : Token):
         self.hadError = True
@@ -1780,7 +1889,8 @@ class Compiler:
             "OPAL_PRINT_RETURN": False,
             "namespace":         False,
             "object":            False,
-            "enum":              False
+            "enum":              False,
+            "importer":          False
         }
 
     def newObj(self, objNames, nameToken : Token, type_):
@@ -1803,27 +1913,35 @@ class Compiler:
 
         return next
     
+    # returns the tokens between start and end. tokens are only copied
+    # when an escape made the result non-contiguous
+    def __getSpan(self, tokens : Tokens, start, end, buf):
+        if buf is None: return tokens.tokens[start:end]
+        return buf
+
     def getUntil(self, ch, tokens : Tokens, buffer = False):
-        buf = []
+        start = tokens.pos
+        buf   = None
         while tokens.isntFinished():
             next = tokens.next()
 
             if next.tok == "\\":
+                if buf is None: buf = list(tokens.tokens[start:tokens.pos - 1])
                 tokens.next()
                 continue
 
             if next.tok == ch:
-                if buffer: return next, buf
+                if buffer: return next, self.__getSpan(tokens, start, tokens.pos - 1, buf)
                 else:      return next
 
-            buf.append(next)
+            if buf is not None: buf.append(next)
 
         self.__error(f'expecting character "{ch}"', next)
 
-        if buffer: return "", buf
+        if buffer: return "", self.__getSpan(tokens, start, tokens.pos, buf)
         else:      return ""
     
-    def getUntilNotInExpr(self, ch, tokens : Tokens, buffer = False, errorNotFound = True, advance = True, unallowed = []):
+    def getUntilNotInExpr(self, ch, tokens : Tokens, buffer = False, errorNotFound = True, advance = True, unallowed = [], jumps = True):
         if type(ch) is str:
             ch = (ch, )
 
@@ -1835,20 +1953,31 @@ class Compiler:
         lastCrBrack = tokens.peek()
         next = tokens.peek()
 
-        buf = []
+        # balanced brackets are skipped through the bracket index of the token store
+        if jumps and type(tokens.tokens) is TokenSpan and len(unallowed) == 0:
+            span = tokens.tokens
+        else:
+            span = None
+
+        jumped = False
+        start  = tokens.pos
+        buf    = None
         while tokens.isntFinished():
             next = tokens.next()
+            jump = False
 
             match next.tok:
                 case "(":
                     lastRdBrack = next
                     rdBrack += 1
+                    jump = rdBrack > 0
                 case ")":
                     lastRdBrack = next
                     rdBrack -= 1
                 case "[":
                     lastSqBrack = next
                     sqBrack += 1
+                    jump = sqBrack > 0
                 case "]":
                     lastSqBrack = next
                     sqBrack -= 1
@@ -1856,11 +1985,15 @@ class Compiler:
                     if "{" not in ch:
                         lastCrBrack = next
                         crBrack += 1
+                        jump = crBrack > 0
                 case "}":
                     if "{" not in ch:
                         lastCrBrack = next
                         crBrack -= 1
                 case "\\":
+                    span = None
+                    if buf is None: buf = list(tokens.tokens[start:tokens.pos - 1])
+
                     if tokens.isntFinished():
                         next = tokens.next()
                     else:
@@ -1871,22 +2004,36 @@ class Compiler:
 
                     continue
 
+            if jump and span is not None:
+                partner = span.partner(tokens.pos - 1)
+                if partner != -1:
+                    # the closing bracket is read next and counted as usual
+                    tokens.pos = partner
+                    jumped     = True
+
             if next.tok in unallowed:
+                end = tokens.pos - 1
                 if advance and tokens.isntFinished():
                     next = tokens.next()
 
-                if buffer: return "", buf
+                if buffer: return "", self.__getSpan(tokens, start, end, buf)
                 else:      return ""
 
             if rdBrack == 0 and sqBrack == 0 and crBrack == 0:
                 if next.tok in ch:
+                    end = tokens.pos - 1
                     if advance and tokens.isntFinished():
                         next = tokens.next()
 
-                    if buffer: return next, buf
+                    if buffer: return next, self.__getSpan(tokens, start, end, buf)
                     else:      return next
                 
-            buf.append(next)
+            if buf is not None: buf.append(next)
+
+        if jumped and (rdBrack != 0 or sqBrack != 0 or crBrack != 0):
+            # scan again token by token so errors point to the right bracket
+            tokens.pos = start
+            return self.getUntilNotInExpr(ch, tokens, buffer, errorNotFound, advance, unallowed, False)
                 
         if rdBrack != 0:
             if lastRdBrack is None:
@@ -1912,17 +2059,25 @@ class Compiler:
             else:
                 self.__error(f'expecting character(s) {ch}', next)
 
-        if buffer: return "", buf
+        if buffer: return "", self.__getSpan(tokens, start, tokens.pos, buf)
         else:      return ""
 
     def getSameLevelParenthesis(self, openCh, closeCh, tokens : Tokens):
         pCount = 1
-        buf = []
         lastParen = tokens.peek()
         if lastParen is None:
             self.__error('unbalanced parenthesis "' + openCh + closeCh + '"', tokens.tokens[-1])
             return []
 
+        start = tokens.pos
+
+        span = tokens.tokens
+        if type(span) is TokenSpan and start > 0 and span.tok(start - 1) == openCh:
+            partner = span.partner(start - 1)
+            if partner != -1 and span.tok(partner) == closeCh:
+                tokens.pos = partner + 1
+                return span[start:partner]
+
         while tokens.isntFinished():
             next = tokens.next()
 
@@ -1934,12 +2089,10 @@ class Compiler:
                 pCount -= 1
 
             if pCount == 0:
-                return buf
-            
-            buf.append(next)
+                return tokens.tokens[start:tokens.pos - 1]
 
         self.__error('unbalanced parenthesis "' + openCh + closeCh + '"', lastParen)
-        return buf
+        return tokens.tokens[start:tokens.pos]
     
     def __variablesHandler(self, tokens : Tokens, tabs, objNames, autoCheck = True):
         names, expr = self.__dynamicStepOne(tokens, tabs, objNames)
@@ -1950,16 +2103,39 @@ class Compiler:
                 self.out += (" " * tabs) + f"_OPAL_AUTOMATIC_TYPE_{name}=type({name})\n"
                 self.autoTypes[name] = None
 
-        self.out += (" " * tabs) + expr.join() + "\n"
+        strings = self.__getStrings(expr.tokens)
+        types   = self.__getTypes(strings, objNames)
 
+        checks = []
         for name in names:
             if name in objNames and objNames[name] != "dynamic":
                 if objNames[name] == "auto":
                     if autoCheck:
-                        self.out += (" " * tabs) + f"{name}=_OPAL_CHECK_TYPE_({name},_OPAL_AUTOMATIC_TYPE_{name})\n"
+                        checks.append(Check(name, f"_OPAL_AUTOMATIC_TYPE_{name}", types))
                 else:
-                    self.out += (" " * tabs) + f"{name}=_OPAL_CHECK_TYPE_({name},{objNames[name]})\n"
+                    checks.append(Check(name, objNames[name], types))
+
+        self.out += Assignment(tabs, Expr(strings, expr.join()), names, types, checks)
     
+    def __markSource(self, token):
+        if token.tok != "__OPALSIG":
+            self.out += Mark(token.getOrigin())
+
+    def __getStrings(self, tokens):
+        if type(tokens) is TokenSpan: return tokens.strings()
+        return [token.tok for token in tokens]
+
+    # declared types of the names used in an expression, as they are when the expression is compiled
+    def __getTypes(self, strings, objNames):
+        return {string: objNames[string] for string in strings if string in objNames}
+
+    def __getExpr(self, tokens):
+        if type(tokens) is TokenSpan: return Expr(tokens.strings(), tokens.join())
+        return Expr([token.tok for token in tokens])
+
+    def __getCheck(self, value : Expr, type_, objNames, grouped = False):
+        return Check(value, type_, self.__getTypes(value.strings, objNames), grouped)
+
     def __compiler(self, tokens : Tokens, tabs, loop, objNames):  
         while tokens.isntFinished():
             next = tokens.next()
@@ -1968,11 +2144,15 @@ class Compiler:
                 self.out += next.tok + "\n"
                 continue
 
+            if self.sourceMap or self.countChecks: self.__markSource(next)
+
             if   next.tok in self.statementHandlers:
-                loop, objNames = self.statementHandlers[next.tok](tokens, tabs, loop, objNames)
+                if self.profile is None:
+                      loop, objNames = self.statementHandlers[next.tok](tokens, tabs, loop, objNames)
+                else: loop, objNames = self.profile.call("statement " + next.tok, self.statementHandlers[next.tok], tokens, tabs, loop, objNames)
             elif next.tok in objNames:
                 tokens.pos -= 1
-                self.__variablesHandler(tokens, tabs, objNames)
+                self.__timed("statement <assignment>", self.__variablesHandler, tokens, tabs, objNames)
             elif next.tok == "__OPALSIG":
                 line = next.line
                 kw = tokens.last()
@@ -2016,7 +2196,13 @@ class Compiler:
                                 self.__nameStack.push(eval(f"({args})"))
                         except:
                             self.__error('invalid arguments for "PUSH_NAME" signal', kw)
+                        else:
+                            if self.profile is not None:
+                                self.profile.start(self.__getProfileName(self.__nameStack.array[-1]))
                     case "POP_NAME":
+                        if self.profile is not None:
+                            self.profile.stop(self.__getProfileName(self.__nameStack.array[-1]))
+
                         self.__nameStack.pop()
                     case "TABS_ADD":
                         try:
@@ -2049,30 +2235,49 @@ class Compiler:
                     if name in objNames:
                         objNames[name] = type_
 
-                        if   type_ == "auto":
+                        if type_ == "auto":
                             del self.autoTypes[name]
-                        elif type_ != "dynamic":
-                            self.out += (" " * tabs) + name + ":" + type_ + "\n"
+
+                        self.out += Declaration(tabs, name, type_)
 
                 self.__variablesHandler(tokens, tabs, objNames, False)
 
         return loop, objNames
 
+    def __replaceConstsInLine(self, line, consts):
+        toks  = Tokens(line, fast = self.fastTokenizer).tokens.strings()
+        found = False
+        for i, tok in enumerate(toks):
+            if tok in consts:
+                found = True
+                toks[i] = consts[tok]
+
+        if found: return "".join(spacedStrings(toks))
+        return line
+
     def replaceConsts(self, expr, consts):
-        res = ""
-        for line in expr.split("\n"):
-            expr  = Tokens(line)
-            found = False
-            for i in range(len(expr.tokens)):
-                if expr.tokens[i].tok in consts:
-                    found = True
-                    expr.tokens[i].tok = consts[expr.tokens[i].tok]
+        if len(consts) == 0: return expr + "\n"
 
-            if found:
-                  res += expr.join() + "\n"
-            else: res += line + "\n"
+        lines   = expr.split("\n")
+        pattern = getConstsPattern(consts)
+        
+        if pattern is None:
+            for i in range(len(lines)):
+                lines[i] = self.__replaceConstsInLine(lines[i], consts)
+        else:
+            # only lines where a constant could appear are tokenized
+            line = 0
+            last = 0
+            prev = -1
+            for match in pattern.finditer(expr):
+                line += expr.count("\n", last, match.start())
+                last  = match.start()
 
-        return res
+                if line != prev:
+                    lines[line] = self.__replaceConstsInLine(lines[line], consts)
+                    prev = line
+
+        return "\n".join(lines) + "\n"
 
     def getDir(self, expr):
         return eval(self.replaceConsts(expr.strip(), self.preConsts | self.consts))
@@ -2085,10 +2290,13 @@ class Compiler:
     def __readEmbed(self, fileDir):
         self.__manualSig = False
 
+        # one line per line of the file, so the origins of preprocessed lines stay correct
         result = MutableStringBuffer()
         for line in self.readFile(fileDir).split("\n"):
             strippedLine = line.lstrip()
-            if len(strippedLine) == 0: continue
+            if len(strippedLine) == 0: 
+                result += "\n"
+                continue
 
             if strippedLine[0] == "#":
                 result += strippedLine.rstrip() + "\n"
@@ -2098,45 +2306,141 @@ class Compiler:
 
         return str(result)
     
-    def __include(self, result, file):
+    # diagnostics and compile-time side effects have to happen every time a file is included
+    def __noIncludeCache(self):
+        if len(self.__includeStack) != 0:
+            self.__includeStack[-1].cacheable = False
+
+    def __getIncludeKey(self, path, mtime):
+        return (
+            path, mtime, self.__cy, 
+            frozenset(self.consts.items()), 
+            frozenset(self.preConsts.items()),
+            frozenset(self.macros.items()),
+            frozenset(self.onceFiles)
+        )
+
+    def __timed(self, name, fn, *args):
+        if self.profile is None: return fn(*args)
+        return self.profile.call(name, fn, *args)
+
+    def __count(self, name, amount = 1):
+        if self.profile is not None:
+            self.profile.count(name, amount)
+
+    def __getProfileName(self, name):
+        match name[1]:
+            case "file":
+                return "include " + name[0]
+            case "macro":
+                return "macro " + name[0]
+            case _:
+                return name[1] + " " + name[0]
+
+    def __preprocessFile(self, file):
+        path = os.path.abspath(file)
+        self.dependencies.add(path)
+        if path in self.onceFiles: return None
+
+        mtime = os.stat(path).st_mtime_ns
+        key   = self.__getIncludeKey(path, mtime)
+
+        cached = self.includeCache.get(key)
+        if cached is not None and cached.isValid():
+            self.__count("include cache hits")
+            self.consts    = cached.consts.copy()
+            self.preConsts = cached.preConsts.copy()
+            self.macros    = cached.macros.copy()
+            self.onceFiles = cached.onceFiles.copy()
+            self.dependencies.update(cached.deps)
+            
+            if len(self.__includeStack) != 0:
+                self.__includeStack[-1].deps.update(cached.deps)
+
+            return cached.result
+
+        frame    = IncludeFrame(path, mtime)
+        hadError = self.hadError
+        self.__includeStack.append(frame)
+
+        name = os.path.basename(path)
+        self.__count("includes preprocessed")
+        if path.endswith(".py") or path.endswith(".pyx"):
+              result = self.__timed("preprocess " + name, self.__preCompiler, self.__readEmbed(path), name, 0, path)
+        else: result = self.__timed("preprocess " + name, self.__preCompiler, self.readFile(path), name, 0, path)
+
+        self.__includeStack.pop()
+        if self.hadError and not hadError:
+            frame.cacheable = False
+
+        if len(self.__includeStack) != 0:
+            parent = self.__includeStack[-1]
+            parent.deps.update(frame.deps)
+            parent.cacheable = parent.cacheable and frame.cacheable
+
+        if frame.cacheable:
+            if len(self.includeCache) > 1024:
+                self.includeCache.clear()
+
+            self.includeCache[key] = CachedInclude(
+                result, frame.deps, self.consts.copy(), self.preConsts.copy(), 
+                self.macros.copy(), self.onceFiles.copy()
+            )
+
+        return result
+
+    def __include(self, result, file, origin):
         self.__manualSig = False
-        result += f'__OPALSIG[PUSH_NAME]("{os.path.basename(file)}","file")\n'
-        if file.endswith(".py") or file.endswith(".pyx"):
-            result += self.__preCompiler(self.__readEmbed(file))
-        else:
-            result += self.__preCompiler(self.readFile(file)) + "\n"
-        result += "__OPALSIG[POP_NAME]()\n"
+        included = self.__preprocessFile(file)
+        if included is None: return result
+
+        result.add(f'__OPALSIG[PUSH_NAME]("{os.path.basename(file)}","file")\n', origin)
+        result.add(included)
+        if not (file.endswith(".py") or file.endswith(".pyx")):
+            result.add("\n", origin)
+        result.add("__OPALSIG[POP_NAME]()\n", origin)
         return result
     
-    def __addLine(self, line, result, savingMacro, compTime, export, ifBlock):
+    def __addLine(self, line, origin, result, savingMacro, compTime, export, ifBlock):
         if savingMacro is None and compTime is None and export is None and ifBlock is None:
-            result += line + "\n"
+            if type(line) is str:
+                result.add(line + "\n", origin)
+            else:
+                result.add(line)
+                result.add("\n", origin)
         else:
-            result += "\n" 
+            result.add("\n", origin)
 
             if savingMacro is not None:
-                savingMacro.add(line + "\n")
+                savingMacro.add(line, origin)
+                savingMacro.add("\n", origin)
             elif export is not None:
-                export += line + "\n"
+                export += str(line) + "\n"
             elif ifBlock is not None:
-                ifBlock.add(line + "\n")
+                ifBlock.add(line, origin)
+                ifBlock.add("\n", origin)
             else:
-                compTime += line + "\n"
+                compTime += str(line) + "\n"
 
         return result, savingMacro, compTime, export, ifBlock
 
-    def __preCompiler(self, source):
-        result = MutableStringBuffer()
+    def __preCompiler(self, source, name = "<main>", offset = 0, path = None):
+        lines  = source.split("\n")
+        source = SourceFile(name, lines, offset, path)
+
+        result = SourceBuffer()
         savingMacro = None
         compTime = None
         ifBlock = None
         export = None
         inPy = False
 
-        for i, line in enumerate(source.split("\n")):
+        for i, line in enumerate(lines):
+            origin = (source, i)
+
             noSpaceLine = line.replace(" ", "")
             if noSpaceLine == "": 
-                result += "\n"
+                result.add("\n", origin)
                 continue
             
             pyPre = line.lstrip().startswith("#opal$")
@@ -2148,15 +2452,15 @@ class Compiler:
                     tabs = len(line) - len(strippedLine)
                     line = f"__OPALSIG[EMBED_INFER]({tabs}).{strippedLine.rstrip()};"
 
-                result, savingMacro, compTime, export, ifBlock = self.__addLine(line, result, savingMacro, compTime, export, ifBlock)
+                result, savingMacro, compTime, export, ifBlock = self.__addLine(line, origin, result, savingMacro, compTime, export, ifBlock)
 
                 continue
 
             if pyPre: line = line[line.index("#") + 1:]
 
-            result += "\n"
+            result.add("\n", origin)
 
-            tokenizedLine = Tokens(line)
+            tokenizedLine = Tokens(line, fast = self.fastTokenizer)
             tokenizedLine.next()
             
             if pyPre: tokenizedLine.next()
@@ -2168,22 +2472,26 @@ class Compiler:
                         
                     fileDir = self.getDir(Tokens(tokenizedLine.tokens[tokenizedLine.pos:]).join())
                         
-                    tmp = MutableStringBuffer()
-                    tmp += f'__OPALSIG[PUSH_NAME]("{os.path.basename(fileDir)}","file")\n'
-                    pyx = fileDir.endswith(".pyx")
-                    if fileDir.endswith(".py") or pyx:
-                        if pyx and not self.__cy: continue
-                        tmp += self.__preCompiler(self.__readEmbed(fileDir))
-                    else:
-                        tmp += self.__preCompiler(self.readFile(fileDir))
-                    tmp += "__OPALSIG[POP_NAME]()\n"
+                    if fileDir.endswith(".pyx") and not self.__cy: continue
+
+                    included = self.__preprocessFile(fileDir)
+                    if included is None: continue
+
+                    tmp = SourceBuffer()
+                    tmp.add(f'__OPALSIG[PUSH_NAME]("{os.path.basename(fileDir)}","file")\n', origin)
+                    tmp.add(included)
+                    tmp.add("__OPALSIG[POP_NAME]()\n", origin)
 
-                    result, savingMacro, compTime, export, ifBlock = self.__addLine(str(tmp), result, savingMacro, compTime, export, ifBlock)
+                    result, savingMacro, compTime, export, ifBlock = self.__addLine(tmp, origin, result, savingMacro, compTime, export, ifBlock)
                 case "includeDirectory":
                     fileDir = self.getDir(Tokens(tokenizedLine.tokens[tokenizedLine.pos:]).join())
+                    self.dependencies.add(os.path.abspath(fileDir))
 
                     for file in [os.path.join(fileDir, f) for f in os.listdir(fileDir) if f.endswith(".opal") or f.endswith(".py") or (self.__cy and f.endswith(".pyx"))]:
-                        result = self.__include(result, file)
+                        result = self.__include(result, file, origin)
+                case "once":
+                    if path is not None:
+                        self.onceFiles.add(path)
                 case "define":
                     name    = tokenizedLine.next().tok
                     content = Tokens(tokenizedLine.tokens[tokenizedLine.pos:]).join()
@@ -2196,7 +2504,7 @@ class Compiler:
                     self.preConsts[name] = content
                 case "macro":
                     if savingMacro is not None:
-                        self.__lineErr("nested macros are not allowed", i)
+                        self.__lineErr("nested macros are not allowed", i, source)
                         continue
 
                     name = tokenizedLine.next().tok
@@ -2213,37 +2521,39 @@ class Compiler:
                     savingMacro = Macro(name)
                 case "comptime":
                     if compTime is not None:
-                        self.__lineErr("cannot use comptime block inside another comptime block", i)
+                        self.__lineErr("cannot use comptime block inside another comptime block", i, source)
                         continue
 
+                    self.__noIncludeCache()
+                    self.reproducible = False
                     compTime = MutableStringBuffer()
                 case "export":
                     if compTime is None:
-                        self.__lineErr("cannot use $export outside of a comptime block", i)
+                        self.__lineErr("cannot use $export outside of a comptime block", i, source)
                         continue
                     
                     compTime += 'return "' + encode(self.replaceConsts(Tokens(tokenizedLine.tokens[tokenizedLine.pos:]).join(), self.preConsts | self.consts | COMPTIME_EXPORT_VARS)) + '";\n'
                 case "exportBlock":
                     if compTime is None:
-                        self.__lineErr("cannot use $exportBlock outside of a comptime block", i)
+                        self.__lineErr("cannot use $exportBlock outside of a comptime block", i, source)
                         continue
 
                     export = MutableStringBuffer()
                 case "end":
                     if savingMacro is None and compTime is None and export is None and ifBlock is None:
-                        self.__lineErr("$end found with no macro definition, comptime, export or if block", i)
+                        self.__lineErr("$end found with no macro definition, comptime, export or if block", i, source)
                         continue
 
                     if savingMacro is not None:
                         if str(savingMacro.code) == "":
-                            self.__lineWarn(f'the "{savingMacro.name}" macro is being saved as empty', i)
+                            self.__lineWarn(f'the "{savingMacro.name}" macro is being saved as empty', i, source)
                             
                         self.macros[savingMacro.name] = savingMacro
                         savingMacro = None        
                     elif export is not None:
                         strExport = str(export)
                         if strExport == "":
-                            self.__lineWarn("empty export block", i)
+                            self.__lineWarn("empty export block", i, source)
                             continue
 
                         compTime += 'return "' + encode(self.replaceConsts(strExport.strip(), self.preConsts | self.consts | COMPTIME_EXPORT_VARS)) + '";\n'
@@ -2251,49 +2561,61 @@ class Compiler:
                     elif ifBlock is not None:
                         strIfCode = str(ifBlock.ifCode)
                         if strIfCode == "":
-                            self.__lineWarn("empty $if block", i)
+                            self.__lineWarn("empty $if block", i, source)
                         
                         if eval(self.replaceConsts(ifBlock.cond, self.preConsts | self.consts)):
-                            result += strIfCode + "\n" * str(ifBlock.elseCode).count("\n")
+                            result.add(ifBlock.ifCode)
+                            result.add("\n" * str(ifBlock.elseCode).count("\n"), origin)
                         else:
-                            result += "\n" * strIfCode.count("\n") + str(ifBlock.elseCode)
+                            result.add("\n" * strIfCode.count("\n"), origin)
+                            result.add(ifBlock.elseCode)
                         ifBlock = None
                     else:
                         strCompTime = str(compTime)
                         if strCompTime == "":
-                            self.__lineWarn("empty comptime block", i)
+                            self.__lineWarn("empty comptime block", i, source)
                             continue
 
-                        res = self.comptimeCompiler.compile(
+                        phase = f"comptime {source.name}:{source.getLineNumber(i)}"
+                        res   = self.__timed(
+                            phase, self.comptimeCompiler.compile,
                             "global:new function _OPAL_COMPTIME_BLOCK_(){\nglobal COMPTIME_EXPORT_VARS;\n" + 
                             self.replaceConsts(strCompTime.strip(), self.preConsts | self.consts) + 
-                            "}\n", precomp = False
+                            "}\n", None, False
                         )
                         compTime = None
                         if res == "":
                             self.hadError = True
                             continue
 
+                        if self.profile is not None:
+                            self.profile.start(phase + " (run)")
+
                         try:
                             exec(res)
                             exportCode = eval("_OPAL_COMPTIME_BLOCK_()")
                         except Exception as e:
-                            self.__lineErr("comptime block threw an exception:\n" + ''.join(format_exception(e)), i)
-                        else:
-                            if exportCode is not None:
-                                result += str(exportCode) + "\n" 
+                            exportCode = None
+                            self.__lineErr("comptime block threw an exception:\n" + ''.join(format_exception(e)), i, source)
+
+                        if self.profile is not None:
+                            self.profile.stop()
+
+                        if exportCode is not None:
+                            result.add(str(exportCode) + "\n", origin)
                 case "call":
                     name = tokenizedLine.next().tok
 
                     if name not in self.macros:
-                        self.__lineErr(f'trying to call undefined macro "{name}"', i)
+                        self.__lineErr(f'trying to call undefined macro "{name}"', i, source)
                         continue
 
                     macro = self.macros[name]
+                    self.__count("macro calls")
 
                     self.__manualSig = False
-                    buf = MutableStringBuffer()
-                    buf += f'__OPALSIG[PUSH_NAME]("{name}","macro")\n'
+                    buf = SourceBuffer()
+                    buf.add(f'__OPALSIG[PUSH_NAME]("{name}","macro")\n', origin)
                     next = tokenizedLine.peek()
                     if next is not None and next.tok == "(":
                         tokenizedLine.next()
@@ -2301,19 +2623,20 @@ class Compiler:
 
                         if len(args) != 0:
                             if macro.args == args:
-                                buf += f"new dynamic {macro.args};"
+                                buf.add(f"new dynamic {macro.args};")
                             else:
-                                buf += f"new dynamic {macro.args};{macro.args}={Tokens(args).join()};"
+                                buf.add(f"new dynamic {macro.args};{macro.args}={Tokens(args).join()};")
                                 
-                    buf += macro.code
-                    buf += "__OPALSIG[POP_NAME]()\n"
+                    buf.add(macro.code)
+                    buf.add("__OPALSIG[POP_NAME]()\n", origin)
                     
-                    result, savingMacro, compTime, export, ifBlock = self.__addLine(str(buf), result, savingMacro, compTime, export, ifBlock)
+                    result, savingMacro, compTime, export, ifBlock = self.__addLine(buf, origin, result, savingMacro, compTime, export, ifBlock)
                 case "nocompile":
                     inPy = True
                 case "restore":
                     inPy = False
                 case "args":
+                    self.__noIncludeCache()
                     self.handleArgs(eval(Tokens(tokenizedLine.tokens[tokenizedLine.pos:]).join()))
                 case "cy":
                     if not self.__cy: continue
@@ -2321,52 +2644,63 @@ class Compiler:
                     arg = tokenizedLine.next().tok
                     val = tokenizedLine.next().tok
 
-                    result, savingMacro, compTime, export, ifBlock = self.__addLine("@cython." + arg + f"({val});", result, savingMacro, compTime, export, ifBlock)
+                    result, savingMacro, compTime, export, ifBlock = self.__addLine("@cython." + arg + f"({val});", origin, result, savingMacro, compTime, export, ifBlock)
                 case "tabcontext":
                     qty = Tokens(tokenizedLine.tokens[tokenizedLine.pos:]).join()
                     self.__manualSig = False
 
-                    result, savingMacro, compTime, export, ifBlock = self.__addLine(f"__OPALSIG[TABS_ADD]({qty})", result, savingMacro, compTime, export, ifBlock)
+                    result, savingMacro, compTime, export, ifBlock = self.__addLine(f"__OPALSIG[TABS_ADD]({qty})", origin, result, savingMacro, compTime, export, ifBlock)
                 case "embed":
                     self.__manualSig = False
 
                     result, savingMacro, compTime, export, ifBlock = self.__addLine(
                         f"__OPALSIG[EMBED_INFER](0)." + Tokens(tokenizedLine.tokens[tokenizedLine.pos:]).join() + ";", 
-                        result, savingMacro, compTime, export, ifBlock
+                        origin, result, savingMacro, compTime, export, ifBlock
                     )
                 case "cdef":
                     self.__manualSig = False
 
-                    result, savingMacro, compTime, export, ifBlock = self.__addLine("__OPALSIG[CDEF]()", result, savingMacro, compTime, export, ifBlock)
+                    result, savingMacro, compTime, export, ifBlock = self.__addLine("__OPALSIG[CDEF]()", origin, result, savingMacro, compTime, export, ifBlock)
                 case "if":
                     if ifBlock is not None:
-                        self.__lineErr("nested $if blocks are not allowed", i)
+                        self.__lineErr("nested $if blocks are not allowed", i, source)
                         continue
 
                     ifBlock = IfBlock(Tokens(tokenizedLine.tokens[tokenizedLine.pos:]).join())
-                    result += "\n"
+                    result.add("\n", origin)
                 case "else":
                     if ifBlock is None:
-                        self.__lineErr("found $else with no $if", i)
+                        self.__lineErr("found $else with no $if", i, source)
                         continue
 
                     ifBlock.elseBlock()
-                    result += "\n"
+                    result.add("\n", origin)
                 case _:
-                    self.__lineErr("unknown or incomplete precompiler instruction", i)
+                    self.__lineErr("unknown or incomplete precompiler instruction", i, source)
 
-        return self.replaceConsts(str(result), self.consts)
+        # replaceConsts keeps every line in place, and terminates the last one
+        return SourceBuffer(
+            self.replaceConsts(str(result), self.consts), 
+            result.origins + [(source, len(lines) - 1)]
+        )
     
     def reset(self):
         self.macros    = {}
         self.consts    = {}
         self.autoTypes = {}
         self.imports   = []
+        self.onceFiles = set()
 
-        self.out      = MutableStringBuffer()
+        # files the program depends on, and whether its output only depends on them
+        self.dependencies = set()
+        self.reproducible = True
+
+        self.out      = IRBuffer()
         self.headers  = MutableStringBuffer()
         self.hadError = False
 
+        self.lastSourceMap = None
+
         self.__manualSig   = True
         self.nextAbstract  = False
         self.nextUnchecked = False
@@ -2378,7 +2712,7 @@ class Compiler:
 
         self.__resetFlags()
 
-    def compile(self, section, top = None, precomp = True):
+    def compile(self, section, top = None, precomp = True, name = "<main>", offset = 0, path = None):
         global COMPTIME_EXPORT_VARS
         COMPTIME_EXPORT_VARS = {}
         self.reset()
@@ -2386,20 +2720,40 @@ class Compiler:
         if top is not None:
             self.out += top + "\n"
 
+        if len(self.__nameStack.array) == 0:
+            self.__nameStack.push(("<main>", "file", 0))
+
+        self.preConsts["CY_COMPILING"] = str(self.__cy)
+
+        origins = None
+        if precomp: 
+            section = self.__timed("preprocess", self.__preCompiler, section, name, offset, path)
+            origins = section.origins
+            section = str(section)
+
+        # $args can change the type mode, so checks are imported after preprocessing
         match self.typeMode:
             case "hybrid":
-                self.out += "from libs._internals import _OPAL_CHECK_TYPE_\n"
+                match self.containerChecks:
+                    case "first":
+                        self.out += "from libs._internals import _OPAL_CHECK_TYPE_\n"
+                    case "sample":
+                        self.out += "from libs._internals import _OPAL_CHECK_TYPE_SAMPLED_ as _OPAL_CHECK_TYPE_\n"
+                    case "all":
+                        self.out += "from libs._internals import _OPAL_CHECK_TYPE_ALL_ITEMS_ as _OPAL_CHECK_TYPE_\n"
             case "check":
-                self.out += "from typeguard import check_type as _OPAL_CHECK_TYPE_\n"
+                match self.containerChecks:
+                    case "first":
+                        self.out += "from typeguard import check_type as _OPAL_CHECK_TYPE_\n"
+                    case "sample":
+                        self.out += "from libs._internals import _OPAL_CHECK_SAMPLED_ as _OPAL_CHECK_TYPE_\n"
+                    case "all":
+                        self.out += "from libs._internals import _OPAL_CHECK_ALL_ITEMS_ as _OPAL_CHECK_TYPE_\n"
             case "force":
                 self.out += "from libs._internals import _OPAL_FORCE_TYPE_ as _OPAL_CHECK_TYPE_\n"
 
-        if len(self.__nameStack.array) == 0:
-            self.__nameStack.push(("<main>", "file", 0))
-
-        self.preConsts["CY_COMPILING"] = str(self.__cy)
-
-        if precomp: section = self.__preCompiler(section)
+        if self.countChecks and self.typeMode != "none":
+            self.out += "from libs._internals import _OPAL_COUNT_CHECKS_\n_OPAL_CHECK_TYPE_=_OPAL_COUNT_CHECKS_(_OPAL_CHECK_TYPE_)\n"
 
         if self.__cy:
             if self.noCompile:
@@ -2410,15 +2764,18 @@ class Compiler:
                 print('This program cannot be ran directly or compiled in Python mode. Use the "pyxcompile" or "compile" commands.')
                 quit()
 
-        self.tokens = Tokens(section)
+        self.tokens = self.__timed("tokenize", Tokens, section, origins, self.fastTokenizer)
         
-        if "_OPAL_PRINT_RETURN_" in [x.tok for x in self.tokens.tokens]:
+        if "_OPAL_PRINT_RETURN_" in self.tokens.tokens.strings():
             self.flags["OPAL_PRINT_RETURN"] = True
             self.out += "from libs._internals import _OPAL_PRINT_RETURN_\n"
 
-        self.__compiler(self.tokens, 0, None, {})
+        self.__timed("code generation", self.__compiler, self.tokens, 0, None, {})
         self.imports = list(set(self.imports))
 
+        # code added after the program doesn't come from any statement
+        if self.sourceMap: self.out += Mark(None)
+
         if self.flags["mainfn"]:
             if self.__cy:
                 self.out += 'if"_OPAL_RUN_AS_MAIN_"in _ENVIRON_:_OPAL_MAIN_FUNCTION_()\n'
@@ -2430,19 +2787,56 @@ class Compiler:
         else: top = ""
 
         if self.hadError: return ""
-        else:             return top + str(self.headers) + str(self.out)
+
+        for pass_ in self.passes:
+            self.__timed("pass " + pass_.name, pass_.run, self.out.root, self)
+
+        top     += str(self.headers)
+        rendered = self.out.render()
+        result   = top + str(rendered)
+        if self.sourceMap:
+            self.lastSourceMap = self.__getSourceMap(rendered, top.count("\n"), result.count("\n") + 1)
+
+        if self.profile is not None:
+            self.profile.count("source lines", section.count("\n") + 1)
+            self.profile.count("tokens", len(self.tokens.tokens))
+            self.profile.count("lines emitted", result.count("\n"))
+            self.profile.count("type checks emitted", result.count("_OPAL_CHECK_TYPE_("))
+
+        return result
+
+    # every generated line comes from the last statement that started on or before it
+    def __getSourceMap(self, rendered, offset, lines):
+        origins = {}
+        for line, origin in rendered.getMarks():
+            origins[offset + line] = origin
+
+        mappings = [None] * lines
+        curr     = None
+        for line in range(offset, lines):
+            if line in origins: curr = origins[line]
+            mappings[line] = curr
+
+        return SourceMap.fromOrigins(mappings)
 
     def compileFile(self, fileIn, top = "", pyTop = None):
         self.__nameStack.push((fileIn, "file", 0))
-        return self.compile(top + "\n" + self.readFile(fileIn), pyTop)
+        return self.compile(top + "\n" + self.readFile(fileIn), pyTop, name = fileIn, offset = top.count("\n") + 1, path = os.path.abspath(fileIn))
 
     def __compileWrite(self, fileIn, fileOut, top, pyTop = None):
         self.preConsts["TARGET_FILE"] = f"r'{os.path.abspath(fileOut)}'"
-        result = self.compileFile(fileIn, top, pyTop)
 
+        if self.buildCache is not None:
+            self.buildCache.compile(self, fileIn, fileOut, top, pyTop)
+            return
+
+        result = self.compileFile(fileIn, top, pyTop)
         if result != "":
             with open(fileOut, "w", encoding = "utf-8") as txt:
                 txt.write(result)
+
+            if self.sourceMap:
+                self.lastSourceMap.write(fileOut + ".map")
     
     def compileToPY(self, fileIn, fileOut, top = ""):
         self.__cy = False
@@ -2457,10 +2851,30 @@ class Compiler:
             self.static = True
             args.remove("--static")
 
+        if "--source-map" in args:
+            self.sourceMap = True
+            args.remove("--source-map")
+
+        if "--keep-checks" in args:
+            self.elideChecks = False
+            args.remove("--keep-checks")
+
+        if "--report-checks" in args:
+            self.reportChecks = True
+            args.remove("--report-checks")
+
+        if "--count-checks" in args:
+            self.countChecks = True
+            args.remove("--count-checks")
+
         if "--disable-notes" in args:
             self.notes = False
             args.remove("--disable-notes")
 
+        if "--fast-tokenizer" in args:
+            self.fastTokenizer = True
+            args.remove("--fast-tokenizer")
+
         if "--require" in args:
             idx = args.index("--require")
             args.pop(idx)
@@ -2497,4 +2911,14 @@ class Compiler:
             if mode in ("hybrid", "check", "force", "none"):
                 self.typeMode = mode
             else:
-                print(f'invalid type mode "{mode}". supported types are hybrid, check, force, none')
\ No newline at end of file
+                print(f'invalid type mode "{mode}". supported types are hybrid, check, force, none')
+
+        if "--container-checks" in args:
+            idx = args.index("--container-checks")
+            args.pop(idx)
+
+            policy = args.pop(idx).lower()
+            if policy in ("first", "sample", "all"):
+                self.containerChecks = policy
+            else:
+                print(f'invalid container checks policy "{policy}". supported policies are first, sample, all')
\ No newline at end of file
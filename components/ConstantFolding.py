@@ -0,0 +1,130 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# replaces arithmetic on number literals with its result, like "60*60*24" with "86400".
+# only ints and floats are folded, and only when the result is finite and fits in 64 bits,
+# so that it means the same in Cython. "//" and "%" on negative numbers are left as they are,
+# as their result changes when Cython uses C division
+
+import operator, math
+from components.AST    import BinOp, UnaryOp, Group, Constant, parse
+from components.Tokens import Tokens
+from components.IR     import *
+
+OPERATIONS = {
+    "+":  operator.add,      "-":  operator.sub,      "*": operator.mul,  "/": operator.truediv,
+    "//": operator.floordiv, "%":  operator.mod,      "**": operator.pow, "<<": operator.lshift,
+    ">>": operator.rshift,   "&":  operator.and_,     "|": operator.or_,  "^": operator.xor
+}
+INTEGER_LIMIT = 2 ** 63
+# exponents and shifts past this are never folded, as they take long to compute
+SHIFT_LIMIT = 64
+
+# the number a node evaluates to, or None if it's not a number literal
+def getNumber(node):
+    nodeType = type(node)
+
+    if nodeType is Constant:
+        if not node.parts[0][0].isdigit() and node.parts[0] != ".": return None
+
+        value = node.value
+        if type(value) in (int, float): return value
+    elif nodeType is UnaryOp:
+        if node.op not in ("-", "+"): return None
+
+        value = getNumber(node.operand)
+        if value is not None and node.op == "-": return -value
+        return value
+    elif nodeType is Group:
+        return getNumber(node.value)
+
+    return None
+
+def evaluate(op, left, right):
+    if op in ("**", "<<", ">>") and abs(right) > SHIFT_LIMIT: return None
+    if op in ("//", "%") and (left < 0 or right < 0):          return None
+
+    try:
+        value = OPERATIONS[op](left, right)
+    except (ArithmeticError, ValueError, TypeError):
+        return None
+
+    if type(value) is int:
+        if abs(value) >= INTEGER_LIMIT: return None
+    elif type(value) is not float or not math.isfinite(value):
+        return None
+
+    return value
+
+def fold(node):
+    parts = node.parts
+    for idx, part in enumerate(parts):
+        if type(part) is not str: parts[idx] = fold(part)
+
+    if type(node) is not BinOp or node.op not in OPERATIONS: return node
+
+    left  = getNumber(node.left)
+    right = getNumber(node.right)
+    if left is None or right is None: return node
+
+    value = evaluate(node.op, left, right)
+    if value is None: return node
+
+    # the literal is tokenized, as the rest of the code is, so it's spaced the same way
+    return parse(Tokens(repr(value)).tokens.strings())
+
+# only expressions with an operator between what could be two numbers are parsed
+def mayFold(strings):
+    for idx in range(1, len(strings) - 1):
+        if (
+            strings[idx] in OPERATIONS and
+            (strings[idx - 1][0].isdigit() or strings[idx - 1] == ")") and
+            (strings[idx + 1][0].isdigit() or strings[idx + 1] in ("(", "-", "+", "."))
+        ):
+            return True
+
+    return False
+
+def foldExpr(expr):
+    if mayFold(expr.strings): expr.tree = fold(expr.tree)
+
+class ConstantFolding(Pass):
+    name = "constant folding"
+
+    def run(self, program, compiler):
+        for node, _ in program.walk():
+            nodeType = type(node)
+
+            if nodeType is Declaration:
+                if   type(node.value) is Check: foldExpr(node.value.value)
+                elif node.value is not None:    foldExpr(node.value)
+            elif nodeType is Assignment:
+                foldExpr(node.statement)
+            elif nodeType is Return:
+                if node.value is not None: foldExpr(node.value)
+            elif nodeType is Statement:
+                # patterns of "case" can only hold literals
+                if node.value is not None and node.keyword != "case": foldExpr(node.value)
+            elif nodeType is For:
+                foldExpr(node.iterable)
@@ -0,0 +1,138 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# builds Cython modules by driving Cython and the C compiler directly, instead of going through setup().
+# compiled objects are stored in the build cache, so unchanged C sources are never compiled again
+
+# setuptools provides distutils on Python versions that don't ship it
+import setuptools
+import os, sys, numpy, hashlib, tempfile, sysconfig, traceback
+from concurrent.futures  import ThreadPoolExecutor
+from Cython              import __version__ as cythonVersion
+from Cython.Build        import cythonize
+from Cython.Compiler     import Options
+from distutils.ccompiler import new_compiler
+from distutils.sysconfig import customize_compiler
+
+def getCCompiler():
+    compiler = new_compiler()
+    customize_compiler(compiler)
+    return compiler
+
+class CythonBuilder:
+    def __init__(self, cache = None, nthreads = None, profile = None):
+        self.cache    = cache
+        self.nthreads = os.cpu_count() if nthreads is None else nthreads
+        self.profile  = profile
+
+        self.includeDirs = [numpy.get_include(), sysconfig.get_paths()["include"]]
+        if sysconfig.get_paths()["platinclude"] not in self.includeDirs:
+            self.includeDirs.append(sysconfig.get_paths()["platinclude"])
+
+        self.libraryDirs = []
+        if sys.platform == "win32":
+            self.libraryDirs.append(os.path.join(sys.base_exec_prefix, "libs"))
+
+    def __getObjectKey(self, compiler, source, macros, includeDirs, extraArgs, language):
+        with open(source, "rb") as file:
+            content = hashlib.sha256(file.read()).hexdigest()
+
+        return hashlib.sha256(repr((
+            content, getattr(compiler, "compiler_so", compiler.compiler_type), 
+            macros, includeDirs, extraArgs, language,
+            sys.version, numpy.__version__, cythonVersion
+        )).encode()).hexdigest()
+
+    # compile and link options come from the extension too, so that "# distutils:" directives keep working
+    def __compileObject(self, source, tmp, macros, includeDirs, extraArgs, language):
+        compiler = getCCompiler()
+
+        key = None
+        if self.cache is not None:
+            key = self.__getObjectKey(compiler, source, macros, includeDirs, extraArgs, language)
+            obj = os.path.join(tmp, os.path.basename(source) + compiler.obj_extension)
+
+            if self.cache.restoreObject(key, obj): 
+                return obj
+
+        obj, = compiler.compile(
+            [source], output_dir = tmp, macros = macros, 
+            include_dirs = includeDirs, extra_postargs = extraArgs
+        )
+        if key is not None: self.cache.storeObject(key, obj)
+        return obj
+
+    def __buildExtension(self, extension, tmp):
+        name   = extension.name.split(".")[-1]
+        output = os.path.join(os.path.dirname(extension.sources[0]), name + sysconfig.get_config_var("EXT_SUFFIX"))
+
+        tmp = os.path.join(tmp, name)
+        os.mkdir(tmp)
+
+        compiler    = getCCompiler()
+        language    = extension.language or compiler.detect_language(extension.sources)
+        macros      = list(extension.define_macros) + [(macro,) for macro in extension.undef_macros]
+        includeDirs = list(extension.include_dirs) + self.includeDirs
+
+        objects = [
+            self.__compileObject(source, tmp, macros, includeDirs, list(extension.extra_compile_args), language)
+            for source in extension.sources
+        ] + list(extension.extra_objects)
+
+        compiler.link_shared_object(
+            objects, output, libraries = extension.libraries,
+            library_dirs = list(extension.library_dirs) + self.libraryDirs,
+            runtime_library_dirs = extension.runtime_library_dirs,
+            extra_postargs = extension.extra_link_args,
+            export_symbols = ["PyInit_" + name], build_temp = tmp,
+            target_lang = language
+        )
+
+    def __timed(self, name, fn, *args):
+        if self.profile is None: return fn(*args)
+        return self.profile.call(name, fn, *args)
+
+    def __buildExtensions(self, extensions):
+        with tempfile.TemporaryDirectory() as tmp:
+            with ThreadPoolExecutor(self.nthreads) as pool:
+                for future in [pool.submit(self.__buildExtension, extension, tmp) for extension in extensions]:
+                    future.result()
+
+    def build(self, files, debug = False):
+        Options.annotate = debug
+
+        try:
+            extensions = self.__timed(
+                "cython translation", lambda: cythonize(
+                    files, compiler_directives = {"language_level": "3"}, 
+                    nthreads = self.nthreads if len(files) > 1 else 0, quiet = True
+                )
+            )
+
+            self.__timed("C compilation and linking", self.__buildExtensions, extensions)
+        except Exception:
+            print(traceback.format_exc())
+            return False
+
+        return True
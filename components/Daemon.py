@@ -0,0 +1,156 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# a compiler daemon keeps a warm compiler process around (see "opalc.py serve"), and opalc forwards
+# commands to it. this module is loaded before the compiler, so it should stay lightweight
+
+import os, sys, json, base64, socket, struct, marshal
+from components.utils import getDefaultCacheDir
+
+FORWARDED_COMMANDS = ("compile", "pycompile", "pyxcompile")
+LOCAL_COMMANDS     = ("build", "release", "pyrelease", "path", "serve", "profile")
+
+def getSocketPath():
+    if "OPAL_SOCKET" in os.environ:
+        return os.environ["OPAL_SOCKET"]
+
+    return os.path.join(getDefaultCacheDir(), "opalc.sock")
+
+def sendMessage(sock, message):
+    data = json.dumps(message).encode()
+    sock.sendall(struct.pack("!I", len(data)) + data)
+
+def receiveExactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 16))
+        if chunk == b"": raise ConnectionError("connection closed by the other side")
+
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return b"".join(chunks)
+
+def receiveMessage(sock):
+    size, = struct.unpack("!I", receiveExactly(sock, 4))
+    return json.loads(receiveExactly(sock, size))
+
+def connect():
+    if not hasattr(socket, "AF_UNIX"): return None
+
+    path = getSocketPath()
+    if not os.path.exists(path): return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+
+    return sock
+
+def request(message):
+    sock = connect()
+    if sock is None: return None
+
+    with sock:
+        try:
+            sendMessage(sock, message)
+            return receiveMessage(sock)
+        except (OSError, ValueError):
+            return None
+
+def isForwarded(argv):
+    if len(argv) < 2 or "--import-timings" in argv: return False
+    if argv[1] in FORWARDED_COMMANDS:               return True
+
+    return argv[1] not in LOCAL_COMMANDS and os.path.isfile(argv[1])
+
+# runs the command through the daemon if there's one. if this returns, the command has to run in-process
+def forward(argv, namespace):
+    if "--no-daemon" in argv:
+        argv.remove("--no-daemon")
+        return
+
+    if not isForwarded(argv): return
+
+    response = request({"argv": argv, "cwd": os.getcwd(), "version": sys.version})
+    if response is None or "fallback" in response: return
+
+    print(response["output"], end = "", flush = True)
+
+    if "program" in response:
+        sys.argv = argv[1:]
+        exec(marshal.loads(base64.b64decode(response["program"])), namespace)
+        sys.exit()
+
+    sys.exit(response["status"])
+
+def stopDaemon():
+    if request({"stop": True}) is None:
+          print("no compiler daemon is running")
+    else: print("compiler daemon stopped")
+
+def runDaemon(handler):
+    if not hasattr(socket, "AF_UNIX"):
+        print("the compiler daemon is not supported on this platform")
+        return
+
+    path = getSocketPath()
+    if os.path.exists(path):
+        sock = connect()
+        if sock is not None:
+            sock.close()
+            print(f"a compiler daemon is already listening on {path}")
+            return
+
+        os.remove(path)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen()
+    print(f"compiler daemon listening on {path}", flush = True)
+
+    # requests are handled one at a time, since compiling changes the working directory and sys.argv
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    message = receiveMessage(conn)
+                    if "stop" in message:
+                        sendMessage(conn, {"status": 0})
+                        break
+
+                    sendMessage(conn, handler(message))
+                except (OSError, ValueError) as e:
+                    print("request failed:", e, flush = True)
+    except KeyboardInterrupt: pass
+    finally:
+        server.close()
+        if os.path.exists(path): os.remove(path)
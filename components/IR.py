@@ -0,0 +1,296 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# intermediate representation of the generated code.
+# statement handlers emit nodes into an IRBuffer instead of plain text, so that passes can
+# look at and rewrite the program before it's rendered to Python or Cython source.
+# expressions are kept as Expr nodes, whose syntax trees come from components/AST.py.
+# plain strings are kept as they are, and render to themselves
+
+from components.Tokens import spacedStrings, needsSpace
+from components.AST    import parse
+
+class Node:
+    def render(self, renderer):
+        pass
+
+class Renderer:
+    def __init__(self):
+        self.chunks = []
+        # (chunk index, origin) pairs, for source maps
+        self.marks  = []
+
+    def write(self, text):
+        self.chunks.append(text)
+
+    def mark(self, origin):
+        self.marks.append((len(self.chunks), origin))
+
+    # (line, origin) pairs, where line is the one each mark starts on
+    def getMarks(self):
+        result = []
+        line   = 0
+        idx    = 0
+        for mark, origin in self.marks:
+            while idx < mark:
+                line += self.chunks[idx].count("\n")
+                idx  += 1
+
+            result.append((line, origin))
+
+        return result
+
+    def __str__(self):
+        return "".join(self.chunks)
+
+# where the code coming from a statement starts
+class Mark(Node):
+    def __init__(self, origin):
+        self.origin = origin
+
+    def render(self, renderer):
+        renderer.mark(self.origin)
+
+# an expression or a simple statement, as the strings of its tokens. it's parsed the first time
+# a pass asks for its tree, and from then on it's rendered from the tree, so passes can change it
+class Expr(Node):
+    def __init__(self, strings, text = None):
+        self.__strings = strings
+        self.__text    = text
+        self.__tree    = None
+
+    @property
+    def tree(self):
+        if self.__tree is None: self.__tree = parse(self.__strings)
+        return self.__tree
+
+    @tree.setter
+    def tree(self, tree):
+        self.__tree = tree
+
+    @property
+    def strings(self):
+        if self.__tree is None: return self.__strings
+        return self.__tree.leaves()
+
+    def render(self, renderer):
+        renderer.write(str(self))
+
+    def __str__(self):
+        if self.__tree is not None: return self.__tree.render()
+
+        if self.__text is None: self.__text = "".join(spacedStrings(self.__strings))
+        return self.__text
+
+# a keyword followed by an Expr, spaced as the tokenizer would space them
+def joinKeyword(keyword, value):
+    if value is None: return keyword
+
+    strings = value.strings
+    if len(strings) != 0 and needsSpace(keyword, strings[0]):
+        return keyword + " " + str(value)
+    return keyword + str(value)
+
+# a _OPAL_CHECK_TYPE_ call. passes can set "elided" to leave the value unchecked,
+# or set "site" to pass the check's location in opal source along with it (--count-checks)
+class Check(Node):
+    def __init__(self, value, type_, types = None, grouped = False):
+        # an Expr, or the name of the variable an assignment checks
+        self.value   = value
+        self.type_   = type_
+        # the declared types of the names the checked expression uses
+        self.types   = types
+        # return values are checked in parentheses, as they can be tuples
+        self.grouped = grouped
+        self.elided  = False
+        self.site    = None
+
+    # strings of the tokens of the checked expression
+    @property
+    def tokens(self):
+        if type(self.value) is Expr: return self.value.strings
+        return None
+
+    def render(self, renderer):
+        renderer.write(str(self))
+
+    def __str__(self):
+        value = str(self.value)
+        if self.grouped: value = f"({value})"
+
+        if self.elided: return value
+        if self.site is not None:
+            return f"_OPAL_CHECK_TYPE_({value},{self.type_},{self.site!r})"
+        return f"_OPAL_CHECK_TYPE_({value},{self.type_})"
+
+# "new" variable definitions. value is None, an Expr, or a Check
+class Declaration(Node):
+    def __init__(self, tabs, name, type_, value = None, glob = False, cdef = False):
+        self.tabs  = tabs
+        self.name  = name
+        self.type_ = type_
+        self.value = value
+        self.glob  = glob
+        self.cdef  = cdef
+
+    def render(self, renderer):
+        indent = " " * self.tabs
+
+        if self.cdef:
+            if self.value is None:
+                  renderer.write(f"{indent}cdef {self.type_} {self.name}\n")
+            else: renderer.write(f"{indent}cdef {self.type_} {self.name}={self.value}\n")
+        elif self.value is None:
+            # type conversions ("type <- name = value") to dynamic types are declarations that don't emit anything
+            if self.type_ not in ("dynamic", "auto"):
+                renderer.write(f"{indent}{self.name}:{self.type_}\n")
+        elif self.glob:
+            renderer.write(f"{indent}globals()['{self.name}']={self.value}\n")
+        elif type(self.value) is Check:
+            # annotations stay when checks are removed, as Cython uses them
+            renderer.write(f"{indent}{self.name}:{self.type_}={self.value}\n")
+        else:
+            renderer.write(f"{indent}{self.name}={self.value}\n")
+
+# assignments to existing variables and expression statements, followed by a check for each
+# typed variable they assign to. statement is an Expr, names are the variables assigned to
+class Assignment(Node):
+    def __init__(self, tabs, statement, names, types = None, checks = None):
+        self.tabs      = tabs
+        self.statement = statement
+        self.names     = names
+        self.types     = types
+        self.checks    = [] if checks is None else checks
+
+    @property
+    def tokens(self):
+        return self.statement.strings
+
+    @property
+    def text(self):
+        return str(self.statement)
+
+    def render(self, renderer):
+        indent = " " * self.tabs
+        renderer.write(indent + str(self.statement) + "\n")
+
+        for check in self.checks:
+            if not check.elided:
+                renderer.write(f"{indent}{check.value}={check}\n")
+
+# value is None or an Expr. the check, if any, checks the same Expr
+class Return(Node):
+    def __init__(self, tabs, value = None, check = None):
+        self.tabs  = tabs
+        self.value = value
+        self.check = check
+
+    def render(self, renderer):
+        if self.check is None or self.check.elided:
+              renderer.write((" " * self.tabs) + joinKeyword("return", self.value) + "\n")
+        else: renderer.write((" " * self.tabs) + f"return {self.check}\n")
+
+# other simple statements, and the headers of blocks. value is None or an Expr,
+# and end is what follows it, like "\n", ":\n" or ":pass\n"
+class Statement(Node):
+    def __init__(self, tabs, keyword, value = None, end = "\n"):
+        self.tabs    = tabs
+        self.keyword = keyword
+        self.value   = value
+        self.end     = end
+
+    def render(self, renderer):
+        renderer.write((" " * self.tabs) + joinKeyword(self.keyword, self.value) + self.end)
+
+# "for target in iterable" loop headers
+class For(Node):
+    def __init__(self, tabs, target, iterable, end = ":\n"):
+        self.tabs     = tabs
+        self.target   = target
+        self.iterable = iterable
+        self.end      = end
+
+    def render(self, renderer):
+        strings = spacedStrings(["for"] + self.target.strings + ["in"] + self.iterable.strings)
+        renderer.write((" " * self.tabs) + "".join(strings) + self.end)
+
+# the body of a function, class, loop or other block. the header comes right before it.
+# kind is "module", "function", "class", "loop" or "block"
+class Block(Node):
+    def __init__(self, kind, name = None, type_ = None, params = None):
+        self.kind   = kind
+        self.name   = name
+        # return type of functions. params are the parameters of functions, as
+        # [name, type, mode, default] lists, or the names loops assign to
+        self.type_  = type_
+        self.params = params
+        self.body   = []
+
+    def render(self, renderer):
+        chunks = renderer.chunks
+        for node in self.body:
+            if type(node) is str:
+                  chunks.append(node)
+            else: node.render(renderer)
+
+    # yields every node in the block and in nested blocks, along with the block containing it
+    def walk(self):
+        for node in self.body:
+            if type(node) is str: continue
+
+            yield node, self
+            if type(node) is Block:
+                yield from node.walk()
+
+class IRBuffer:
+    def __init__(self):
+        self.root    = Block("module")
+        self.__stack = [self.root]
+
+    def __iadd__(self, other):
+        self.__stack[-1].body.append(other)
+        return self
+
+    # nodes added until the block is closed go in its body
+    def open(self, block):
+        self.__stack[-1].body.append(block)
+        self.__stack.append(block)
+
+    def close(self):
+        self.__stack.pop()
+
+    def render(self):
+        renderer = Renderer()
+        self.root.render(renderer)
+        return renderer
+
+    def __str__(self):
+        return str(self.render())
+
+# passes run over the program after code generation, in the order they're added to Compiler.passes
+class Pass:
+    name = "pass"
+
+    def run(self, program : Block, compiler):
+        pass
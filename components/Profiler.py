@@ -0,0 +1,164 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# per-phase timings and counters of a compilation (--profile-compiler)
+
+import json, tracemalloc
+from timeit import default_timer
+
+class Phase:
+    def __init__(self, name):
+        self.name      = name
+        self.calls     = 0
+        # time spent in the phase, including nested phases (not counting recursive entries twice)
+        self.total     = 0.0
+        # time spent in the phase itself
+        self.self      = 0.0
+        # bytes allocated and not yet freed when the phase ended, and the highest number of bytes allocated
+        self.allocated = 0
+        self.peak      = 0
+
+    def toDict(self):
+        return {
+            "calls":     self.calls,
+            "total":     self.total,
+            "self":      self.self,
+            "allocated": self.allocated,
+            "peak":      self.peak
+        }
+
+class Frame:
+    def __init__(self, phase, start, memory, outermost):
+        self.phase     = phase
+        self.start     = start
+        self.memory    = memory
+        self.children  = 0.0
+        self.outermost = outermost
+        # highest allocation peak seen before nested phases reset tracemalloc's peak
+        self.peak      = memory
+
+class CompilerProfile:
+    def __init__(self, allocations = False):
+        self.allocations = allocations
+        self.phases      = {}
+        self.counters    = {}
+        self.__stack     = []
+
+        if allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def start(self, name):
+        if name in self.phases:
+              phase = self.phases[name]
+        else: phase = self.phases[name] = Phase(name)
+
+        outermost = all(frame.phase is not phase for frame in self.__stack)
+
+        if self.allocations:
+            memory, peak = tracemalloc.get_traced_memory()
+            if len(self.__stack) != 0:
+                self.__stack[-1].peak = max(self.__stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+        else: memory = 0
+
+        self.__stack.append(Frame(phase, default_timer(), memory, outermost))
+
+    def stop(self, name = None):
+        # phases opened by name signals can be left open by unbalanced code, so they get closed along the way
+        if name is not None:
+            if all(frame.phase.name != name for frame in self.__stack): return
+
+            while self.__stack[-1].phase.name != name:
+                self.__stop()
+
+        self.__stop()
+
+    def __stop(self):
+        end   = default_timer()
+        frame = self.__stack.pop()
+        phase = frame.phase
+
+        elapsed = end - frame.start
+        phase.calls += 1
+        phase.self  += elapsed - frame.children
+        if frame.outermost: phase.total += elapsed
+
+        if len(self.__stack) != 0:
+            self.__stack[-1].children += elapsed
+
+        if self.allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame.peak)
+
+            phase.allocated += current - frame.memory
+            phase.peak       = max(phase.peak, peak - frame.memory)
+
+            if len(self.__stack) != 0:
+                self.__stack[-1].peak = max(self.__stack[-1].peak, peak)
+
+    def call(self, name, fn, *args):
+        self.start(name)
+        try:
+            return fn(*args)
+        finally:
+            self.stop()
+
+    def count(self, name, amount = 1):
+        if name in self.counters:
+              self.counters[name] += amount
+        else: self.counters[name]  = amount
+
+    def toDict(self):
+        return {
+            "phases":   {name: phase.toDict() for name, phase in self.phases.items()},
+            "counters": self.counters
+        }
+
+    def write(self, fileName):
+        with open(fileName, "w", encoding = "utf-8") as file:
+            json.dump(self.toDict(), file, indent = 4)
+
+    def table(self):
+        phases = sorted(self.phases.values(), key = lambda phase: phase.self, reverse = True)
+        width  = max([len(phase.name) for phase in phases] + [len("phase")])
+
+        header = f"{'phase'.ljust(width)}  {'calls'.rjust(8)}  {'self (ms)'.rjust(11)}  {'total (ms)'.rjust(11)}"
+        if self.allocations:
+            header += f"  {'allocated (KiB)'.rjust(16)}  {'peak (KiB)'.rjust(11)}"
+
+        lines = [header, "-" * len(header)]
+        for phase in phases:
+            line = f"{phase.name.ljust(width)}  {str(phase.calls).rjust(8)}  {format(phase.self * 1000, '.2f').rjust(11)}  {format(phase.total * 1000, '.2f').rjust(11)}"
+            if self.allocations:
+                line += f"  {format(phase.allocated / 1024, '.1f').rjust(16)}  {format(phase.peak / 1024, '.1f').rjust(11)}"
+            lines.append(line)
+
+        if len(self.counters) != 0:
+            lines.append("")
+
+            width = max(len(name) for name in self.counters)
+            for name, value in self.counters.items():
+                lines.append(f"{name.ljust(width)}  {value}")
+
+        return "\n".join(lines)
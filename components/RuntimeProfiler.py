@@ -0,0 +1,200 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# profiles opal programs in terms of opal source (the "profile" command).
+# function calls and times come from cProfile, while hot lines and stacks come from sampling the program
+
+import os, sys, builtins, cProfile, linecache, threading
+from collections          import Counter
+from pstats               import Stats
+from timeit               import default_timer
+from components.SourceMap import register, lookup, rewriteStats, formatException
+
+# file name the profiled program is compiled with
+PROGRAM_FILE = "<opal program>"
+
+def getName(name):
+    if name == "_OPAL_MAIN_FUNCTION_": return "main"
+    return name
+
+class Sampler:
+    def __init__(self, interval = 0.001):
+        self.interval = interval
+        self.samples  = Counter()
+        self.__thread = None
+        self.__target = None
+        self.__stop   = threading.Event()
+
+    def __run(self):
+        while not self.__stop.wait(self.interval):
+            frame = sys._current_frames().get(self.__target)
+            stack = []
+            while frame is not None:
+                stack.append((frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+
+            if len(stack) != 0:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def start(self):
+        self.__target = threading.get_ident()
+        self.__thread = threading.Thread(target = self.__run, daemon = True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        self.__thread.join()
+
+class ProgramProfile:
+    def __init__(self, sourceMap, interval = 0.001):
+        self.sourceMap = sourceMap
+        self.sources   = set(sourceMap.sources)
+        self.profiler  = cProfile.Profile()
+        self.sampler   = Sampler(interval)
+        self.stats     = None
+        self.elapsed   = 0.0
+
+        register(PROGRAM_FILE, sourceMap)
+
+    def run(self, code, fileName):
+        namespace = {"__name__": "__main__", "__file__": fileName, "__builtins__": builtins}
+
+        # the sampler can only look at the program when it gets the GIL
+        switchInterval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switchInterval, self.sampler.interval))
+
+        self.sampler.start()
+        time = default_timer()
+        try:
+            self.profiler.runctx(code, namespace, namespace)
+        except SystemExit:
+            pass
+        except Exception as e:
+            # the program's own failure shouldn't hide its profile.
+            # frames that run the program are left out of the traceback
+            tb = e.__traceback__
+            while tb is not None and tb.tb_frame.f_code.co_filename != PROGRAM_FILE:
+                tb = tb.tb_next
+
+            if tb is not None: e = e.with_traceback(tb)
+            print(formatException(e), end = "", file = sys.stderr)
+        finally:
+            self.elapsed = default_timer() - time
+            self.sampler.stop()
+            sys.setswitchinterval(switchInterval)
+
+            self.stats = rewriteStats(Stats(self.profiler))
+
+    def isOpal(self, fileName):
+        return fileName in self.sources
+
+    def mapFrame(self, code, line):
+        found = lookup(code.co_filename, line)
+        if found is None: return code.co_filename, line
+        return found
+
+    # stacks start from the program's code, leaving out the frames that run it
+    def getStacks(self):
+        for stack, count in self.sampler.samples.items():
+            for i, (code, _) in enumerate(stack):
+                if code.co_filename == PROGRAM_FILE:
+                    yield stack[i:], count
+                    break
+
+    def getFunctions(self, everything = False):
+        functions = []
+        for (fileName, line, name), (cc, nc, tt, ct, _) in self.stats.stats.items():
+            if everything or self.isOpal(fileName):
+                functions.append((fileName, line, name, nc, cc, tt, ct))
+
+        return functions
+
+    def getLines(self):
+        own   = Counter()
+        total = Counter()
+        for stack, count in self.getStacks():
+            seen = set()
+            for code, line in stack:
+                fileName, line = self.mapFrame(code, line)
+                if not self.isOpal(fileName): continue
+
+                if (fileName, line) not in seen:
+                    seen.add((fileName, line))
+                    total[(fileName, line)] += count
+
+            code, line = stack[-1]
+            fileName, line = self.mapFrame(code, line)
+            if self.isOpal(fileName):
+                own[(fileName, line)] += count
+
+        return own, total
+
+    # one line per stack, in the format flame graph tools expect
+    def getCollapsedStacks(self):
+        stacks = Counter()
+        for stack, count in self.getStacks():
+            names = []
+            for code, _ in stack:
+                fileName, line = self.mapFrame(code, code.co_firstlineno)
+                names.append(f"{getName(code.co_name)} ({os.path.basename(fileName)}:{line})")
+
+            stacks[";".join(names)] += count
+
+        return [f"{stack} {count}" for stack, count in stacks.items()]
+
+    def writeCollapsedStacks(self, fileName):
+        with open(fileName, "w", encoding = "utf-8") as file:
+            for line in self.getCollapsedStacks():
+                file.write(line + "\n")
+
+    def report(self, amount = 20, everything = False):
+        samples = sum(self.sampler.samples.values())
+        lines   = [f"program ran for {round(self.elapsed, 4)} seconds, {samples} samples taken", ""]
+
+        functions = sorted(self.getFunctions(everything), key = lambda function: function[5], reverse = True)[:amount]
+        functions = [(f"{getName(name)} ({os.path.basename(fileName)}:{line})", *rest) for fileName, line, name, *rest in functions]
+        width     = max([len("function")] + [len(function[0]) for function in functions])
+
+        lines.append(f"{'function'.ljust(width)}  {'calls'.rjust(10)}  {'self (ms)'.rjust(11)}  {'total (ms)'.rjust(11)}  {'per call (us)'.rjust(13)}")
+        lines.append("-" * (width + 53))
+        for name, calls, primitive, self_, total in functions:
+            calls_ = str(calls) if calls == primitive else f"{calls}/{primitive}"
+            lines.append(
+                f"{name.ljust(width)}  {calls_.rjust(10)}  " +
+                f"{format(self_ * 1000, '.3f').rjust(11)}  {format(total * 1000, '.3f').rjust(11)}  " +
+                f"{format(total / calls * 1000000 if calls != 0 else 0, '.2f').rjust(13)}"
+            )
+
+        own, total = self.getLines()
+        if samples != 0:
+            lines += ["", f"{'line'.ljust(24)}  {'self'.rjust(7)}  {'total'.rjust(7)}  source", "-" * 60]
+
+            for (fileName, line), count in sorted(total.items(), key = lambda item: (own[item[0]], item[1]), reverse = True)[:amount]:
+                location = f"{os.path.basename(fileName)}:{line}"
+                lines.append(
+                    f"{location.ljust(24)}  {format(own[(fileName, line)] / samples * 100, '.1f').rjust(6)}%  " +
+                    f"{format(count / samples * 100, '.1f').rjust(6)}%  {linecache.getline(fileName, line).strip()}"
+                )
+
+        return "\n".join(lines)
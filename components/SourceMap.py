@@ -0,0 +1,249 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# maps lines of generated Python and Cython code back to the opal source they came from (--source-map).
+# usage: python components/SourceMap.py traceback [file]
+#        python components/SourceMap.py stats profileFile [sort] [amount]
+
+import os, re, sys, json, linecache, traceback
+
+SOURCE_MAP_VERSION = 1
+
+class SourceMap:
+    def __init__(self, sources = None, mappings = None):
+        self.sources  = [] if sources is None else sources
+        # for every generated line, None or a [source index, line number] pair
+        self.mappings = [] if mappings is None else mappings
+
+    # origins are (SourceFile, line index) pairs or None, one for each generated line
+    @staticmethod
+    def fromOrigins(origins):
+        sourceMap = SourceMap()
+        indices   = {}
+
+        for origin in origins:
+            if origin is None:
+                sourceMap.mappings.append(None)
+                continue
+
+            source, idx = origin
+            line = source.getLineNumber(idx)
+            if line < 1:
+                sourceMap.mappings.append(None)
+                continue
+
+            name = source.name if source.path is None else source.path
+            if name not in indices:
+                indices[name] = len(sourceMap.sources)
+                sourceMap.sources.append(name)
+
+            sourceMap.mappings.append([indices[name], line])
+
+        return sourceMap
+
+    def lookup(self, line):
+        if line < 1 or line > len(self.mappings): return None
+
+        mapping = self.mappings[line - 1]
+        if mapping is None: return None
+        return self.sources[mapping[0]], mapping[1]
+
+    def dumps(self):
+        return json.dumps({"version": SOURCE_MAP_VERSION, "sources": self.sources, "mappings": self.mappings}, separators = (",", ":"))
+
+    @staticmethod
+    def loads(data):
+        data = json.loads(data)
+        if data.get("version") != SOURCE_MAP_VERSION: return None
+        return SourceMap(data["sources"], data["mappings"])
+
+    def write(self, fileName):
+        with open(fileName, "w", encoding = "utf-8") as file:
+            file.write(self.dumps())
+
+    @staticmethod
+    def load(fileName):
+        try:
+            with open(fileName, "r", encoding = "utf-8") as file:
+                return SourceMap.loads(file.read())
+        except (OSError, ValueError, KeyError):
+            return None
+
+# source maps of generated files, found through their ".map" sidecar or registered directly
+sourceMaps = {}
+
+def register(fileName, sourceMap):
+    sourceMaps[fileName] = sourceMap
+
+def getSourceMap(fileName):
+    if fileName not in sourceMaps:
+        if os.path.exists(fileName + ".map"):
+              sourceMaps[fileName] = SourceMap.load(fileName + ".map")
+        else: sourceMaps[fileName] = None
+
+    return sourceMaps[fileName]
+
+def lookup(fileName, line):
+    sourceMap = getSourceMap(fileName)
+    if sourceMap is None: return None
+    return sourceMap.lookup(line)
+
+def rewriteFrames(frames):
+    result = traceback.StackSummary()
+    for frame in frames:
+        found = lookup(frame.filename, frame.lineno)
+        if found is None:
+            result.append(frame)
+            continue
+
+        fileName, line = found
+        result.append(traceback.FrameSummary(
+            fileName, line, frame.name, locals = frame.locals,
+            line = linecache.getline(fileName, line).strip()
+        ))
+
+    return result
+
+def formatException(exc):
+    info = traceback.TracebackException.from_exception(exc)
+
+    curr = info
+    while curr is not None:
+        curr.stack = rewriteFrames(curr.stack)
+        curr = curr.__cause__ if curr.__cause__ is not None else curr.__context__
+
+    return "".join(info.format())
+
+def excepthook(type_, value, tb):
+    print(formatException(value), end = "", file = sys.stderr)
+
+# prints tracebacks of uncaught exceptions in terms of opal source
+def install():
+    sys.excepthook = excepthook
+
+FRAME_LINE = re.compile(r'File "(.+?)", line (\d+)')
+
+# rewrites a traceback that was already printed
+def rewriteTraceback(text):
+    lines  = text.split("\n")
+    result = []
+    skip   = False
+    for line in lines:
+        # the generated line and the markers under it are replaced by the opal line
+        if skip and line.startswith("    ") and not line.lstrip().startswith("File "):
+            continue
+
+        skip  = False
+        match = FRAME_LINE.search(line)
+        if match is not None:
+            found = lookup(match.group(1), int(match.group(2)))
+            if found is not None:
+                fileName, number = found
+                result.append(line[:match.start()] + f'File "{fileName}", line {number}' + line[match.end():])
+
+                source = linecache.getline(fileName, number).strip()
+                if source != "": result.append("    " + source)
+                skip = True
+                continue
+
+        result.append(line)
+
+    return "\n".join(result)
+
+def mapFunction(function):
+    fileName, line, name = function
+    found = lookup(fileName, line)
+    if found is None: return function
+    return found[0], found[1], name
+
+# rewrites a pstats.Stats object (from cProfile or profile) in place
+def rewriteStats(stats):
+    from pstats import add_func_stats, add_callers
+
+    result = {}
+    for function, (cc, nc, tt, ct, callers) in stats.stats.items():
+        mappedCallers = {}
+        for caller, value in callers.items():
+            caller = mapFunction(caller)
+            if caller in mappedCallers:
+                  mappedCallers = add_callers(mappedCallers, {caller: value})
+            else: mappedCallers[caller] = value
+
+        function = mapFunction(function)
+        if function in result:
+              result[function] = add_func_stats(result[function], (cc, nc, tt, ct, mappedCallers))
+        else: result[function] = (cc, nc, tt, ct, mappedCallers)
+
+    stats.stats     = result
+    stats.top_level = {mapFunction(function) for function in stats.top_level}
+    stats.fcn_list  = None
+    return stats
+
+# rewrites line_profiler timings ({(file, first line, function): [(line, hits, time), ...]})
+def rewriteLineTimings(timings):
+    result = {}
+    for (fileName, firstLine, name), lines in timings.items():
+        sourceMap = getSourceMap(fileName)
+        if sourceMap is None:
+            result[(fileName, firstLine, name)] = lines
+            continue
+
+        found = sourceMap.lookup(firstLine)
+        key   = (fileName, firstLine, name) if found is None else (found[0], found[1], name)
+
+        merged = {}
+        for line, hits, time in lines:
+            found = sourceMap.lookup(line)
+            if found is not None: line = found[1]
+
+            if line in merged:
+                  merged[line] = (line, merged[line][1] + hits, merged[line][2] + time)
+            else: merged[line] = (line, hits, time)
+
+        result[key] = sorted(merged.values())
+
+    return result
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("traceback", "stats"):
+        print("usage: SourceMap.py traceback [file] | SourceMap.py stats profileFile [sort] [amount]")
+        sys.exit(1)
+
+    if sys.argv[1] == "traceback":
+        if len(sys.argv) > 2:
+            with open(sys.argv[2], "r", encoding = "utf-8") as file:
+                  text = file.read()
+        else: text = sys.stdin.read()
+
+        print(rewriteTraceback(text), end = "")
+    else:
+        from pstats import Stats
+
+        if len(sys.argv) < 3:
+            print("a profile file is required")
+            sys.exit(1)
+
+        stats = rewriteStats(Stats(sys.argv[2]))
+        stats.sort_stats(sys.argv[3] if len(sys.argv) > 3 else "cumulative")
+        stats.print_stats(int(sys.argv[4]) if len(sys.argv) > 4 else 30)
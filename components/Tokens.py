@@ -22,23 +22,122 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-import colorama
+import colorama, re
 
+from array            import array
+from sys              import intern
 from components.utils import MutableStringBuffer
 
+# groups: newline, spaces, comment, string, alternative string, word, symbol
+TOKEN_REGEX = re.compile(r"""(\n)|([ \t]+)|(#[^\n]*)|("[^"]*"?)|('[^']*'?)|(\w+)|(.)""", re.DOTALL)
+
+GLUE_TOKENS = {
+    "+": ("+", "="),
+    "-": ("-", "="),
+    "!": ("=", ),
+    "|": ("|", "="),
+    "&": ("&", "="),
+    ":": ("=", ),
+    "^": ("=", ),
+    "%": ("=", ),
+    "=": ("=", ),
+    "*": ("*", "="),
+    "/": ("/", "="),
+    ">": (">", "="),
+    "<": ("<", "=", "-")
+}
+
+STRING_PREFIXES = ("f", "r", "b", "fr", "br", "rf", "rb")
+REPLACE_TOKENS  = {
+    "||": "or",
+    "&&": "and",
+    "!":  "not",
+    "?":  "_OPAL_PRINT_RETURN_"
+}
+
+BRACKETS = {
+    "(": ")",
+    "[": "]",
+    "{": "}"
+}
+CLOSING_BRACKETS = set(BRACKETS.values())
+
+# spacing flags used by join. a space is needed between two tokens if
+# a word follows a token ending in a word or number (WORD and BEFORE_WORD), or
+# if a token that could continue an identifier follows one (CONTINUE and IDENTIFIER)
+SPACING_WORD        = 1
+SPACING_CONTINUE    = 2
+SPACING_BEFORE_WORD = 4
+SPACING_IDENTIFIER  = 8
+
+spacingCache = {}
+
+def getSpacingFlags(tok):
+    flags = spacingCache.get(tok)
+    if flags is not None: return flags
+
+    if tok.isidentifier() or tok[0].isidentifier():
+        flags = SPACING_WORD | SPACING_BEFORE_WORD
+    elif ("_" + tok).isidentifier():
+        flags = SPACING_CONTINUE
+    else:
+        flags = 0
+
+    if tok.isdigit():      flags |= SPACING_BEFORE_WORD
+    if tok.isidentifier(): flags |= SPACING_IDENTIFIER
+
+    if len(spacingCache) > 65536: spacingCache.clear()
+    spacingCache[tok] = flags
+    return flags
+
+def needsSpace(last, tok):
+    lastFlags = getSpacingFlags(last)
+    flags     = getSpacingFlags(tok)
+
+    return (
+        (flags & SPACING_WORD     and lastFlags & SPACING_BEFORE_WORD) or 
+        (flags & SPACING_CONTINUE and lastFlags & SPACING_IDENTIFIER)
+    )
+
+def spacedStrings(toks):
+    if len(toks) == 0: return []
+
+    get    = spacingCache.get
+    result = [toks[0]]
+    last   = getSpacingFlags(toks[0])
+    for tok in toks[1:]:
+        flags = get(tok)
+        if flags is None: flags = getSpacingFlags(tok)
+
+        if (
+            (flags & SPACING_WORD     and last & SPACING_BEFORE_WORD) or 
+            (flags & SPACING_CONTINUE and last & SPACING_IDENTIFIER)
+        ): 
+            result.append(" " + tok)
+        else:
+            result.append(tok)
+
+        last = flags
+
+    return result
+
 class Token:
+    __slots__ = ("tok", "line", "pos", "tokens")
+
     def __init__(self, tok, line = 0, pos = 0, tokens = None):
-        self.tok     : str = tok
-        self.line    : int = line
-        self.pos     : int = pos
-        self.maxline : int = 1000
+        self.tok  : str = tok
+        self.line : int = line
+        self.pos  : int = pos
 
-        self.tokens : Tokens = tokens
+        self.tokens : TokenStore = tokens
+
+    @property
+    def maxline(self) -> int:
+        if self.tokens is None: return 1000
+        return self.tokens.maxline
 
     def copy(self):
-        tok = Token(self.tok, self.line, self.pos, self.tokens)
-        tok.maxline = self.maxline
-        return tok
+        return Token(self.tok, self.line, self.pos, self.tokens)
 
     def __getlines(self):
         if self.line <= 3:
@@ -49,8 +148,33 @@ class Token:
         
         return range(self.line - 3, self.line + 2)
     
+    def getOrigin(self):
+        if self.tokens is None or self.tokens.origins is None or self.line > len(self.tokens.origins):
+            return None
+        
+        origin = self.tokens.origins[self.line - 1]
+        if origin is None or origin[0].getLineNumber(origin[1]) < 1: return None
+        return origin
+    
     def __message(self, type_, color, msg, location):
+        origin = self.getOrigin()
+
         if self.tokens is None: print(color + f"{type_}{colorama.Style.RESET_ALL} {location[0]}:", msg)
+        elif origin is not None:
+            source, idx = origin
+            lines = source.lines
+
+            start = max(source.offset, min(idx - 2, len(lines) - 5))
+            end   = min(len(lines), start + 5)
+            maxlineLen = len(str(source.getLineNumber(end - 1)))
+
+            print(color + f"{type_}{colorama.Style.RESET_ALL} ({location[0]}, line {source.getLineNumber(idx)}, pos {self.pos}):", msg)
+
+            for line in range(start, end):
+                print(f"{str(source.getLineNumber(line)).rjust(maxlineLen)} | " + lines[line].rstrip())
+
+                if line == idx:
+                    print((" " * maxlineLen) + " |" + (" " * (self.pos + 1)) + color + ("^" * len(self.tok)) + colorama.Style.RESET_ALL)
         else:
             maxlineLen = len(str(self.maxline))
 
@@ -77,16 +201,182 @@ class Token:
     def note(self, msg, location):
         self.__message("note", colorama.Fore.LIGHTBLUE_EX, msg, location)
 
-class Tokens:
+# token data is kept column by column: token views are only created when the compiler reads them
+class TokenStore:
     def __init__(self, source):
+        self.toks      = []
+        self.lines     = array("I")
+        self.positions = array("I")
+        self.source    = source.split("\n")
+        self.maxline   = len(self.source)
+        # where each line comes from, if the source was preprocessed
+        self.origins   = None
+
+        self.partners   = None
+        self.unsafe     = None
+        self.semicolons = None
+
+        self.joined = {}
+
+    @classmethod
+    def fromTokens(self, tokens, source):
+        store = TokenStore(source)
+        for token in tokens:
+            store.add(token.tok, token.line, token.pos)
+        return store
+
+    def __len__(self):
+        return len(self.toks)
+
+    def add(self, tok, line, pos):
+        self.toks.append(intern(tok))
+        self.lines.append(line)
+        self.positions.append(pos)
+
+    def get(self, idx) -> Token:
+        line = self.lines[idx]
+
+        # line 0 is used by tokens that don't come from the source (for example, "()" after "super")
+        if line == 0: return Token(self.toks[idx])
+        return Token(self.toks[idx], line, self.positions[idx], self)
+    
+    # matches every bracket with its partner in a single pass.
+    # backslashes and brackets that don't match are counted as unsafe, 
+    # and jumps are never allowed across them
+    def buildIndex(self):
+        toks       = self.toks
+        partners   = array("i", [-1]) * len(toks)
+        unsafe     = array("I", [0])  * (len(toks) + 1)
+        semicolons = array("I", [0])  * (len(toks) + 1)
+
+        stack = []
+        unsafeCnt = 0
+        semiCnt   = 0
+        for i, tok in enumerate(toks):
+            if tok in BRACKETS:
+                stack.append(i)
+            elif tok in CLOSING_BRACKETS:
+                if len(stack) != 0 and BRACKETS[toks[stack[-1]]] == tok:
+                    other = stack.pop()
+                    partners[other] = i
+                    partners[i]     = other
+                else:
+                    unsafeCnt += 1
+            elif tok == "\\":
+                unsafeCnt += 1
+            elif tok == ";":
+                semiCnt += 1
+
+            unsafe[i + 1]     = unsafeCnt
+            semicolons[i + 1] = semiCnt
+
+        self.partners   = partners
+        self.unsafe     = unsafe
+        self.semicolons = semicolons
+
+    # returns the index of the bracket closing the one at idx, 
+    # or -1 if the tokens between them can't be skipped safely
+    def partner(self, idx):
+        if self.partners is None: self.buildIndex()
+
+        other = self.partners[idx]
+        if other <= idx or self.unsafe[other] != self.unsafe[idx + 1]:
+            return -1
+        
+        return other
+    
+    def countSemicolons(self, start, end):
+        if self.semicolons is None: self.buildIndex()
+        return self.semicolons[end] - self.semicolons[start]
+    
+    def join(self, start, end):
+        if start >= end: return ""
+
+        key = (start, end)
+        if key in self.joined: return self.joined[key]
+
+        text = "".join(spacedStrings(self.toks[start:end]))
+        self.joined[key] = text
+        return text
+
+class TokenSpan:
+    def __init__(self, store : TokenStore, start, end):
+        self.store = store
+        self.start = start
+        self.end   = end
+
+    def __len__(self):
+        return self.end - self.start
+    
+    def __getitem__(self, idx):
+        length = self.end - self.start
+
+        if type(idx) is slice:
+            start, stop, _ = idx.indices(length)
+            return TokenSpan(self.store, self.start + start, self.start + max(start, stop))
+        
+        if idx < 0: idx += length
+        if idx < 0 or idx >= length:
+            raise IndexError("token index out of range")
+        
+        return self.store.get(self.start + idx)
+    
+    def __iter__(self):
+        for idx in range(self.start, self.end):
+            yield self.store.get(idx)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+    
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def at(self, idx) -> Token:
+        return self.store.get(self.start + idx)
+    
+    def tok(self, idx):
+        return self.store.toks[self.start + idx]
+    
+    def partner(self, idx):
+        other = self.store.partner(self.start + idx)
+        if other == -1 or other >= self.end: return -1
+        return other - self.start
+    
+    def count(self, tok):
+        if tok == ";": return self.store.countSemicolons(self.start, self.end)
+        return self.strings().count(tok)
+
+    def strings(self):
+        return self.store.toks[self.start:self.end]
+    
+    def join(self):
+        return self.store.join(self.start, self.end)
+
+class Tokens:
+    # fast selects the table-driven tokenizer when the source is a string
+    def __init__(self, source, origins = None, fast = False):
         if   type(source) is str:
-            self.tokens = self.tokenize(source)
-            self.source = source.split("\n")
+            store = self.tokenize(source, fast)
+            store.origins = origins
+
+            self.tokens  = TokenSpan(store, 0, len(store))
+            self.source  = store.source
+            self.maxline = store.maxline
+        elif type(source) is TokenSpan:
+            self.tokens  = source
+            self.source  = source.store.source
+            self.maxline = source.store.maxline
         elif type(source) is list:
-            self.tokens = source
-            self.source = []
+            self.tokens  = source
+            self.source  = []
+            self.maxline = 1000
+
+        if type(self.tokens) is TokenSpan:
+              self.__get = self.tokens.at
+        else: self.__get = self.tokens.__getitem__
 
-        self.pos = 0
+        self.length = len(self.tokens)
+        self.pos    = 0
 
     def copy(self):
         tmp = Tokens(self.tokens)
@@ -96,19 +386,19 @@ class Tokens:
         return tmp
 
     def isntFinished(self):
-        return self.pos < len(self.tokens)
+        return self.pos < self.length
 
     def peek(self) -> Token:
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
+        if self.pos < self.length:
+            return self.__get(self.pos)
 
     def next(self) -> Token:
-        if self.pos < len(self.tokens):
-            tmp = self.tokens[self.pos]
+        if self.pos < self.length:
+            tmp = self.__get(self.pos)
             self.pos += 1
             return tmp
         
-        self.tokens[self.pos - 1].error("invalid syntax: the expression wasn't properly closed. no tokens remaining", "<main>")
+        self.tokens[self.pos - 1].error("invalid syntax: the expression wasn't properly closed. no tokens remaining", ("in <main>", 0))
     
     def last(self) -> Token:
         return self.tokens[self.pos - 1]
@@ -149,31 +439,150 @@ class Tokens:
         return False
     
     def join(self):
-        buf = ""
-        lastIsIdentifier = False
-        lastIdentifier   = None
-        for token in self.tokens:
-            if token.tok.isidentifier() or token.tok[0].isidentifier():
-                if lastIsIdentifier:
-                    buf += " " + token.tok
-                    lastIdentifier = token.tok
-                    continue
-
-                lastIsIdentifier = True
+        if type(self.tokens) is TokenSpan:
+            return self.tokens.join()
+        
+        return "".join(spacedStrings([token.tok for token in self.tokens]))
+    
+    # joins tokens, lists and spans as if they were a single list. 
+    # spans are joined through the store, so repeated ones are only joined once
+    @classmethod
+    def joinParts(self, *parts):
+        buf  = []
+        last = None
+        for part in parts:
+            if type(part) is Token:
+                text  = part.tok
+                first = text
+                end   = text
+            elif len(part) == 0:
+                continue
             else:
-                lastIsIdentifier = token.tok.isdigit()
+                if type(part) is TokenSpan: text = part.join()
+                else:                       text = Tokens(part).join()
+
+                first = part[0].tok
+                end   = part[-1].tok
 
-                if lastIdentifier is not None and (lastIdentifier + token.tok).isidentifier():
-                    buf += " " + token.tok
-                    lastIdentifier = token.tok
+            if last is not None and needsSpace(last, first):
+                buf.append(" ")
+
+            buf.append(text)
+            last = end
+
+        return "".join(buf)
+
+    def tokenize(self, source, fast = False):
+        if fast:
+            return self.tokenizeFast(source)
+        
+        return TokenStore.fromTokens(self.tokenizeLegacy(source), source)
+    
+    @classmethod
+    def rawTokens(self, source):
+        line     = 1
+        lineBase = 0
+        lastSym  = False
+        strEnd   = -1
+        tok      = None
+
+        for found in TOKEN_REGEX.finditer(source):
+            kind  = found.lastindex
+            start = found.start()
+
+            match kind:
+                case 1: # newline
+                    line    += 1
+                    lineBase = start + 1
+                case 2 | 3: pass # spaces, comment
+                case 4 | 5: # strings
+                    if tok is not None: yield tok
+
+                    text = found.group(kind)
+                    tok  = [text, line, start - lineBase]
+
+                    newlines = text.count("\n")
+                    if newlines != 0:
+                        # a newline inside a string doesn't reset the position counter
+                        # to the start of the line, so the next line is shifted by one
+                        line    += newlines
+                        lineBase = start + text.rindex("\n")
+
+                    strEnd = found.end()
+                case 6: # word
+                    if (not lastSym) and start == strEnd:
+                        tok[0] += found.group(kind)
+                        continue
+
+                    if tok is not None: yield tok
+
+                    tok     = [found.group(kind), line, start - lineBase]
+                    lastSym = False
+                case _: # symbol
+                    if tok is not None: yield tok
+
+                    tok     = [found.group(kind), line, start - lineBase]
+                    lastSym = True
+
+        if tok is not None: yield tok
+
+    def tokenizeFast(self, source):
+        store     = TokenStore(source)
+        toks      = store.toks
+        lines     = store.lines
+        positions = store.positions
+        isSuper   = False
+
+        def add(tok, line, pos):
+            nonlocal isSuper
+
+            if isSuper and tok != "(":
+                toks.append("()")
+                lines.append(0)
+                positions.append(0)
+
+            isSuper = tok == "super"
+
+            toks.append(intern(REPLACE_TOKENS.get(tok, tok)))
+            lines.append(line)
+            positions.append(pos)
+
+        curr = None
+        for next in self.rawTokens(source):
+            if curr is None:
+                curr = next
+                continue
+
+            tok     = curr[0]
+            nextTok = next[0]
+
+            if tok in GLUE_TOKENS:
+                glue = nextTok in GLUE_TOKENS[tok]
+            elif tok in STRING_PREFIXES:
+                glue = nextTok[0] in "\"'"
+            elif tok == '""' or tok == "''":
+                glue = nextTok.startswith(tok[0])
+
+                if (not glue) and len(toks) != 0 and toks[-1].endswith(tok[0]):
+                    toks[-1] = intern(toks[-1] + tok)
+                    curr = next
                     continue
+            else:
+                glue = False
+
+            if glue:
+                add(tok + nextTok, curr[1], curr[2])
+                curr = None
+            else:
+                add(tok, curr[1], curr[2])
+                curr = next
 
-            lastIdentifier = token.tok
-            buf += token.tok
+        if curr is not None:
+            add(*curr)
 
-        return buf
+        return store
 
-    def tokenize(self, source):
+    def tokenizeLegacy(self, source):
         line = 1
         pos  = 0
         tmp           = [Token(MutableStringBuffer(), line, pos, self)]
@@ -252,12 +661,7 @@ class Tokens:
 
             pos += 1
 
-        clean = []
-        for token in tmp:
-            if str(token.tok) != "":
-                token.maxline = line
-                clean.append(token)
-        tmp = clean
+        tmp = [token for token in tmp if str(token.tok) != ""]
 
         tokens = []
         i = 0
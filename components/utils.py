@@ -22,6 +22,18 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import os, sys
+
+def getDefaultCacheDir():
+    if "OPAL_CACHE_DIR" in os.environ:
+        return os.environ["OPAL_CACHE_DIR"]
+
+    if sys.platform == "win32":
+          base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else: base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+
+    return os.path.join(base, "opal")
+
 class NameStack:
     def __init__(self):
         self.array = []
@@ -102,27 +114,84 @@ class MutableStringBuffer:
     def __str__(self):
         return "".join(self._array)
 
+class SourceFile:
+    def __init__(self, name, lines, offset = 0, path = None):
+        self.name   = name
+        self.lines  = lines
+        # number of lines prepended to the file before preprocessing
+        self.offset = offset
+        self.path   = path
+
+    def getLineNumber(self, idx):
+        return idx + 1 - self.offset
+
+# preprocessed code, along with the origin of every line as a (SourceFile, line index) pair
+class SourceBuffer:
+    def __init__(self, text = "", origins = None):
+        self.buffer  = MutableStringBuffer()
+        self.buffer += text
+        self.origins = [] if origins is None else origins
+
+    def add(self, text, origin = None):
+        if type(text) is SourceBuffer:
+            self.buffer  += text.buffer
+            self.origins += text.origins
+        else:
+            self.buffer += text
+
+            count = text.count("\n")
+            if   count == 1: self.origins.append(origin)
+            elif count != 0: self.origins += [origin] * count
+
+    def __str__(self):
+        return str(self.buffer)
+
+# an included file being preprocessed, along with every file it depends on
+class IncludeFrame:
+    def __init__(self, path, mtime):
+        self.path      = path
+        self.deps      = {path: mtime}
+        self.cacheable = True
+
+# preprocessed include, and the state the preprocessor is left in after it
+class CachedInclude:
+    def __init__(self, result, deps, consts, preConsts, macros, onceFiles):
+        self.result    = result
+        self.deps      = deps
+        self.consts    = consts
+        self.preConsts = preConsts
+        self.macros    = macros
+        self.onceFiles = onceFiles
+
+    def isValid(self):
+        for path, mtime in self.deps.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime: return False
+            except OSError: return False
+
+        return True
+
 class Macro:
     def __init__(self, name, args = None):
         self.name = name
         self.args = args
-        self.code = MutableStringBuffer()
+        self.code = SourceBuffer()
 
-    def add(self, line):
-        self.code += line
+    def add(self, line, origin):
+        self.code.add(line, origin)
 
 class IfBlock:
     def __init__(self, cond):
         self.cond     = cond
-        self.ifCode   = MutableStringBuffer()
-        self.elseCode = MutableStringBuffer()
+        self.ifCode   = SourceBuffer()
+        self.elseCode = SourceBuffer()
         self._else    = False
 
-    def add(self, line):
+    def add(self, line, origin):
         if self._else:
-            self.elseCode += line
+            self.elseCode.add(line, origin)
         else:
-            self.ifCode += line
+            self.ifCode.add(line, origin)
 
     def elseBlock(self):
         self._else = True
\ No newline at end of file
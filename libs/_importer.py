@@ -0,0 +1,106 @@
+"""
+MIT License
+
+Copyright (c) 2020 thatsOven
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# lets opal modules be imported like Python ones, by teaching the path based finder about ".opal" files.
+# modules are compiled when they're first imported (going through the build cache), and Python modules 
+# with the same name in the same directory take precedence
+
+import os, sys
+from importlib.abc       import Loader
+from importlib.machinery import (
+    FileFinder, ExtensionFileLoader, SourceFileLoader, SourcelessFileLoader,
+    EXTENSION_SUFFIXES, SOURCE_SUFFIXES, BYTECODE_SUFFIXES
+)
+
+OPAL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+useCache = True
+
+class OpalLoader(Loader):
+    def __init__(self, fullname, path):
+        self.name = fullname
+        self.path = path
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        exec(self.get_code(module.__name__), module.__dict__)
+
+    def get_filename(self, fullname):
+        return self.path
+
+    def get_code(self, fullname):
+        from components.Compiler   import Compiler
+        from components.BuildCache import BuildCache
+
+        home = os.path.dirname(self.path)
+
+        compiler = Compiler()
+        compiler.preConsts["RELEASE_MODE"] = "False"
+        compiler.preConsts["OPAL_DIR"]     = f"r'{OPAL_DIR}'"
+        compiler.initMain()
+        compiler.preConsts["HOME_DIR"]     = f'r"{home}"'
+        top = 'new dynamic HOME_DIR=r"' + home + '";'
+
+        if useCache:
+            code = BuildCache().compileCode(compiler, self.path, top, f"<{self.path}>")
+        else:
+            result = compiler.compileFile(self.path, top)
+            code   = None if compiler.hadError else compile(result, f"<{self.path}>", "exec")
+
+        if code is None:
+            raise ImportError(f'could not compile opal module "{fullname}"', name = fullname, path = self.path)
+
+        return code
+
+def isOpalHook(hook):
+    return getattr(hook, "_OPAL_HOOK_", False)
+
+def install(*paths, cache = True):
+    global useCache
+    useCache = cache
+
+    for path in paths:
+        path = os.path.abspath(path)
+        if path not in sys.path:
+            sys.path.append(path)
+
+    if any(isOpalHook(hook) for hook in sys.path_hooks): return
+
+    hook = FileFinder.path_hook(
+        (ExtensionFileLoader,  EXTENSION_SUFFIXES),
+        (SourceFileLoader,     SOURCE_SUFFIXES),
+        (SourcelessFileLoader, BYTECODE_SUFFIXES),
+        (OpalLoader,           [".opal"])
+    )
+    hook._OPAL_HOOK_ = True
+
+    # the default file finder hook is the last one, and accepts every directory
+    sys.path_hooks.insert(len(sys.path_hooks) - 1, hook)
+    sys.path_importer_cache.clear()
+
+def uninstall():
+    sys.path_hooks[:] = [hook for hook in sys.path_hooks if not isOpalHook(hook)]
+    sys.path_importer_cache.clear()
@@ -1,4 +1,9 @@
-from typeguard import check_type
+import os, sys, atexit
+from typeguard import check_type, CollectionCheckStrategy, TypeCheckError
+from typing    import get_origin, get_args
+from itertools import islice
+from random    import Random
+from timeit    import default_timer
 
 class dynamic: pass
 
@@ -28,30 +33,188 @@ def mode(mode: _TypeMode):
             raise TypeError(f'Invalid type mode "{mode}"')
         
         cls._OPAL_TYPEMODE_ = mode._REP_
+        # subclasses inherit the mode, so every checker built so far could be outdated
+        for checkers in _CHECKER_CACHES: checkers.clear()
+        _EXACT_TYPES.clear()
         return cls
     return fn
 
 _AUTOCAST_TYPES = (str, int, float, tuple, list, set, dict, bool, bytes)
 
-def _OPAL_CHECK_TYPE_(value, type_):
+# checkers specialized for each type are built on first use, and cached separately for each container policy
+_CHECKER_CACHES = []
+# types whose values pass their check unchanged when they have exactly that type
+_EXACT_TYPES    = set()
+
+# container policies decide how much of a container is checked against a parameterized type
+# (list[int], dict[str, float]...). "first" checks the first item, "sample" checks a few items
+# at random positions, so that repeated checks eventually cover the whole container, and "all" checks every item
+_SAMPLE_SIZE = 8
+# sampling has its own generator, so that it doesn't change the program's random numbers
+_SAMPLER     = Random()
+
+def _OPAL_CHECK_FIRST_ITEM_(value, type_):
+    return check_type(value, type_, collection_check_strategy = CollectionCheckStrategy.FIRST_ITEM)
+
+def _OPAL_CHECK_ALL_ITEMS_(value, type_):
+    return check_type(value, type_, collection_check_strategy = CollectionCheckStrategy.ALL_ITEMS)
+
+def _OPAL_CHECK_SAMPLED_(value, type_):
+    # checks the container itself and its first item
+    _OPAL_CHECK_FIRST_ITEM_(value, type_)
+
+    origin = get_origin(type_)
+    args   = get_args(type_)
+    if origin not in (list, tuple, set, frozenset, dict) or len(args) == 0 or len(value) <= 1: return value
+
+    try:
+        if origin is list or (origin is tuple and len(args) == 2 and args[1] is Ellipsis):
+            for i in _SAMPLER.sample(range(1, len(value)), min(_SAMPLE_SIZE, len(value) - 1)):
+                _OPAL_CHECK_SAMPLED_(value[i], args[0])
+        # sets and dicts can't be indexed, so the items after the first one are checked instead
+        elif origin in (set, frozenset):
+            for item in islice(value, 1, _SAMPLE_SIZE + 1):
+                _OPAL_CHECK_SAMPLED_(item, args[0])
+        elif origin is dict:
+            for key, item in islice(value.items(), 1, _SAMPLE_SIZE + 1):
+                _OPAL_CHECK_SAMPLED_(key, args[0])
+                _OPAL_CHECK_SAMPLED_(item, args[1])
+    except TypeCheckError:
+        # the container is checked again as a whole, so that the error says which item is wrong
+        _OPAL_CHECK_ALL_ITEMS_(value, type_)
+        raise
+
+    return value
+
+def _makeAutocastChecker(type_):
+    def checker(value):
+        if type(value) is type_: return value
+
+        try:    return type_(value)
+        except: return check_type(value, type_)
+    return checker
+
+def _makeHybridChecker(type_):
+    def checker(value):
+        # some classes, like typing.Any and protocols that aren't runtime checkable, refuse isinstance
+        try:
+            if isinstance(value, type_): return value
+        except TypeError: pass
+
+        try:    
+            tmp = type_(value)
+            assert tmp == value
+        except: return check_type(value, type_)
+        else:   return tmp
+    return checker
+
+def _makeChecker(type_, checkGeneric):
+    # parameterized types and typing constructs (unions, typing.List[int]...) aren't classes
+    if not isinstance(type_, type):
+        return lambda value: checkGeneric(value, type_)
+
     if issubclass(type_, OpalObject):
         match type_._OPAL_TYPEMODE_:
             case 0: pass # hybrid
             case 1: # check
-                return check_type(value, type_)
+                _EXACT_TYPES.add(type_)
+                return lambda value: check_type(value, type_)
             case 2: # force
-                return type_(value)
+                return type_
             case 3: # none
-                return value
+                _EXACT_TYPES.add(type_)
+                return lambda value: value
             case _:
                 raise TypeError(f'Invalid type mode "{type_._OPAL_TYPEMODE_}"')
 
-    orig = value
-    try:    
-        tmp = type_(value)
-        if type_ not in _AUTOCAST_TYPES: assert tmp == orig
-    except: return check_type(value, type_)
-    else:   return tmp 
+    _EXACT_TYPES.add(type_)
+    if type_ in _AUTOCAST_TYPES:
+        return _makeAutocastChecker(type_)
+    return _makeHybridChecker(type_)
+
+def _makeCheckFunction(checkGeneric):
+    checkers = {}
+    _CHECKER_CACHES.append(checkers)
+
+    def _OPAL_CHECK_TYPE_(value, type_):
+        # values that already have the type are neither converted nor copied
+        if type(value) is type_ and type_ in _EXACT_TYPES: return value
+
+        try:    checker = checkers.get(type_)
+        except TypeError: # unhashable types can't be cached
+            return _makeChecker(type_, checkGeneric)(value)
+
+        if checker is None:
+            checker = checkers[type_] = _makeChecker(type_, checkGeneric)
+        return checker(value)
+    return _OPAL_CHECK_TYPE_
+
+_OPAL_CHECK_TYPE_           = _makeCheckFunction(_OPAL_CHECK_FIRST_ITEM_)
+_OPAL_CHECK_TYPE_SAMPLED_   = _makeCheckFunction(_OPAL_CHECK_SAMPLED_)
+_OPAL_CHECK_TYPE_ALL_ITEMS_ = _makeCheckFunction(_OPAL_CHECK_ALL_ITEMS_)
 
 def _OPAL_FORCE_TYPE_(value, type_):
-    return type_(value)
\ No newline at end of file
+    return type_(value)
+
+# per-site type check statistics (--count-checks), as [calls, seconds, checks that went through typeguard] lists
+_CHECK_SITES     = {}
+_REPORTED_SITES  = 20
+_typeguardCheck  = check_type
+_typeguardChecks = 0
+
+def _countedCheckType(value, type_, **kwargs):
+    global _typeguardChecks
+    _typeguardChecks += 1
+    return _typeguardCheck(value, type_, **kwargs)
+
+def _reportChecks():
+    if len(_CHECK_SITES) == 0: return
+
+    sites = sorted(_CHECK_SITES.items(), key = lambda item: item[1][1], reverse = True)
+    calls = sum(stats[0] for _, stats in sites)
+    time  = sum(stats[1] for _, stats in sites)
+
+    names = [(os.path.basename(site) if site is not None else "<unknown>", stats) for site, stats in sites[:_REPORTED_SITES]]
+    width = max([len("site")] + [len(name) for name, _ in names])
+
+    lines = [
+        "", f"type checks: {calls} calls at {len(sites)} sites, {format(time * 1000, '.3f')} ms", "",
+        f"{'site'.ljust(width)}  {'calls'.rjust(10)}  {'total (ms)'.rjust(11)}  {'per call (ns)'.rjust(13)}  {'typeguard'.rjust(10)}",
+        "-" * (width + 54)
+    ]
+    for name, (calls, time, typeguard) in names:
+        lines.append(
+            f"{name.ljust(width)}  {str(calls).rjust(10)}  {format(time * 1000, '.3f').rjust(11)}  " +
+            f"{format(time / calls * 1000000000, '.0f').rjust(13)}  {str(typeguard).rjust(10)}"
+        )
+
+    if len(sites) > _REPORTED_SITES:
+        lines.append(f"... {len(sites) - _REPORTED_SITES} more sites")
+
+    print("\n".join(lines), file = sys.stderr)
+
+def _OPAL_COUNT_CHECKS_(check):
+    global check_type
+
+    if check_type is _typeguardCheck:
+        # checkers look check_type up when they fall back to typeguard, so they can be counted from here
+        check_type = _countedCheckType
+        atexit.register(_reportChecks)
+
+    # in check mode, every check goes straight to typeguard
+    direct = check is _typeguardCheck
+
+    def _OPAL_CHECK_TYPE_(value, type_, site = None):
+        if site in _CHECK_SITES:
+              stats = _CHECK_SITES[site]
+        else: stats = _CHECK_SITES[site] = [0, 0.0, 0]
+
+        before = _typeguardChecks
+        time   = default_timer()
+        try:
+            return check(value, type_)
+        finally:
+            stats[1] += default_timer() - time
+            stats[0] += 1
+            if direct or _typeguardChecks != before: stats[2] += 1
+    return _OPAL_CHECK_TYPE_
\ No newline at end of file
@@ -22,42 +22,29 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-import os, sys, shutil, numpy, subprocess
-from timeit              import default_timer
-from pathlib             import Path
-from setuptools          import setup
-from Cython.Build        import cythonize
-from Cython.Compiler     import Options
-from components.Compiler import *
+import os, sys
 
-RELEASE_COLLECT = ["__future__", "typeguard", "pygame", "unittest", "numpy", "json"]
-PY_STDLIB       = set(sys.stdlib_module_names) - {"antigravity"} # fun, but i don't wanna open the xkcd page every time i compile something
-NO_INSTALL      = {"opal"} | set(RELEASE_COLLECT) | PY_STDLIB
+# commands are forwarded to a running compiler daemon before anything else is loaded
+if __name__ == "__main__":
+    from components.Daemon import forward
+    forward(sys.argv, globals())
 
-def build(file, debug = False):
-    Options.annotate = debug
+import io, base64, marshal, traceback, subprocess
+from contextlib            import redirect_stdout, redirect_stderr
+from timeit                import default_timer
+from pathlib               import Path
+from components.Compiler   import *
+from components.BuildCache import BuildCache
 
-    oldArgs = sys.argv
-    sys.argv = [sys.argv[0], "build_ext", "--inplace"]
+# Cython, setuptools, numpy and the other build backends are only imported by the commands that need them
 
-    try:
-        setup(
-            name         = os.path.basename(file).split(".")[0],
-            include_dirs = [numpy.get_include()], 
-            ext_modules  = cythonize(file, compiler_directives = {
-                "language_level": "3"
-            }),
-            zip_safe = False
-        )
-    except Exception:
-        print(traceback.format_exc())
-        ok = False
-    else:
-        ok = True
+RELEASE_COLLECT = ["__future__", "typeguard", "pygame", "unittest", "numpy", "json"]
+PY_STDLIB       = set(sys.stdlib_module_names) - {"antigravity"} # fun, but i don't wanna open the xkcd page every time i compile something
+NO_INSTALL      = {"opal"} | set(RELEASE_COLLECT) | PY_STDLIB
 
-    sys.argv = oldArgs
-
-    return ok
+def build(file, debug = False, cache = None, profile = None):
+    from components.CythonBuilder import CythonBuilder
+    return CythonBuilder(cache, profile = profile).build([file], debug)
 
 def compileBase(compiler, filename, name, top, time):
     compiler.compileToPYX(filename, f"{name}.pyx", top)
@@ -65,7 +52,12 @@ def compileBase(compiler, filename, name, top, time):
 
     print("opal -> Cython: Done in " + str(round(default_timer() - time, 4)) + " seconds")
 
-    ok = build(f"{name}.pyx", debug)
+    cache = compiler.buildCache
+    if cache is not None and cache.restoreExtension(f"{name}.pyx", debug):
+        ok = True
+    else:
+        ok = build(f"{name}.pyx", debug, cache, compiler.profile)
+        if ok and cache is not None: cache.storeExtension(f"{name}.pyx", debug)
                     
     if os.path.exists(f"{name}.pyx"): os.remove(f"{name}.pyx")
     if os.path.exists(f"{name}.c"):   os.remove(f"{name}.c")
@@ -81,7 +73,6 @@ def compilePy(compiler, filename, _, endName, top, time, _0):
 
 def compileNormal(compiler, fileInput, name, endName, top, time, noModule):
     if compileBase(compiler, fileInput, name, top, time):
-        if os.path.exists("build"): shutil.rmtree("build")
         if (not compiler.module) or noModule:
             if len(sys.argv) == 3:
                 filename = f"{endName}.py"
@@ -107,6 +98,115 @@ def compileOne(libs, file, compiler):
 def getHomeDirFromFile(file):
     return str(Path(file).parent.absolute())
 
+# runs opalc again with Python's import time logging, and summarizes where startup time went
+def runWithImportTimings(args):
+    time   = default_timer()
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, stderr = subprocess.PIPE, text = True)
+    time   = default_timer() - time
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            print(line, file = sys.stderr)
+            continue
+
+        fields = line[len("import time:"):].split("|")
+        if not fields[0].strip().isdigit(): continue
+
+        name = fields[2].rstrip()
+        imports.append((int(fields[1]), len(name) - len(name.lstrip()), name.strip()))
+
+    topLevel = sorted([(cumulative, name) for cumulative, depth, name in imports if depth == 1], reverse = True)
+    total    = sum(cumulative for cumulative, _ in topLevel)
+
+    print(f"\nimports took {round(total / 1000, 1)} ms of {round(time * 1000, 1)} ms ({len(imports)} modules). slowest top-level imports:", file = sys.stderr)
+    for cumulative, name in topLevel[:15]:
+        print(f"{str(round(cumulative / 1000, 1)).rjust(10)} ms  {name}", file = sys.stderr)
+
+    return result.returncode
+
+# shared by every compiler this process creates, so the daemon keeps it warm between requests
+includeCache = {}
+
+def getCompiler(args):
+    compiler = Compiler()
+    compiler.includeCache = includeCache
+    compiler.handleArgs(args)
+    compiler.preConsts["RELEASE_MODE"] = "False"
+    compiler.preConsts["OPAL_DIR"] = f"r'{getHomeDirFromFile(__file__)}'"
+    compiler.initMain()
+    return compiler
+
+def buildLibrary(libs, file, args, debug_, cache):
+    global debug
+    debug = debug_
+
+    time = default_timer()
+    os.chdir(libs)
+
+    compiler = getCompiler(args)
+    if cache: compiler.buildCache = BuildCache()
+
+    try:
+        ok = compileOne(libs, file, compiler)
+    except (Exception, SystemExit):
+        print(traceback.format_exc())
+        ok = False
+
+    return ok, default_timer() - time
+
+# std.opal is built first, and every other library in parallel after it
+def buildLibraries(libs, args, cache, jobs):
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+    deps = {}
+    for file in sorted(os.listdir(libs)):
+        if file.endswith(".opal") and file != "helpers.opal":
+            deps[file] = set() if file == "std.opal" else {"std.opal"}
+
+    time    = default_timer()
+    done    = set()
+    failed  = []
+    skipped = []
+    running = {}
+
+    with ProcessPoolExecutor(jobs) as pool:
+        while len(deps) != 0 or len(running) != 0:
+            for file in [file for file, fileDeps in deps.items() if fileDeps <= done]:
+                running[pool.submit(buildLibrary, libs, file, args, debug, cache)] = file
+                del deps[file]
+
+            for file in [file for file, fileDeps in deps.items() if any(dep in failed or dep in skipped for dep in fileDeps)]:
+                skipped.append(file)
+                del deps[file]
+
+            if len(running) == 0: break
+
+            finished, _ = wait(running, return_when = FIRST_COMPLETED)
+            for future in finished:
+                file = running.pop(future)
+
+                try:
+                    ok, elapsed = future.result()
+                except Exception:
+                    print(traceback.format_exc())
+                    ok, elapsed = False, 0
+
+                if ok:
+                    done.add(file)
+                    print(f"{file}: built in {round(elapsed, 4)} seconds")
+                else:
+                    failed.append(file)
+                    print(f"{file}: failed after {round(elapsed, 4)} seconds")
+
+    print(f"Built {len(done)} of {len(done) + len(failed) + len(skipped)} libraries in {round(default_timer() - time, 4)} seconds")
+    if len(failed) != 0:
+        print("Failed:", ", ".join(failed))
+    if len(skipped) != 0:
+        print("Skipped (a dependency failed):", ", ".join(skipped))
+
+    return len(failed) == 0 and len(skipped) == 0
+
 def release(fn):
     time = default_timer()
 
@@ -185,140 +285,293 @@ def release(fn):
         quit()
     print("Compilation failed.")
 
-if __name__ == "__main__":
-    if len(sys.argv) == 1:
-        print(f"opal compiler v{'.'.join([str(x) for x in VERSION])} - thatsOven")
+def profileProgram(compiler):
+    global top
+    from components.RuntimeProfiler import ProgramProfile, PROGRAM_FILE
+
+    if "--top" in sys.argv:
+        idx = sys.argv.index("--top")
+        sys.argv.pop(idx)
+        amount = int(sys.argv.pop(idx))
+    else: amount = 20
+
+    if "--interval" in sys.argv:
+        idx = sys.argv.index("--interval")
+        sys.argv.pop(idx)
+        interval = float(sys.argv.pop(idx)) / 1000
+    else: interval = 0.001
+
+    if "--collapsed" in sys.argv:
+        idx = sys.argv.index("--collapsed")
+        sys.argv.pop(idx)
+        collapsed = sys.argv.pop(idx)
+    else: collapsed = None
+
+    everything = "--all" in sys.argv
+    if everything: sys.argv.remove("--all")
+
+    fileName = sys.argv[2]
+    if findDir:
+        drt = getHomeDirFromFile(fileName)
+        compiler.preConsts["HOME_DIR"] = f'r"{drt}"'
+        top = 'new dynamic HOME_DIR=r"' + drt + '";'
+
+    compiler.sourceMap = True
+    if compiler.buildCache is None:
+        result = compiler.compileFile(fileName, top)
+        if result != "": result = compile(result, PROGRAM_FILE, "exec")
+    else: result = compiler.buildCache.compileCode(compiler, fileName, top, PROGRAM_FILE)
+
+    if compiler.hadError or result is None: return
+
+    profile  = ProgramProfile(compiler.lastSourceMap, interval)
+    sys.argv = sys.argv[2:]
+    profile.run(result, os.path.abspath(fileName))
+
+    print("\n" + profile.report(amount, everything))
+    if collapsed is not None:
+        profile.writeCollapsedStacks(collapsed)
+        print(f"collapsed stacks written to {collapsed}")
+
+def handleRequest(request):
+    if request["version"] != sys.version:
+        return {"fallback": True}
+
+    os.chdir(request["cwd"])
+    sys.argv = request["argv"]
+
+    output  = io.StringIO()
+    status  = 0
+    program = None
+    with redirect_stdout(output), redirect_stderr(output):
+        try:
+            program = main(daemon = True)
+        except SystemExit as e:
+            if e.code is None or type(e.code) is int:
+                status = e.code or 0
+            else:
+                print(e.code)
+                status = 1
+        except Exception:
+            print(traceback.format_exc())
+            status = 1
+
+    response = {"output": output.getvalue(), "status": status}
+    if program is not None:
+        response["program"] = base64.b64encode(marshal.dumps(program)).decode()
+
+    return response
+
+def serve(stop):
+    from components.Daemon import runDaemon, stopDaemon
+
+    if stop:
+        stopDaemon()
+        return
+
+    # loaded upfront, so the first request doesn't pay for it
+    from components.CythonBuilder import CythonBuilder
+    runDaemon(handleRequest)
+
+def getProfile(args):
+    from components.Profiler import CompilerProfile
+
+    enabled = False
+    if "--profile-compiler" in args:
+        enabled = True
+        args.remove("--profile-compiler")
+
+    if "--profile-json" in args:
+        enabled = True
+        idx = args.index("--profile-json")
+        args.pop(idx)
+        fileName = args.pop(idx)
+    else: fileName = None
+
+    if "--profile-allocations" in args:
+        enabled = True
+        args.remove("--profile-allocations")
+        allocations = True
+    else: allocations = False
+
+    if enabled:
+          return CompilerProfile(allocations), fileName
+    else: return None, None
+
+def main(daemon = False):
+    profile, profileFile = getProfile(sys.argv)
+
+    try:
+        return runCommand(daemon, profile)
+    finally:
+        if profile is not None:
+            if profileFile is None:
+                  print(profile.table())
+            else: profile.write(profileFile)
+
+def runCommand(daemon, profile):
+    global compiler, debug, findDir, top
+
+    compilerArgs = sys.argv.copy()
+    compiler     = getCompiler(sys.argv)
+    compiler.profile = profile
+    if profile is not None:
+        compiler.includeCache = {}
+
+    if "--debug" in sys.argv:
+        debug = True
+        sys.argv.remove("--debug")
+    else: debug = False
+
+    if "--no-cache" in sys.argv:
+        sys.argv.remove("--no-cache")
+    # cached results would skip every phase being measured
+    elif profile is None:
+        compiler.buildCache = BuildCache()
+
+    if "--dir" in sys.argv:
+        findDir = False
+        idx = sys.argv.index("--dir")
+        sys.argv.pop(idx)
+
+        drt = sys.argv.pop(idx)
+        compiler.preConsts["HOME_DIR"] = f'r"{drt}"'
+        top = 'new dynamic HOME_DIR=r"' + drt + '";'
     else:
-        compiler = Compiler()
-        compiler.handleArgs(sys.argv)
-        compiler.preConsts["RELEASE_MODE"] = "False"
-        compiler.preConsts["OPAL_DIR"] = f"r'{getHomeDirFromFile(__file__)}'"
-        compiler.initMain()
-
-        if "--debug" in sys.argv:
-            debug = True
-            sys.argv.remove("--debug")
-        else: debug = False
-
-        if "--dir" in sys.argv:
-            findDir = False
-            idx = sys.argv.index("--dir")
-            sys.argv.pop(idx)
+        findDir = True
+
+    if sys.argv[1] == "pyxcompile":
+        if len(sys.argv) == 2:
+            print('input file required for command "pyxcompile"')
+            sys.exit(1)
 
-            drt = sys.argv.pop(idx)
+        time = default_timer()
+
+        if findDir:
+            drt = getHomeDirFromFile(sys.argv[2])
             compiler.preConsts["HOME_DIR"] = f'r"{drt}"'
             top = 'new dynamic HOME_DIR=r"' + drt + '";'
+
+        name = os.path.basename(sys.argv[2]).split(".")[0]
+        if len(sys.argv) == 3:
+            compiler.compileToPYX(sys.argv[2], f"{name}.pyx", top)
         else:
-            findDir = True
+            compiler.compileToPYX(sys.argv[2], sys.argv[3], top)
 
-        if sys.argv[1] == "pyxcompile":
-            if len(sys.argv) == 2:
-                print('input file required for command "pyxcompile"')
-                sys.exit(1)
+        if not compiler.hadError:
+            print("Compilation was successful. Elapsed time: " + str(round(default_timer() - time, 4)) + " seconds")
+    elif sys.argv[1] == "pycompile":
+        if len(sys.argv) == 2:
+            print('input file required for command "pycompile"')
+            sys.exit(1)
 
-            time = default_timer()
+        time = default_timer()
 
-            if findDir:
-                drt = getHomeDirFromFile(sys.argv[2])
-                compiler.preConsts["HOME_DIR"] = f'r"{drt}"'
-                top = 'new dynamic HOME_DIR=r"' + drt + '";'
+        if findDir:
+            drt = getHomeDirFromFile(sys.argv[2])
+            compiler.preConsts["HOME_DIR"] = f'r"{drt}"'
+            top = 'new dynamic HOME_DIR=r"' + drt + '";'
 
-            name = os.path.basename(sys.argv[2]).split(".")[0]
-            if len(sys.argv) == 3:
-                compiler.compileToPYX(sys.argv[2], f"{name}.pyx", top)
-            else:
-                compiler.compileToPYX(sys.argv[2], sys.argv[3], top)
+        name = os.path.basename(sys.argv[2]).split(".")[0]
+        if len(sys.argv) == 3:
+            compiler.compileToPY(sys.argv[2], f"{name}.py", top)
+        else:
+            compiler.compileToPY(sys.argv[2], sys.argv[3], top)
+
+        if not compiler.hadError:
+            print("Compilation was successful. Elapsed time: " + str(round(default_timer() - time, 4)) + " seconds")
+    elif sys.argv[1] == "compile":
+        if len(sys.argv) == 2:
+            print('input file required for command "compile"')
+            sys.exit(1)
 
-            if not compiler.hadError:
-                print("Compilation was successful. Elapsed time: " + str(round(default_timer() - time, 4)) + " seconds")
-        elif sys.argv[1] == "pycompile":
-            if len(sys.argv) == 2:
-                print('input file required for command "pycompile"')
-                sys.exit(1)
+        time = default_timer()
 
-            time = default_timer()
+        if findDir:
+            drt = getHomeDirFromFile(sys.argv[2])
+            compiler.preConsts["HOME_DIR"] = f'r"{drt}"'
+            top = 'new dynamic HOME_DIR=r"' + drt + '";'
 
-            if findDir:
-                drt = getHomeDirFromFile(sys.argv[2])
-                compiler.preConsts["HOME_DIR"] = f'r"{drt}"'
-                top = 'new dynamic HOME_DIR=r"' + drt + '";'
+        name = os.path.basename(sys.argv[2]).split(".")[0]
+        for char in ILLEGAL_CHARS:
+            name = name.replace(char, "_")
+
+        if compileNormal(compiler, sys.argv[2], name, name, top, time, False):
+            print("Compilation was successful. Elapsed time: " + str(round(default_timer() - time, 4)) + " seconds")
+            quit()
+        print("Compilation failed")
+    elif sys.argv[1] == "build":
+        if "--jobs" in sys.argv:
+            idx = sys.argv.index("--jobs")
+            sys.argv.pop(idx)
+            jobs = int(sys.argv.pop(idx))
+        else: jobs = os.cpu_count()
+
+        libs = os.path.join(getHomeDirFromFile(__file__), "libs")
+        os.chdir(libs)
+
+        if buildLibraries(libs, compilerArgs, compiler.buildCache is not None, jobs):
+            os.chdir(os.path.join(getHomeDirFromFile(__file__), "runner"))
+            import runner.build
+        else: print("Compilation failed")
+    elif sys.argv[1] == "release":
+        if len(sys.argv) == 2:
+            print('input file required for command "release"')
+            sys.exit(1)
+
+        release(compileNormal)
+    elif sys.argv[1] == "pyrelease":
+        if len(sys.argv) == 2:
+            print('input file required for command "pyrelease"')
+            sys.exit(1)
+
+        release(compilePy)
+    elif sys.argv[1] == "profile":
+        if len(sys.argv) == 2:
+            print('input file required for command "profile"')
+            sys.exit(1)
+
+        profileProgram(compiler)
+    elif sys.argv[1] == "path":
+        print(getHomeDirFromFile(__file__))
+    else:
+        sys.argv[1] = sys.argv[1]
+        if not os.path.exists(sys.argv[1]):
+            print('unknown command or nonexistent file "' + sys.argv[1] + '"')
+            sys.exit(1)
 
-            name = os.path.basename(sys.argv[2]).split(".")[0]
-            if len(sys.argv) == 3:
-                compiler.compileToPY(sys.argv[2], f"{name}.py", top)
-            else:
-                compiler.compileToPY(sys.argv[2], sys.argv[3], top)
-
-            if not compiler.hadError:
-                print("Compilation was successful. Elapsed time: " + str(round(default_timer() - time, 4)) + " seconds")
-        elif sys.argv[1] == "compile":
-            if len(sys.argv) == 2:
-                print('input file required for command "compile"')
-                sys.exit(1)
-
-            time = default_timer()
-
-            if findDir:
-                drt = getHomeDirFromFile(sys.argv[2])
-                compiler.preConsts["HOME_DIR"] = f'r"{drt}"'
-                top = 'new dynamic HOME_DIR=r"' + drt + '";'
-
-            name = os.path.basename(sys.argv[2]).split(".")[0]
-            for char in ILLEGAL_CHARS:
-                name = name.replace(char, "_")
-
-            if compileNormal(compiler, sys.argv[2], name, name, top, time, False):
-                print("Compilation was successful. Elapsed time: " + str(round(default_timer() - time, 4)) + " seconds")
-                quit()
-            print("Compilation failed")
-        elif sys.argv[1] == "build":
-            libs = os.path.join(getHomeDirFromFile(__file__), "libs")
-            os.chdir(libs)
-
-            ok = compileOne(libs, "std.opal", compiler)
-            if not ok:
-                print("Compilation failed")
-                quit()
-
-            for file in os.listdir(libs):
-                if file.endswith(".opal") and not file in ("helpers.opal", "std.opal"):
-                    ok = compileOne(libs, file, compiler)
-
-                    if not ok:
-                        print("Compilation failed")
-                        break
-
-            if os.path.exists("build"): shutil.rmtree("build")
-
-            if ok:
-                os.chdir(os.path.join(getHomeDirFromFile(__file__), "runner"))
-                import runner.build
-        elif sys.argv[1] == "release":
-            if len(sys.argv) == 2:
-                print('input file required for command "release"')
-                sys.exit(1)
-
-            release(compileNormal)
-        elif sys.argv[1] == "pyrelease":
-            if len(sys.argv) == 2:
-                print('input file required for command "pyrelease"')
-                sys.exit(1)
-
-            release(compilePy)
-        elif sys.argv[1] == "path":
-            print(getHomeDirFromFile(__file__))
-        else:
-            sys.argv[1] = sys.argv[1]
-            if not os.path.exists(sys.argv[1]):
-                print('unknown command or nonexistent file "' + sys.argv[1] + '"')
-                sys.exit(1)
-
-            if findDir:
-                drt = getHomeDirFromFile(sys.argv[1])
-                compiler.preConsts["HOME_DIR"] = f'r"{drt}"'
-                top = 'new dynamic HOME_DIR=r"' + drt + '";'
-
-            result = compiler.compileFile(sys.argv[1], top)
-            if not compiler.hadError: 
-                sys.argv = sys.argv[1:]
-                exec(result)
+        if findDir:
+            drt = getHomeDirFromFile(sys.argv[1])
+            compiler.preConsts["HOME_DIR"] = f'r"{drt}"'
+            top = 'new dynamic HOME_DIR=r"' + drt + '";'
+
+        if compiler.buildCache is None:
+              result = compiler.compileFile(sys.argv[1], top)
+        else: result = compiler.buildCache.compileCode(compiler, sys.argv[1], top)
+
+        if compiler.hadError: return None
+
+        # the daemon sends the program back to the client, which runs it
+        if daemon:
+            if type(result) is str:
+                  return compile(result, "<string>", "exec")
+            else: return result
+
+        if compiler.sourceMap:
+            from components.SourceMap import register, install
+            register("<string>", compiler.lastSourceMap)
+            install()
+
+        sys.argv = sys.argv[1:]
+        exec(result, globals())
+
+if __name__ == "__main__":
+    if "--import-timings" in sys.argv:
+        sys.argv.remove("--import-timings")
+        sys.exit(runWithImportTimings(sys.argv))
+
+    if len(sys.argv) == 1:
+        print(f"opal compiler v{'.'.join([str(x) for x in VERSION])} - thatsOven")
+    elif sys.argv[1] == "serve":
+        serve("--stop" in sys.argv)
+    else: main()
@@ -0,0 +1,69 @@
+import os, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.Tokens          import Tokens
+from components.AST             import *
+from components.IR              import Expr
+from components.ConstantFolding import foldExpr
+
+def getStrings(source):
+    return list(Tokens(source).tokens.strings())
+
+def getFolded(source):
+    expr = Expr(getStrings(source))
+    foldExpr(expr)
+    return str(expr)
+
+class TestParse(unittest.TestCase):
+    def testRoundTrip(self):
+        for source in (
+            "a**=2", "x=y=1e-5+1.5e+3", "x=0x1e-5", "f(**k,*a,b=2)", "x[1:2,::3]", "lambda x,y=2:x",
+            "a if b else c", "not a in b", "x=(yield x)", 'r"a" f"{x}"', "<int*>p", "&x", "a.b.c(1)[2]",
+            "{**d,1:2}", "[x*2 for x in range(3)if x]", "{a:b for a,b in c}", "sum(x for x in y)",
+            "open(f)as g", "a is not b not in c", "-2**2", "a[...]", "x:=5", "1.e-5", "a,*b=c", "(1,)",
+            "super().__init__(a)"
+        ):
+            strings = getStrings(source)
+            tree    = parse(strings)
+
+            self.assertNotIsInstance(tree, Raw, source)
+            self.assertEqual(tree.leaves(), strings)
+            self.assertEqual(tree.render(), Tokens(source).join())
+
+    def testNodes(self):
+        tree = parse(getStrings("x=a+b*c"))
+        self.assertIsInstance(tree, Assign)
+        self.assertIsInstance(tree.value, BinOp)
+        self.assertEqual(tree.value.op, "+")
+        self.assertEqual(tree.value.right.op, "*")
+
+        tree = parse(getStrings("-2**2"))
+        self.assertIsInstance(tree, UnaryOp)
+        self.assertIsInstance(tree.operand, BinOp)
+
+        self.assertIsInstance(parse(getStrings("1.5e-3")), Constant)
+        self.assertEqual(parse(getStrings("1.5e-3")).value, 1.5e-3)
+
+    def testRaw(self):
+        strings = getStrings("a b")
+        tree    = parse(strings)
+
+        self.assertIsInstance(tree, Raw)
+        self.assertEqual(tree.leaves(), strings)
+
+class TestConstantFolding(unittest.TestCase):
+    def testFolded(self):
+        self.assertEqual(getFolded("60*60*24"), "86400")
+        self.assertEqual(getFolded("x*(3+4)"), "x*(7)")
+        self.assertEqual(getFolded("2-5"), "-3")
+        self.assertEqual(getFolded("1+-2**2"), "-3")
+        self.assertEqual(getFolded("1.5e-3*2"), "0.003")
+        self.assertEqual(getFolded("x=1/2"), "x=0.5")
+
+    def testKept(self):
+        for source in ("-7//2", "2**100", "1/0", '"a"*3', "x+1", "<double>1/3", "True+1", "1+2j"):
+            self.assertEqual(getFolded(source), Tokens(source).join(), source)
+
+if __name__ == "__main__":
+    unittest.main()
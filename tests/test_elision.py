@@ -0,0 +1,150 @@
+import os, sys, subprocess, tempfile, unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# programs whose result must not change when type checks are elided
+PROGRAMS = {
+    "decorated": """
+new function toStr(fn) {
+    new function wrapper() {
+        return str(fn());
+    }
+    return wrapper;
+}
+
+@toStr;
+new function f() int {
+    return 5;
+}
+
+main {
+    new int a = f();
+    IO.out(repr(a), IO.endl);
+}
+""",
+    "uncheckedReturn": """
+new function f() int {
+    unchecked: return "text";
+}
+
+main {
+    try {
+        new int a = f();
+        IO.out(repr(a), IO.endl);
+    } catch Exception {
+        IO.out("raised", IO.endl);
+    }
+}
+""",
+    "fallsOff": """
+new function f(x: int) int {
+    if x > 0 {
+        return 1;
+    }
+}
+
+main {
+    try {
+        new int a = f(-1);
+        IO.out(repr(a), IO.endl);
+    } catch Exception {
+        IO.out("raised", IO.endl);
+    }
+}
+""",
+    "global": """
+new int y = 1;
+
+new function setY() {
+    global y;
+    unchecked: y = "oops";
+}
+
+main {
+    setY();
+    try {
+        new int a = y;
+        IO.out(repr(a), IO.endl);
+    } catch Exception {
+        IO.out("raised", IO.endl);
+    }
+}
+""",
+    "nocompile": """
+main {
+    new int x = 1;
+    $nocompile
+x = 2.5
+    $restore
+    new int a = x;
+    IO.out(repr(a), IO.endl);
+}
+""",
+    "trusted": """
+new function f(x: int) int {
+    if x > 0 {
+        return x;
+    } else {
+        return 0;
+    }
+}
+
+main {
+    new int a = f(2);
+    IO.out(repr(a), IO.endl);
+}
+"""
+}
+
+EXPECTED = {
+    "decorated":       "5",
+    "uncheckedReturn": "raised",
+    "fallsOff":        "raised",
+    "global":          "raised",
+    "nocompile":       "2",
+    "trusted":         "2"
+}
+
+class TestCheckElision(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def compile(self, name, source, *args):
+        src = os.path.join(self.dir.name, name + ".opal")
+        out = os.path.join(self.dir.name, name + ("-checked" if args else "") + ".py")
+
+        with open(src, "w") as file:
+            file.write("package opal: import *;\n" + source)
+
+        env = dict(os.environ, OPAL_CACHE_DIR = os.path.join(self.dir.name, "cache"))
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, "opalc.py"), "pycompile", src, out, *args],
+            cwd = ROOT, env = env, check = True, capture_output = True
+        )
+
+        with open(out) as file:
+            return out, file.read()
+
+    def execute(self, file):
+        result = subprocess.run([sys.executable, file], cwd = self.dir.name, capture_output = True, text = True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout.strip()
+
+    def testResults(self):
+        for name, source in PROGRAMS.items():
+            with self.subTest(name):
+                elided,  _ = self.compile(name, source)
+                checked, _ = self.compile(name, source, "--keep-checks")
+
+                self.assertEqual(self.execute(checked), EXPECTED[name])
+                self.assertEqual(self.execute(elided),  EXPECTED[name])
+
+    def testTrustedCall(self):
+        _, code = self.compile("trusted", PROGRAMS["trusted"])
+        self.assertIn("a:int=f(2)", code)
+
+if __name__ == "__main__":
+    unittest.main()
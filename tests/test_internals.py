@@ -0,0 +1,28 @@
+import os, sys, unittest
+from typing    import Any, Protocol
+from typeguard import TypeCheckError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs._internals import _OPAL_CHECK_TYPE_
+
+class Closeable(Protocol):
+    def close(self): ...
+
+class File:
+    def close(self): pass
+
+class TestCheckType(unittest.TestCase):
+    def testAny(self):
+        self.assertEqual(_OPAL_CHECK_TYPE_(3, Any), 3)
+        self.assertEqual(_OPAL_CHECK_TYPE_("x", Any), "x")
+
+    def testProtocol(self):
+        file = File()
+        self.assertIs(_OPAL_CHECK_TYPE_(file, Closeable), file)
+
+        with self.assertRaises(TypeCheckError):
+            _OPAL_CHECK_TYPE_(3, Closeable)
+
+if __name__ == "__main__":
+    unittest.main()